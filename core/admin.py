@@ -31,6 +31,25 @@ class CustomUserAdmin(UserAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        # Lesson count, level and VID eligibility come from one annotated query
+        return super().get_queryset(request).with_lesson_stats()
+
+    def total_lessons(self, obj):
+        return obj.total_lessons
+    total_lessons.short_description = 'Total lessons'
+    total_lessons.admin_order_field = 'lesson_count'
+
+    def get_level(self, obj):
+        return obj.get_level()
+    get_level.short_description = 'Get level'
+    get_level.admin_order_field = 'lesson_count'
+
+    def eligible_for_vid(self, obj):
+        return obj.eligible_for_vid
+    eligible_for_vid.short_description = 'Eligible for vid'
+    eligible_for_vid.admin_order_field = 'vid_eligible'
+
     def payment_proof_display(self, obj):
         if obj.payment_proof:
             return format_html('<a href="{}" target="_blank">View Proof</a>', obj.payment_proof.url)
@@ -65,8 +84,8 @@ class LessonAdmin(admin.ModelAdmin):
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
     """Admin for Notification model."""
-    list_display = ('user', 'message', 'is_read', 'created_at')
-    list_filter = ('is_read', 'created_at')
+    list_display = ('user', 'message', 'kind', 'is_read', 'created_at')
+    list_filter = ('kind', 'is_read', 'created_at')
     search_fields = ('user__username', 'message')
     readonly_fields = ('created_at',)
 
@@ -19,7 +19,7 @@ class DrivingSchoolAI:
         self.logger = logging.getLogger(__name__)
     
     def suggest_available_vehicles(self, lesson_date: date, start_time: time, end_time: time, 
-                                 student_class: str = 'class1') -> List[Dict[str, Any]]:
+                                 student_class: str = 'class1', allocator=None) -> List[Dict[str, Any]]:
         """
         Suggest available vehicles for a lesson based on date, time, and student class.
         
@@ -28,58 +28,37 @@ class DrivingSchoolAI:
             start_time: Start time of the lesson
             end_time: End time of the lesson
             student_class: The driving class (class1, class2, etc.)
+            allocator: Pre-loaded FleetAllocator for lesson_date (optional)
         
         Returns:
             List of available vehicles with suggestions
         """
-        from .models import Vehicle, VehicleAllocation, Lesson
+        from .services.fleet import FleetAllocator
         
         try:
-            # Get vehicles that match the student class
-            preferred_vehicles = Vehicle.objects.filter(
-                vehicle_class=student_class,
-                is_available=True
-            ).exclude(
-                vehicleallocation__lesson__date=lesson_date,
-                vehicleallocation__lesson__start_time__lt=end_time,
-                vehicleallocation__lesson__end_time__gt=start_time
-            )
-            
-            # Get any available vehicles as fallback
-            fallback_vehicles = Vehicle.objects.filter(
-                is_available=True
-            ).exclude(
-                vehicleallocation__lesson__date=lesson_date,
-                vehicleallocation__lesson__start_time__lt=end_time,
-                vehicleallocation__lesson__end_time__gt=start_time
-            ).exclude(
-                id__in=preferred_vehicles.values_list('id', flat=True)
-            )
+            if allocator is None:
+                allocator = FleetAllocator.load(lesson_date)
             
             suggestions = []
-            
-            # Add preferred vehicles
-            for vehicle in preferred_vehicles:
-                suggestions.append({
-                    'vehicle': vehicle,
-                    'recommendation': 'Perfect Match',
-                    'reason': f'Ideal for {vehicle.get_vehicle_class_display()}',
-                    'priority': 1,
-                    'confidence': 95
-                })
-            
-            # Add fallback vehicles
-            for vehicle in fallback_vehicles:
-                suggestions.append({
-                    'vehicle': vehicle,
-                    'recommendation': 'Alternative Option',
-                    'reason': f'Available {vehicle.get_vehicle_class_display()} vehicle',
-                    'priority': 2,
-                    'confidence': 75
-                })
-            
-            # Sort by priority and confidence
-            suggestions.sort(key=lambda x: (x['priority'], -x['confidence']))
+            for vehicle, is_match in allocator.candidates(start_time, end_time, student_class):
+                if is_match:
+                    # Preferred vehicles match the student class
+                    suggestions.append({
+                        'vehicle': vehicle,
+                        'recommendation': 'Perfect Match',
+                        'reason': f'Ideal for {vehicle.get_vehicle_class_display()}',
+                        'priority': 1,
+                        'confidence': 95
+                    })
+                else:
+                    # Any other free vehicle is a fallback
+                    suggestions.append({
+                        'vehicle': vehicle,
+                        'recommendation': 'Alternative Option',
+                        'reason': f'Available {vehicle.get_vehicle_class_display()} vehicle',
+                        'priority': 2,
+                        'confidence': 75
+                    })
             
             self.logger.info(f"Found {len(suggestions)} vehicle suggestions for {lesson_date} {start_time}-{end_time}")
             return suggestions
@@ -89,19 +68,24 @@ class DrivingSchoolAI:
             return []
     
     def suggest_optimal_lesson_times(self, tutor_id: int, student_id: int, 
-                                   preferred_date: date = None) -> List[Dict[str, Any]]:
+                                   preferred_date: date = None, index=None) -> List[Dict[str, Any]]:
         """
         Suggest optimal lesson times based on tutor availability, student history, and vehicle availability.
         
+        Availability is answered from an AvailabilityIndex, so the number of queries
+        does not depend on the number of slots, tutors or vehicles.
+        
         Args:
             tutor_id: ID of the tutor
             student_id: ID of the student
             preferred_date: Preferred date (optional)
+            index: Pre-loaded AvailabilityIndex covering preferred_date (optional)
         
         Returns:
             List of suggested time slots
         """
-        from .models import User, Lesson, Vehicle
+        from .models import User
+        from .services.availability import AvailabilityIndex, hourly_slots
         
         try:
             if not preferred_date:
@@ -111,63 +95,37 @@ class DrivingSchoolAI:
             tutor = User.objects.get(id=tutor_id, role='tutor')
             student = User.objects.get(id=student_id, role='student')
             
-            # Define possible time slots (8 AM to 6 PM, 1-hour slots)
-            time_slots = []
-            for hour in range(8, 18):
-                start_time = time(hour, 0)
-                end_time = time(hour + 1, 0)
-                time_slots.append((start_time, end_time))
+            if index is None:
+                index = AvailabilityIndex.load(preferred_date)
             
             suggestions = []
             
-            for start_time, end_time in time_slots:
-                # Check tutor availability
-                tutor_busy = Lesson.objects.filter(
-                    tutor=tutor,
-                    date=preferred_date,
-                    start_time__lt=end_time,
-                    end_time__gt=start_time
-                ).exists()
+            # Possible time slots: 8 AM to 6 PM, 1-hour slots
+            for slot in index.free_slots(tutor.id, student.id, preferred_date, hourly_slots()):
+                start_time = slot['start_time']
+                available_vehicles = slot['available_vehicles']
                 
-                # Check student availability
-                student_busy = Lesson.objects.filter(
-                    student=student,
-                    date=preferred_date,
-                    start_time__lt=end_time,
-                    end_time__gt=start_time
-                ).exists()
-                
-                if not tutor_busy and not student_busy:
-                    # Check vehicle availability
-                    available_vehicles = Vehicle.objects.filter(
-                        is_available=True
-                    ).exclude(
-                        vehicleallocation__lesson__date=preferred_date,
-                        vehicleallocation__lesson__start_time__lt=end_time,
-                        vehicleallocation__lesson__end_time__gt=start_time
-                    ).count()
+                if available_vehicles > 0:
+                    # Calculate confidence based on various factors
+                    confidence = 80
+                    
+                    # Prefer morning slots (higher confidence)
+                    if start_time.hour < 12:
+                        confidence += 10
                     
-                    if available_vehicles > 0:
-                        # Calculate confidence based on various factors
-                        confidence = 80
-                        
-                        # Prefer morning slots (higher confidence)
-                        if start_time.hour < 12:
-                            confidence += 10
-                        
-                        # Prefer slots with more vehicle options
-                        if available_vehicles > 2:
-                            confidence += 5
-                        
-                        suggestions.append({
-                            'date': preferred_date,
-                            'start_time': start_time,
-                            'end_time': end_time,
-                            'available_vehicles': available_vehicles,
-                            'confidence': min(confidence, 100),
-                            'recommendation': 'Available Slot',
-                            'reason': f'{available_vehicles} vehicles available'
-                        })
+                    # Prefer slots with more vehicle options
+                    if available_vehicles > 2:
+                        confidence += 5
+                    
+                    suggestions.append({
+                        'date': preferred_date,
+                        'start_time': start_time,
+                        'end_time': slot['end_time'],
+                        'available_vehicles': available_vehicles,
+                        'confidence': min(confidence, 100),
+                        'recommendation': 'Available Slot',
+                        'reason': f'{available_vehicles} vehicles available'
+                    })
             
             # Sort by confidence
             suggestions.sort(key=lambda x: -x['confidence'])
@@ -195,77 +153,9 @@ class DrivingSchoolAI:
             student = User.objects.get(id=student_id, role='student')
             
             # Get all lessons for the student
-            lessons = Lesson.objects.filter(student=student).order_by('date', 'start_time')
-            progress_records = StudentProgress.objects.filter(student=student).order_by('-created_at')
-            
-            total_lessons = lessons.count()
-            total_progress_records = progress_records.count()
-            
-            if total_lessons == 0:
-                return {
-                    'student_name': student.get_full_name() or student.username,
-                    'total_lessons': 0,
-                    'analysis': 'No lessons completed yet',
-                    'recommendations': ['Book your first lesson to get started!'],
-                    'progress_score': 0
-                }
-            
-            # Calculate progress metrics
-            recent_lessons = lessons.filter(
-                date__gte=timezone.now().date() - timedelta(days=30)
-            ).count()
-            
-            # Analyze progress trends
-            recommendations = []
-            progress_score = 50  # Base score
-            
-            # Lesson frequency analysis
-            if recent_lessons >= 4:
-                recommendations.append("Great consistency! Keep up the regular practice.")
-                progress_score += 20
-            elif recent_lessons >= 2:
-                recommendations.append("Good progress. Consider booking more frequent lessons.")
-                progress_score += 10
-            else:
-                recommendations.append("Consider booking more regular lessons for better progress.")
-                progress_score -= 10
-            
-            # Progress record analysis
-            if total_progress_records > 0:
-                latest_progress = progress_records.first()
-                if 'excellent' in latest_progress.instructor_feedback.lower():
-                    recommendations.append("Excellent feedback from instructor! You're doing great.")
-                    progress_score += 15
-                elif 'good' in latest_progress.instructor_feedback.lower():
-                    recommendations.append("Good progress noted by instructor.")
-                    progress_score += 10
-                
-                # Check for areas needing improvement
-                if 'practice' in latest_progress.next_lesson_focus.lower():
-                    recommendations.append("Focus on practicing the areas mentioned by your instructor.")
-            
-            # Ensure score is within bounds
-            progress_score = max(0, min(100, progress_score))
-            
-            analysis = f"Completed {total_lessons} lessons with {total_progress_records} progress records. "
-            if progress_score >= 80:
-                analysis += "Excellent progress!"
-            elif progress_score >= 60:
-                analysis += "Good progress, keep it up!"
-            elif progress_score >= 40:
-                analysis += "Steady progress, consider more frequent lessons."
-            else:
-                analysis += "Getting started, book more lessons for better progress."
-            
-            return {
-                'student_name': student.get_full_name() or student.username,
-                'total_lessons': total_lessons,
-                'recent_lessons': recent_lessons,
-                'progress_records': total_progress_records,
-                'analysis': analysis,
-                'recommendations': recommendations,
-                'progress_score': progress_score
-            }
+            lessons = list(Lesson.objects.filter(student=student).order_by('date', 'start_time'))
+            progress_records = list(StudentProgress.objects.filter(student=student).order_by('-created_at'))
+            return self._analyze_progress(student, lessons, progress_records)
             
         except Exception as e:
             self.logger.error(f"Error analyzing student progress: {str(e)}")
@@ -277,6 +167,86 @@ class DrivingSchoolAI:
                 'progress_score': 0
             }
     
+    def _analyze_progress(self, student, lessons: list, progress_records: list) -> Dict[str, Any]:
+        """
+        Progress analysis over already loaded data; runs no queries.
+        
+        Args:
+            student: The student
+            lessons: The student's lessons
+            progress_records: The student's progress records, newest first
+        
+        Returns:
+            Dictionary with progress analysis
+        """
+        total_lessons = len(lessons)
+        total_progress_records = len(progress_records)
+        
+        if total_lessons == 0:
+            return {
+                'student_name': student.get_full_name() or student.username,
+                'total_lessons': 0,
+                'analysis': 'No lessons completed yet',
+                'recommendations': ['Book your first lesson to get started!'],
+                'progress_score': 0
+            }
+        
+        # Calculate progress metrics
+        cutoff = timezone.now().date() - timedelta(days=30)
+        recent_lessons = sum(1 for lesson in lessons if lesson.date >= cutoff)
+        
+        # Analyze progress trends
+        recommendations = []
+        progress_score = 50  # Base score
+        
+        # Lesson frequency analysis
+        if recent_lessons >= 4:
+            recommendations.append("Great consistency! Keep up the regular practice.")
+            progress_score += 20
+        elif recent_lessons >= 2:
+            recommendations.append("Good progress. Consider booking more frequent lessons.")
+            progress_score += 10
+        else:
+            recommendations.append("Consider booking more regular lessons for better progress.")
+            progress_score -= 10
+        
+        # Progress record analysis
+        if total_progress_records > 0:
+            latest_progress = progress_records[0]
+            if 'excellent' in latest_progress.instructor_feedback.lower():
+                recommendations.append("Excellent feedback from instructor! You're doing great.")
+                progress_score += 15
+            elif 'good' in latest_progress.instructor_feedback.lower():
+                recommendations.append("Good progress noted by instructor.")
+                progress_score += 10
+            
+            # Check for areas needing improvement
+            if 'practice' in latest_progress.next_lesson_focus.lower():
+                recommendations.append("Focus on practicing the areas mentioned by your instructor.")
+        
+        # Ensure score is within bounds
+        progress_score = max(0, min(100, progress_score))
+        
+        analysis = f"Completed {total_lessons} lessons with {total_progress_records} progress records. "
+        if progress_score >= 80:
+            analysis += "Excellent progress!"
+        elif progress_score >= 60:
+            analysis += "Good progress, keep it up!"
+        elif progress_score >= 40:
+            analysis += "Steady progress, consider more frequent lessons."
+        else:
+            analysis += "Getting started, book more lessons for better progress."
+        
+        return {
+            'student_name': student.get_full_name() or student.username,
+            'total_lessons': total_lessons,
+            'recent_lessons': recent_lessons,
+            'progress_records': total_progress_records,
+            'analysis': analysis,
+            'recommendations': recommendations,
+            'progress_score': progress_score
+        }
+    
     def generate_progress_comment_suggestion(self, lesson_id: int) -> str:
         """
         Generate a suggested progress comment for a lesson.
@@ -405,12 +375,59 @@ class DrivingSchoolAI:
             self.logger.error(f"Error generating progress feedback: {str(e)}")
             return "Unable to generate AI feedback at this time. Please try again later."
     
-    def generate_comprehensive_report_data(self, student_id: int) -> Dict[str, Any]:
+    @staticmethod
+    def _lesson_history_row(lesson, progress) -> Dict[str, Any]:
+        return {
+            'date': lesson.date,
+            'time': f"{lesson.start_time.strftime('%H:%M')} - {lesson.end_time.strftime('%H:%M')}",
+            'duration': lesson.get_duration(),
+            'tutor': lesson.tutor.get_full_name() or lesson.tutor.username,
+            'location': lesson.location,
+            'skills_covered': progress.skills_covered if progress else 'Not recorded',
+            'progress_notes': progress.progress_notes if progress else 'Not recorded',
+            'instructor_feedback': progress.instructor_feedback if progress else 'Not recorded',
+            'next_focus': progress.next_lesson_focus if progress else 'Not recorded'
+        }
+
+    def iter_lesson_history(self, student_id: int, chunk_size: int = 500):
+        """
+        Yield a student's lesson history rows, oldest first.
+
+        Lessons are read in chunks with their tutor joined and progress records
+        prefetched per chunk, so the history streams in a constant number of
+        queries per chunk.
+
+        Args:
+            student_id: ID of the student
+            chunk_size: Number of lessons fetched per query
+
+        Yields:
+            Dictionaries with the lesson and its latest progress record
+        """
+        from django.db.models import Prefetch
+        from .models import Lesson, StudentProgress
+
+        lessons = Lesson.objects.filter(student_id=student_id).select_related('tutor').prefetch_related(
+            Prefetch('studentprogress_set', queryset=StudentProgress.objects.order_by('-created_at'),
+                     to_attr='progress_list')
+        ).order_by('date', 'start_time')
+
+        for lesson in lessons.iterator(chunk_size=chunk_size):
+            progress = lesson.progress_list[0] if lesson.progress_list else None
+            yield self._lesson_history_row(lesson, progress)
+
+    def generate_comprehensive_report_data(self, student_id: int, lazy_history: bool = False,
+                                           student=None) -> Dict[str, Any]:
         """
         Generate comprehensive report data for PDF/CSV export.
         
         Args:
             student_id: ID of the student
+            lazy_history: Return lesson_history as a generator for streaming exports
+            student: The student with student_lessons (tutor joined, ordered by date
+                and start time) and progress_records (newest first) prefetched, as
+                from core.services.cohort_reports.cohort_students; no queries are
+                run when given
         
         Returns:
             Dictionary with comprehensive report data
@@ -418,37 +435,38 @@ class DrivingSchoolAI:
         from .models import User, Lesson, StudentProgress
         
         try:
-            student = User.objects.get(id=student_id, role='student')
-            lessons = Lesson.objects.filter(student=student).order_by('date', 'start_time')
-            progress_records = StudentProgress.objects.filter(student=student).order_by('-created_at')
+            if student is None:
+                student = User.objects.get(id=student_id, role='student')
+                lessons = list(Lesson.objects.filter(student=student).select_related('tutor')
+                               .order_by('date', 'start_time'))
+                progress_records = list(StudentProgress.objects.filter(student=student).order_by('-created_at'))
+            else:
+                lessons = list(student.student_lessons.all())
+                progress_records = list(student.progress_records.all())
             
             # Generate AI analysis
-            ai_analysis = self.analyze_student_progress(student_id)
-            ai_feedback = self.generate_progress_feedback(list(lessons), list(progress_records))
+            ai_analysis = self._analyze_progress(student, lessons, progress_records)
+            ai_feedback = self.generate_progress_feedback(lessons, progress_records)
             
             # Calculate statistics
             total_hours = sum(lesson.get_duration() for lesson in lessons) / 60.0
-            lessons_with_progress = progress_records.count()
-            completion_rate = (lessons_with_progress / lessons.count() * 100) if lessons.count() > 0 else 0
+            lessons_with_progress = len(progress_records)
+            completion_rate = (lessons_with_progress / len(lessons) * 100) if lessons else 0
             
             # Get recent activity
-            recent_lessons = lessons.filter(date__gte=timezone.now().date() - timedelta(days=30))
+            cutoff = timezone.now().date() - timedelta(days=30)
+            recent_lessons = sum(1 for lesson in lessons if lesson.date >= cutoff)
             
             # Prepare lesson data
-            lesson_data = []
-            for lesson in lessons:
-                progress = progress_records.filter(lesson=lesson).first()
-                lesson_data.append({
-                    'date': lesson.date,
-                    'time': f"{lesson.start_time.strftime('%H:%M')} - {lesson.end_time.strftime('%H:%M')}",
-                    'duration': lesson.get_duration(),
-                    'tutor': lesson.tutor.get_full_name() or lesson.tutor.username,
-                    'location': lesson.location,
-                    'skills_covered': progress.skills_covered if progress else 'Not recorded',
-                    'progress_notes': progress.progress_notes if progress else 'Not recorded',
-                    'instructor_feedback': progress.instructor_feedback if progress else 'Not recorded',
-                    'next_focus': progress.next_lesson_focus if progress else 'Not recorded'
-                })
+            if lazy_history:
+                lesson_data = self.iter_lesson_history(student.id)
+            else:
+                # progress_records is newest first, so the first record seen per lesson is its latest
+                latest_progress = {}
+                for record in progress_records:
+                    latest_progress.setdefault(record.lesson_id, record)
+                lesson_data = [self._lesson_history_row(lesson, latest_progress.get(lesson.id))
+                               for lesson in lessons]
             
             return {
                 'student_info': {
@@ -459,11 +477,11 @@ class DrivingSchoolAI:
                     'registration_date': student.date_joined.strftime('%Y-%m-%d')
                 },
                 'statistics': {
-                    'total_lessons': lessons.count(),
+                    'total_lessons': len(lessons),
                     'total_hours': round(total_hours, 1),
                     'lessons_with_progress': lessons_with_progress,
                     'completion_rate': round(completion_rate, 1),
-                    'recent_lessons_30_days': recent_lessons.count(),
+                    'recent_lessons_30_days': recent_lessons,
                     'progress_score': ai_analysis.get('progress_score', 0)
                 },
                 'ai_insights': {
@@ -492,41 +510,12 @@ class DrivingSchoolAI:
         Generate vehicle utilization report for admin dashboard.
         
         Returns:
-            Dictionary with vehicle utilization data
+            Dictionary with vehicle utilization data (see core.services.vehicle_utilization)
         """
-        from .models import Vehicle, VehicleAllocation, Lesson
+        from .services.vehicle_utilization import get_vehicle_utilization
         
         try:
-            vehicles = Vehicle.objects.all()
-            report_data = []
-            
-            for vehicle in vehicles:
-                # Count lessons in the last 30 days
-                recent_lessons = VehicleAllocation.objects.filter(
-                    vehicle=vehicle,
-                    lesson__date__gte=timezone.now().date() - timedelta(days=30)
-                ).count()
-                
-                # Calculate utilization percentage (assuming max 8 lessons per day)
-                max_possible_lessons = 30 * 8  # 30 days * 8 possible lessons per day
-                utilization = (recent_lessons / max_possible_lessons) * 100 if max_possible_lessons > 0 else 0
-                
-                report_data.append({
-                    'vehicle': vehicle,
-                    'recent_lessons': recent_lessons,
-                    'utilization_percentage': round(utilization, 1),
-                    'status': 'High' if utilization > 50 else 'Medium' if utilization > 20 else 'Low'
-                })
-            
-            # Sort by utilization
-            report_data.sort(key=lambda x: -x['utilization_percentage'])
-            
-            return {
-                'vehicles': report_data,
-                'total_vehicles': len(report_data),
-                'average_utilization': round(sum(v['utilization_percentage'] for v in report_data) / len(report_data), 1) if report_data else 0
-            }
-            
+            return get_vehicle_utilization()
         except Exception as e:
             self.logger.error(f"Error generating vehicle utilization report: {str(e)}")
             return {'vehicles': [], 'total_vehicles': 0, 'average_utilization': 0}
@@ -0,0 +1,144 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time as timer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.sqlite_tuning import apply_pragmas
+
+SCHEMA = """
+CREATE TABLE lesson (
+    id INTEGER PRIMARY KEY,
+    tutor_id INTEGER NOT NULL,
+    student_id INTEGER NOT NULL,
+    starts_at INTEGER NOT NULL,
+    ends_at INTEGER NOT NULL
+);
+CREATE INDEX lesson_tutor_starts ON lesson (tutor_id, starts_at, ends_at);
+CREATE INDEX lesson_student_starts ON lesson (student_id, starts_at, ends_at);
+"""
+
+CONFLICT_SQL = ("SELECT 1 FROM lesson WHERE (tutor_id = ? OR student_id = ?) "
+                "AND starts_at < ? AND ends_at > ? LIMIT 1")
+
+class Command(BaseCommand):
+    help = ('Measure concurrent booking and read throughput on a scratch SQLite file, with SQLite '
+            'defaults and with SQLITE_PRAGMAS and the configured transaction_mode')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4, help='Threads booking lessons')
+        parser.add_argument('--readers', type=int, default=4, help='Threads running conflict checks')
+        parser.add_argument('--bookings', type=int, default=200, help='Booking attempts per writer')
+        parser.add_argument('--timeout', type=float, default=5.0,
+                            help='sqlite3 connect timeout in seconds, as Django uses by default')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['writers'] < 1 or kwargs['bookings'] < 1 or kwargs['readers'] < 0:
+            raise CommandError('--writers and --bookings must be positive and --readers not negative')
+
+        options = settings.DATABASES['default'].get('OPTIONS', {})
+        modes = (
+            ('default', {}, 'DEFERRED'),
+            ('tuned', getattr(settings, 'SQLITE_PRAGMAS', {}), options.get('transaction_mode', 'DEFERRED')),
+        )
+        results = {}
+        for mode, pragmas, transaction_mode in modes:
+            with tempfile.TemporaryDirectory() as directory:
+                results[mode] = self._run(os.path.join(directory, 'bench.sqlite3'), pragmas, transaction_mode,
+                                          **kwargs)
+            result = results[mode]
+            self.stdout.write(
+                f"{mode:>8}: {result['booked']} booked, {result['conflicts']} conflicts, "
+                f"{result['locked']} 'database is locked' errors, "
+                f"{result['bookings_per_second']:.0f} bookings/s, {result['reads_per_second']:.0f} reads/s "
+                f"in {result['seconds']:.2f}s"
+            )
+
+        before, after = results['default'], results['tuned']
+        speedup = after['bookings_per_second'] / before['bookings_per_second'] if before['bookings_per_second'] else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Booking throughput x{speedup:.2f}; locked errors {before['locked']} -> {after['locked']}"
+        ))
+
+    def _run(self, path, pragmas, transaction_mode, writers, readers, bookings, timeout, **kwargs):
+        setup = sqlite3.connect(path, timeout=timeout)
+        apply_pragmas(setup, pragmas)
+        setup.executescript(SCHEMA)
+        setup.close()
+
+        counts = {'booked': 0, 'conflicts': 0, 'locked': 0, 'reads': 0}
+        lock = threading.Lock()
+        writers_done = threading.Event()
+        start_barrier = threading.Barrier(writers + readers)
+
+        def connect():
+            # Autocommit mode, so transactions are exactly the BEGIN/COMMIT issued below
+            conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+            apply_pragmas(conn, pragmas)
+            return conn
+
+        def book(worker):
+            conn = connect()
+            rng = random.Random(worker)
+            start_barrier.wait()
+            for _ in range(bookings):
+                tutor, student = rng.randrange(20), rng.randrange(200)
+                starts_at = rng.randrange(0, 30 * 24 * 60, 30)
+                outcome = 'booked'
+                try:
+                    # Same shape as the booking service: conflict check, then insert, in one transaction
+                    conn.execute(f'BEGIN {transaction_mode}')
+                    if conn.execute(CONFLICT_SQL, (tutor, student, starts_at + 60, starts_at)).fetchone():
+                        outcome = 'conflicts'
+                    else:
+                        conn.execute('INSERT INTO lesson (tutor_id, student_id, starts_at, ends_at) '
+                                     'VALUES (?, ?, ?, ?)', (tutor, student, starts_at, starts_at + 60))
+                    conn.execute('COMMIT')
+                except sqlite3.OperationalError:
+                    outcome = 'locked'
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+                with lock:
+                    counts[outcome] += 1
+            conn.close()
+
+        def read(worker):
+            conn = connect()
+            rng = random.Random(-worker)
+            reads = 0
+            start_barrier.wait()
+            while not writers_done.is_set():
+                starts_at = rng.randrange(0, 30 * 24 * 60, 30)
+                try:
+                    conn.execute(CONFLICT_SQL, (rng.randrange(20), rng.randrange(200),
+                                                starts_at + 60, starts_at)).fetchone()
+                    reads += 1
+                except sqlite3.OperationalError:
+                    with lock:
+                        counts['locked'] += 1
+            with lock:
+                counts['reads'] += reads
+            conn.close()
+
+        writer_threads = [threading.Thread(target=book, args=(i,)) for i in range(writers)]
+        reader_threads = [threading.Thread(target=read, args=(i,)) for i in range(readers)]
+        started = timer.perf_counter()
+        for thread in writer_threads + reader_threads:
+            thread.start()
+        for thread in writer_threads:
+            thread.join()
+        seconds = timer.perf_counter() - started
+        writers_done.set()
+        for thread in reader_threads:
+            thread.join()
+
+        return {
+            **counts,
+            'seconds': seconds,
+            'bookings_per_second': (counts['booked'] + counts['conflicts']) / seconds,
+            'reads_per_second': counts['reads'] / seconds,
+        }
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.cache_keys import NAMESPACES, bump_namespace
+
+class Command(BaseCommand):
+    help = 'Invalidate every cached entry in the given cache namespaces by bumping their versions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('namespaces', nargs='*', help=f'Namespaces to bump: {", ".join(NAMESPACES)}')
+        parser.add_argument('--all', action='store_true', help='Bump every namespace')
+
+    def handle(self, *args, **kwargs):
+        namespaces = list(NAMESPACES) if kwargs['all'] else kwargs['namespaces']
+        if not namespaces:
+            raise CommandError('Name at least one namespace or pass --all')
+        unknown = sorted(set(namespaces) - set(NAMESPACES))
+        if unknown:
+            raise CommandError(f'Unknown cache namespaces: {", ".join(unknown)}')
+
+        for namespace in namespaces:
+            version = bump_namespace(namespace)
+            self.stdout.write(self.style.SUCCESS(f'{namespace}: now at version {version}'))
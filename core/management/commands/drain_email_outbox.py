@@ -0,0 +1,30 @@
+import time as timer
+
+from django.core.management.base import BaseCommand
+
+from core.services.email_outbox import drain_outbox, outbox_metrics
+
+class Command(BaseCommand):
+    help = 'Send queued outbox emails in batches, once or continuously'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep draining until interrupted')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--batch-size', type=int, default=None, help='Emails claimed per batch')
+
+    def handle(self, *args, **kwargs):
+        while True:
+            stats = drain_outbox(batch_size=kwargs['batch_size'])
+            if stats['batches'] or not kwargs['loop']:
+                metrics = outbox_metrics()
+                self.stdout.write(self.style.SUCCESS(
+                    f"Sent {stats['sent']}, retrying {stats['retried']}, dead-lettered {stats['dead']} "
+                    f"in {stats['seconds']:.2f}s; {metrics['pending']} pending, {metrics['dead']} dead, "
+                    f"avg latency {metrics['avg_latency_seconds']}s, p95 {metrics['p95_latency_seconds']}s"
+                ))
+            if not kwargs['loop']:
+                break
+            try:
+                timer.sleep(kwargs['interval'])
+            except KeyboardInterrupt:
+                break
@@ -0,0 +1,54 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.cohort_reports import REPORT_FORMATS, CohortReportExport, cohort_students
+
+class Command(BaseCommand):
+    help = "Export progress reports for a cohort of students into a ZIP archive"
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', type=str, help='Path of the ZIP archive to write')
+        parser.add_argument('--tutor', type=int, default=None, help='Only students taught by this tutor id')
+        parser.add_argument('--from', dest='date_from', type=str, default=None,
+                            help='Only students with lessons on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', type=str, default=None,
+                            help='Only students with lessons on or before this date (YYYY-MM-DD)')
+        parser.add_argument('--level', type=str, default=None, help='Only students at this level, e.g. "Advanced"')
+        parser.add_argument('--formats', type=str, default=','.join(REPORT_FORMATS),
+                            help='Comma-separated report formats (pdf,csv)')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Rendering processes (defaults to the number of cores, 0 renders in-process)')
+
+    def _parse_date(self, value):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError('Dates must be in YYYY-MM-DD format.')
+
+    def handle(self, *args, **kwargs):
+        students = cohort_students(
+            tutor_id=kwargs['tutor'],
+            date_from=self._parse_date(kwargs['date_from']),
+            date_to=self._parse_date(kwargs['date_to']),
+            level=kwargs['level'],
+        )
+        formats = [fmt.strip().lower() for fmt in kwargs['formats'].split(',') if fmt.strip()]
+        try:
+            export = CohortReportExport(students, formats=formats, workers=kwargs['workers'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        with open(kwargs['output'], 'wb') as output:
+            for chunk in export.iter_zip():
+                output.write(chunk)
+
+        stats = export.stats
+        if stats['failed']:
+            self.stdout.write(self.style.WARNING(f"{stats['failed']} students could not be exported"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {stats['reports']} reports for {stats['students']} students to {kwargs['output']} "
+            f"in {stats['seconds']:.2f}s ({stats['reports_per_second']} reports/s, {export.workers} workers)"
+        ))
@@ -0,0 +1,37 @@
+import time as timer
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.services.fleet import reoptimize_day
+
+class Command(BaseCommand):
+    help = "Re-assign vehicles for a whole day's lessons in one sweep"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=str, default=None, help='Day to optimize (YYYY-MM-DD), defaults to today')
+        parser.add_argument('--dry-run', action='store_true', help='Show the result without writing allocations')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['date']:
+            try:
+                lesson_date = datetime.strptime(kwargs['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Date must be in YYYY-MM-DD format.')
+        else:
+            lesson_date = timezone.localdate()
+
+        started = timer.perf_counter()
+        result = reoptimize_day(lesson_date, dry_run=kwargs['dry_run'])
+        elapsed_ms = (timer.perf_counter() - started) * 1000
+
+        self.stdout.write(
+            f"{len(result['assignments'])} lessons assigned, {len(result['unassigned'])} unassigned, "
+            f"{result['class_mismatches']} class mismatches, {result['vehicle_swaps']} vehicle swaps"
+        )
+        if not kwargs['dry_run']:
+            self.stdout.write(
+                f"{result['created']} allocations created, {result['updated']} updated, {result['removed']} removed"
+            )
+        self.stdout.write(self.style.SUCCESS(f'Optimized vehicles for {lesson_date} in {elapsed_ms:.1f} ms'))
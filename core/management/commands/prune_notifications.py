@@ -0,0 +1,25 @@
+import time as timer
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.notification_service import PRUNE_BATCH_SIZE, NotificationService
+
+class Command(BaseCommand):
+    help = 'Delete read notifications older than the retention period, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Retention in days (defaults to NOTIFICATION_RETENTION_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=PRUNE_BATCH_SIZE, help='Notifications deleted per batch')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['days'] is not None and kwargs['days'] < 0:
+            raise CommandError('--days must not be negative')
+        if kwargs['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        start = timer.perf_counter()
+        deleted = NotificationService.prune_read(kwargs['days'], batch_size=kwargs['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} read notifications in {timer.perf_counter() - start:.2f}s'
+        ))
@@ -0,0 +1,14 @@
+import time as timer
+
+from django.core.management.base import BaseCommand
+
+from core.services.lesson_counters import reconcile_lessons_taken
+
+class Command(BaseCommand):
+    help = 'Recompute User.lessons_taken for every user in one set-based UPDATE'
+
+    def handle(self, *args, **kwargs):
+        started = timer.perf_counter()
+        updated = reconcile_lessons_taken()
+        elapsed_ms = (timer.perf_counter() - started) * 1000
+        self.stdout.write(self.style.SUCCESS(f'Recomputed lesson counters for {updated} users in {elapsed_ms:.1f} ms'))
@@ -1,9 +1,19 @@
 from django.core.management.base import BaseCommand
-from core.tasks import notify_upcoming_lessons
+
+from core.services.reminders import send_due_reminders
 
 class Command(BaseCommand):
-    help = 'Send notifications for lessons starting in 10 minutes'
+    help = 'Send reminders for upcoming lessons that fell due since the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lead', type=int, action='append', dest='leads',
+                            help='Lead time in minutes (repeatable; defaults to LESSON_REMINDER_LEAD_MINUTES)')
 
     def handle(self, *args, **kwargs):
-        notify_upcoming_lessons()
-        self.stdout.write(self.style.SUCCESS('Successfully sent lesson notifications'))
+        stats = send_due_reminders(lead_minutes=kwargs['leads'])
+        per_lead = ', '.join(f"{lead}m: {count}" for lead, count in stats['by_lead'].items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {stats['sent']} lesson reminders ({per_lead}) for "
+            f"{stats['window_start']:%Y-%m-%d %H:%M:%S} to {stats['window_end']:%Y-%m-%d %H:%M:%S} "
+            f"in {stats['seconds']:.2f}s"
+        ))
@@ -0,0 +1,125 @@
+"""
+Middleware for the core app.
+"""
+import logging
+import time as timer
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse
+
+from .profiling import RequestProfile, over_budget
+from .routers import has_written, routing_scope
+from .services.metrics import REQUEST_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Methods kept as a label value of the latency histogram; any other counts as 'other'
+METRIC_METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+
+# Set on the response of a request that wrote, so the user's next requests read from the primary
+REPLICA_PIN_COOKIE = 'primary_pinned'
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Read-your-writes for replica routing (core.routers).
+
+    Each request starts with fresh routing state. A request that writes sets a
+    short-lived cookie; while it is present, the user's reads stay on the
+    primary until the replicas have had REPLICA_STICKY_SECONDS to catch up.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with routing_scope(pinned=REPLICA_PIN_COOKIE in request.COOKIES):
+            response = self.get_response(request)
+            wrote = has_written()
+        if wrote:
+            response.set_cookie(
+                REPLICA_PIN_COOKIE, '1',
+                max_age=getattr(settings, 'REPLICA_STICKY_SECONDS', 15),
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class RequestProfilingMiddleware:
+    """
+    Log one line per request with its query count, SQL time, duplicate
+    queries, template render time and response size (core.profiling).
+
+    The line is a WARNING when the view exceeds REQUEST_BUDGET, or its entry in
+    REQUEST_BUDGET_OVERRIDES (by URL name). For a streamed response it is
+    written once the last chunk has been sent, so queries run while streaming
+    are counted. Disable with REQUEST_PROFILING = False.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILING', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        started = timer.perf_counter()
+        with profile.recording():
+            response = self.get_response(request)
+
+        # FileResponse is left alone so the server can still send the file with sendfile
+        if response.streaming and not response.is_async and not isinstance(response, FileResponse):
+            content = response.streaming_content
+            response.streaming_content = self._stream(request, response, content, profile, started)
+            return response
+
+        if not response.streaming:
+            profile.response_bytes = len(response.content)
+        elif response.has_header('Content-Length'):
+            profile.response_bytes = int(response['Content-Length'])
+        self._log(request, response, profile, started)
+        return response
+
+    def _stream(self, request, response, content, profile, started):
+        profile.response_bytes = 0
+        chunks = iter(content)
+        try:
+            while True:
+                with profile.recording():
+                    try:
+                        chunk = next(chunks)
+                    except StopIteration:
+                        return
+                profile.response_bytes += len(chunk)
+                yield chunk
+        finally:
+            self._log(request, response, profile, started)
+
+    def _log(self, request, response, profile, started):
+        total_ms = (timer.perf_counter() - started) * 1000
+        view = request.resolver_match.view_name if request.resolver_match else None
+        method = request.method if request.method in METRIC_METHODS else 'other'
+        REQUEST_SECONDS.labels(view=view or 'unmatched', method=method).observe(total_ms / 1000)
+        budget = {**getattr(settings, 'REQUEST_BUDGET', {}),
+                  **getattr(settings, 'REQUEST_BUDGET_OVERRIDES', {}).get(view, {})}
+        exceeded = over_budget(profile, total_ms, budget)
+
+        fields = {
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 1),
+            **profile.as_dict(),
+        }
+        line = ' '.join(f'{key}={value}' for key, value in fields.items())
+        if not exceeded:
+            logger.info(f"request {line}", extra={'request_profile': fields})
+            return
+
+        fields['over_budget'] = exceeded
+        repeated = profile.most_repeated()
+        detail = f' most_repeated={repeated[1]}x "{repeated[0][:200]}"' if repeated else ''
+        logger.warning(f"request {line} over_budget={','.join(exceeded)}{detail}",
+                       extra={'request_profile': fields})
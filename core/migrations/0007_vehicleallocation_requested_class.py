@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:04
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_requested_class(apps, schema_editor):
+    """Existing allocations were made class-first, so assume the vehicle's class was requested."""
+    Vehicle = apps.get_model('core', 'Vehicle')
+    VehicleAllocation = apps.get_model('core', 'VehicleAllocation')
+    VehicleAllocation.objects.update(
+        requested_class=Subquery(Vehicle.objects.filter(pk=OuterRef('vehicle_id')).values('vehicle_class')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_user_instructor_approved_user_lessons_taken_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicleallocation',
+            name='requested_class',
+            field=models.CharField(choices=[('class1', 'Class 1 - Light Vehicles'), ('class2', 'Class 2 - Medium Vehicles'), ('class3', 'Class 3 - Heavy Vehicles'), ('class4', 'Class 4 - Public Service Vehicles'), ('class5', 'Class 5 - Special Vehicles')], default='class1', max_length=10),
+        ),
+        migrations.RunPython(backfill_requested_class, migrations.RunPython.noop),
+    ]
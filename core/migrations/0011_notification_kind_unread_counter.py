@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:21
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_unread_notifications(apps, schema_editor):
+    User = apps.get_model('core', 'User')
+    Notification = apps.get_model('core', 'Notification')
+    unread_counts = Notification.objects.filter(
+        user=OuterRef('pk'), is_read=False
+    ).order_by().values('user').annotate(total=Count('pk')).values('total')
+    User.objects.update(unread_notifications=Coalesce(Subquery(unread_counts), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_lessonreminder_schedulercheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='kind',
+            field=models.CharField(choices=[('general', 'General'), ('registration', 'Registration'), ('lesson_booked', 'Lesson booked'), ('lesson_scheduled', 'Lesson scheduled'), ('lesson_rescheduled', 'Lesson rescheduled'), ('lesson_cancelled', 'Lesson cancelled'), ('lesson_reminder', 'Lesson reminder'), ('progress', 'Progress update'), ('payment_approved', 'Payment approved'), ('payment_rejected', 'Payment rejected')], default='general', max_length=30),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='unread_notifications',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_unread_notifications, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:52
+
+from datetime import datetime
+
+from django.db import migrations, models
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+
+def backfill_lesson_schedule(apps, schema_editor):
+    Lesson = apps.get_model('core', 'Lesson')
+    tz = timezone.get_default_timezone()
+    batch = []
+    for lesson in Lesson.objects.only('date', 'start_time', 'end_time').iterator(chunk_size=BATCH_SIZE):
+        lesson.starts_at = timezone.make_aware(datetime.combine(lesson.date, lesson.start_time), tz)
+        lesson.ends_at = timezone.make_aware(datetime.combine(lesson.date, lesson.end_time), tz)
+        lesson.duration_minutes = max(int((lesson.ends_at - lesson.starts_at).total_seconds() // 60), 0)
+        batch.append(lesson)
+        if len(batch) >= BATCH_SIZE:
+            Lesson.objects.bulk_update(batch, ['starts_at', 'ends_at', 'duration_minutes'])
+            batch = []
+    if batch:
+        Lesson.objects.bulk_update(batch, ['starts_at', 'ends_at', 'duration_minutes'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_notification_inbox_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='starts_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='ends_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='duration_minutes',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_lesson_schedule, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='lesson',
+            name='starts_at',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='lesson',
+            name='ends_at',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='lesson',
+            name='duration_minutes',
+            field=models.PositiveIntegerField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['tutor', 'starts_at', 'ends_at'], name='lesson_tutor_starts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['student', 'starts_at', 'ends_at'], name='lesson_student_starts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['starts_at'], name='lesson_starts_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:20
+
+from django.db import migrations
+
+# PostgreSQL only: the database itself rejects a lesson whose [starts_at, ends_at)
+# range overlaps another lesson of the same tutor or student. The constraints are
+# not part of the model state because other backends cannot create them.
+CONSTRAINTS = (
+    ('lesson_tutor_no_overlap', 'tutor_id'),
+    ('lesson_student_no_overlap', 'student_id'),
+)
+
+
+def add_exclusion_constraints(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    for name, column in CONSTRAINTS:
+        schema_editor.execute(
+            f"ALTER TABLE core_lesson ADD CONSTRAINT {name} EXCLUDE USING gist "
+            f"({column} WITH =, tstzrange(starts_at, ends_at, '[)') WITH &&)"
+        )
+
+
+def remove_exclusion_constraints(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in CONSTRAINTS:
+        schema_editor.execute(f'ALTER TABLE core_lesson DROP CONSTRAINT IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_scheduling_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_exclusion_constraints, remove_exclusion_constraints),
+    ]
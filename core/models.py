@@ -1,10 +1,59 @@
+from datetime import datetime
+
 from django.db import models
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager as DjangoUserManager
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.db.models.signals import post_save, post_delete
+from django.db.models import BooleanField, Case, CharField, Count, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
 from django.dispatch import receiver
 
+from .services.lesson_counters import counters_suspended_for
+from .services.live_events import publish_notifications
+
+# Lesson-count bands for a student's level: (upper bound inclusive, label)
+LEVEL_BANDS = (
+    (9, "Not eligible"),
+    (14, "Advanced"),
+    (19, "Intermediate"),
+    (30, "Beginner"),
+)
+LEVEL_EXCEEDED = "Exceeded maximum lessons"
+VID_MIN_LESSONS = 10
+
+
+class UserQuerySet(models.QuerySet):
+    def with_lesson_stats(self):
+        """
+        Annotate lesson_count, level and vid_eligible so the model helpers
+        don't run a COUNT per user.
+        """
+        lesson_counts = Lesson.objects.filter(
+            student=OuterRef('pk')
+        ).order_by().values('student').annotate(total=Count('pk')).values('total')
+
+        return self.annotate(
+            lesson_count=Coalesce(Subquery(lesson_counts), Value(0)),
+        ).annotate(
+            level=Case(
+                *[When(lesson_count__lte=upper, then=Value(label)) for upper, label in LEVEL_BANDS],
+                default=Value(LEVEL_EXCEEDED),
+                output_field=CharField(),
+            ),
+            vid_eligible=Case(
+                When(role__in=['admin', 'tutor'], then=Value(True)),
+                When(Q(lesson_count__gte=VID_MIN_LESSONS, instructor_approved=True), then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            ),
+        )
+
+
+class UserManager(DjangoUserManager.from_queryset(UserQuerySet)):
+    pass
+
+
 class User(AbstractUser):
     ROLE_CHOICES = (
         ('student', 'Student'),
@@ -31,8 +80,12 @@ class User(AbstractUser):
     payment_approved_at = models.DateTimeField(blank=True, null=True)
     profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
     lessons_taken = models.IntegerField(default=0)
+    # Denormalised count of unread notifications for dashboard badges (see NotificationService)
+    unread_notifications = models.PositiveIntegerField(default=0)
     instructor_approved = models.BooleanField(default=False)
 
+    objects = UserManager()
+
     def __str__(self):
         return self.username
 
@@ -40,61 +93,151 @@ class User(AbstractUser):
         """Check if user can access driving school services."""
         return self.role == 'student' and self.payment_status == 'approved'
 
+    def _lesson_count(self):
+        # Use the with_lesson_stats() annotation when the user was loaded through it
+        count = getattr(self, 'lesson_count', None)
+        if count is None:
+            count = self.student_lessons.count()
+        return count
+
     def get_level(self):
-        lessons = self.student_lessons.count()
-        if lessons < 10:
-            return "Not eligible"
-        elif 10 <= lessons <= 14:
-            return "Advanced"
-        elif 15 <= lessons <= 19:
-            return "Intermediate"
-        elif 20 <= lessons <= 30:
-            return "Beginner"
-        else:
-            return "Exceeded maximum lessons"
+        level = getattr(self, 'level', None)
+        if level is not None:
+            return level
+        lessons = self._lesson_count()
+        for upper, label in LEVEL_BANDS:
+            if lessons <= upper:
+                return label
+        return LEVEL_EXCEEDED
 
     @property
     def eligible_for_vid(self):
+        eligible = getattr(self, 'vid_eligible', None)
+        if eligible is not None:
+            return eligible
         # Admins and instructors are eligible since they already have licenses
         if self.role in ['admin', 'tutor']:
             return True
         # Students need 10+ lessons and instructor approval
-        return self.student_lessons.count() >= 10 and self.instructor_approved
+        return self._lesson_count() >= VID_MIN_LESSONS and self.instructor_approved
 
     @property
     def total_lessons(self):
-        return self.student_lessons.count()
+        return self._lesson_count()
 
     def clean(self):
         super().clean()
-        if self.pk and self.student_lessons.count() > 30:
+        if self.pk and self._lesson_count() > 30:
             raise ValidationError("Exceeded maximum lessons: cannot have more than 30 lessons taken.")
 
+def lesson_bounds(lesson_date, start_time, end_time):
+    """The aware start and end datetimes of a lesson given in the school's local time."""
+    tz = timezone.get_default_timezone()
+    return (timezone.make_aware(datetime.combine(lesson_date, start_time), tz),
+            timezone.make_aware(datetime.combine(lesson_date, end_time), tz))
+
+
+class LessonQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create bypasses save(), which keeps the schedule columns in sync
+        objs = list(objs)
+        for lesson in objs:
+            lesson.sync_schedule()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def overlapping(self, starts_at, ends_at):
+        """Lessons whose time range intersects [starts_at, ends_at)."""
+        return self.filter(starts_at__lt=ends_at, ends_at__gt=starts_at)
+
+
 class Lesson(models.Model):
+    # Derived from date, start_time and end_time by sync_schedule(); queryset
+    # update() calls that change those fields must set these as well
+    SCHEDULE_FIELDS = ('starts_at', 'ends_at', 'duration_minutes')
+
     student = models.ForeignKey(User, related_name='student_lessons', on_delete=models.CASCADE)
     tutor = models.ForeignKey(User, related_name='tutor_lessons', on_delete=models.CASCADE)
     date = models.DateField()
     start_time = models.TimeField()
     end_time = models.TimeField()
+    starts_at = models.DateTimeField(editable=False)
+    ends_at = models.DateTimeField(editable=False)
+    duration_minutes = models.PositiveIntegerField(editable=False)
     location = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = LessonQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Tutor and student overlap checks: one range scan per participant
+            models.Index(fields=['tutor', 'starts_at', 'ends_at'], name='lesson_tutor_starts_idx'),
+            models.Index(fields=['student', 'starts_at', 'ends_at'], name='lesson_student_starts_idx'),
+            # Reminder windows
+            models.Index(fields=['starts_at'], name='lesson_starts_idx'),
+            # Per-tutor and per-student lesson lists in date order (dashboards, reports)
+            models.Index(fields=['tutor', 'date', 'start_time'], name='lesson_tutor_date_idx'),
+            models.Index(fields=['student', 'date', 'start_time'], name='lesson_student_date_idx'),
+            # Day loads of the availability index and the admin's recent lessons
+            models.Index(fields=['date', 'start_time'], name='lesson_date_start_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so a reschedule onto another tutor can refresh both tutors' dashboards
+        instance._loaded_participants = (instance.__dict__.get('student_id'), instance.__dict__.get('tutor_id'))
+        return instance
+
+    def sync_schedule(self):
+        """Recompute starts_at, ends_at and duration_minutes from the date and times."""
+        for name in ('date', 'start_time', 'end_time'):
+            setattr(self, name, self._meta.get_field(name).to_python(getattr(self, name)))
+        self.starts_at, self.ends_at = lesson_bounds(self.date, self.start_time, self.end_time)
+        self.duration_minutes = max(int((self.ends_at - self.starts_at).total_seconds() // 60), 0)
+
+    def save(self, *args, **kwargs):
+        self.sync_schedule()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'date', 'start_time', 'end_time'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, *self.SCHEDULE_FIELDS}
+        super().save(*args, **kwargs)
+
     def get_duration(self):
-        start = timezone.datetime.combine(self.date, self.start_time)
-        end = timezone.datetime.combine(self.date, self.end_time)
-        duration = end - start
-        return int(duration.total_seconds() / 60)
+        return self.duration_minutes
 
     def __str__(self):
         return f"Lesson for {self.student.username} with {self.tutor.username} on {self.date}"
 
 class Notification(models.Model):
+    KIND_CHOICES = (
+        ('general', 'General'),
+        ('registration', 'Registration'),
+        ('lesson_booked', 'Lesson booked'),
+        ('lesson_scheduled', 'Lesson scheduled'),
+        ('lesson_rescheduled', 'Lesson rescheduled'),
+        ('lesson_cancelled', 'Lesson cancelled'),
+        ('lesson_reminder', 'Lesson reminder'),
+        ('progress', 'Progress update'),
+        ('payment_approved', 'Payment approved'),
+        ('payment_rejected', 'Payment rejected'),
+    )
+
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     message = models.TextField()
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES, default='general')
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Unread list, badge reconciliation and the unread inbox page
+            models.Index(fields=['user', 'is_read', 'created_at', 'id'], name='notif_user_read_created_idx'),
+            # Full inbox keyset pagination
+            models.Index(fields=['user', 'created_at', 'id'], name='notif_user_created_idx'),
+        ]
+
     def __str__(self):
         return f"Notification for {self.user.username}: {self.message[:20]}"
 
@@ -136,6 +279,7 @@ class Vehicle(models.Model):
 class VehicleAllocation(models.Model):
     lesson = models.OneToOneField(Lesson, on_delete=models.CASCADE, related_name='vehicle_allocation')
     vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE)
+    requested_class = models.CharField(max_length=10, choices=Vehicle.VEHICLE_CLASS_CHOICES, default='class1')
     allocated_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
@@ -149,16 +293,91 @@ class StudentProgress(models.Model):
     next_lesson_focus = models.TextField()
     instructor_feedback = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # A student's progress history, newest first
+            models.Index(fields=['student', 'created_at'], name='progress_student_created_idx'),
+        ]
     
     def __str__(self):
         return f"Progress for {self.student.username} - {self.lesson.date}"
 
+class OutboxEmail(models.Model):
+    """An email waiting to be sent by the outbox worker (see core.services.email_outbox)."""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead'),
+    )
+
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {self.to_email} ({self.status})"
+
+class LessonReminder(models.Model):
+    """A reminder already sent for a lesson at one lead time (see core.services.reminders)."""
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='reminders')
+    lead_minutes = models.PositiveIntegerField()
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['lesson', 'lead_minutes'], name='unique_lesson_reminder'),
+        ]
+
+    def __str__(self):
+        return f"{self.lead_minutes} minute reminder for lesson {self.lesson_id}"
+
+class SchedulerCheckpoint(models.Model):
+    """End of the last time window a periodic scanner processed successfully."""
+    name = models.CharField(max_length=100, unique=True)
+    last_run_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_run_at}"
+
 @receiver(post_save, sender=Lesson)
-def update_lessons_taken_on_save(sender, instance, **kwargs):
-    instance.student.lessons_taken = instance.student.student_lessons.count()
-    instance.student.save(update_fields=['lessons_taken'])
+def update_lessons_taken_on_save(sender, instance, created, raw=False, **kwargs):
+    # Only a new lesson changes the count; updates and reschedules leave it alone
+    if not created or raw or counters_suspended_for(instance.student_id):
+        return
+    User.objects.filter(pk=instance.student_id).update(lessons_taken=F('lessons_taken') + 1)
 
 @receiver(post_delete, sender=Lesson)
 def update_lessons_taken_on_delete(sender, instance, **kwargs):
-    instance.student.lessons_taken = instance.student.student_lessons.count()
-    instance.student.save(update_fields=['lessons_taken'])
+    if counters_suspended_for(instance.student_id):
+        return
+    User.objects.filter(pk=instance.student_id).update(lessons_taken=Greatest(F('lessons_taken') - 1, 0))
+
+@receiver(post_save, sender=Notification)
+def update_unread_notifications_on_save(sender, instance, created, raw=False, **kwargs):
+    # Single creates are counted and published here; NotificationService handles its bulk inserts itself
+    if not created or raw or instance.is_read:
+        return
+    User.objects.filter(pk=instance.user_id).update(unread_notifications=F('unread_notifications') + 1)
+    publish_notifications([instance])
+
+@receiver(post_delete, sender=Notification)
+def update_unread_notifications_on_delete(sender, instance, **kwargs):
+    if instance.is_read:
+        return
+    User.objects.filter(pk=instance.user_id).update(
+        unread_notifications=Greatest(F('unread_notifications') - 1, 0)
+    )
@@ -0,0 +1,132 @@
+"""
+Per-request profiling: SQL queries and template rendering.
+
+RequestProfile is installed with connection.execute_wrapper() on every
+database alias while a request runs (core.middleware.RequestProfilingMiddleware)
+and keeps only counters, so it is cheap enough to leave on in production.
+Template rendering is timed by the DjangoTemplates backend below, configured
+in TEMPLATES; render time includes SQL run from the template.
+"""
+import contextvars
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+# The profile of the request being handled in this context, if any
+_current_profile = contextvars.ContextVar('request_profile', default=None)
+
+
+class RequestProfile:
+    """Query and render counters for one request; also the execute wrapper that fills them."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.render_seconds = 0.0
+        self.response_bytes: Optional[int] = None
+        self.statements: Counter = Counter()
+        self.executions: Counter = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += time.perf_counter() - started
+            self.queries += 1
+            self.statements[sql] += 1
+            if not many:
+                try:
+                    self.executions[sql, tuple(params) if isinstance(params, list) else params] += 1
+                except TypeError:
+                    pass  # unhashable parameters, e.g. a dict or an array value; not counted as duplicates
+
+    @property
+    def duplicate_queries(self) -> int:
+        """Queries that repeated an earlier one exactly, parameters included."""
+        return sum(count - 1 for count in self.executions.values())
+
+    @property
+    def similar_queries(self) -> int:
+        """Queries that repeated an earlier SQL statement with any parameters (N+1 patterns)."""
+        return sum(count - 1 for count in self.statements.values())
+
+    def most_repeated(self) -> Optional[Tuple[str, int]]:
+        """Return the most executed SQL statement and its count, if any ran more than once."""
+        if not self.statements:
+            return None
+        sql, count = self.statements.most_common(1)[0]
+        return (sql, count) if count > 1 else None
+
+    @contextmanager
+    def recording(self):
+        """Record queries on every database alias and template renders in this context."""
+        token = _current_profile.set(self)
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(self))
+                yield
+        finally:
+            _current_profile.reset(token)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'queries': self.queries,
+            'sql_ms': round(self.sql_seconds * 1000, 1),
+            'duplicate_queries': self.duplicate_queries,
+            'similar_queries': self.similar_queries,
+            'render_ms': round(self.render_seconds * 1000, 1),
+            'response_bytes': self.response_bytes,
+        }
+
+
+def over_budget(profile: RequestProfile, total_ms: float, budget: Dict[str, Any]) -> List[str]:
+    """
+    Return which budgets a request exceeded.
+
+    Args:
+        profile: The request's profile.
+        total_ms: Time to handle the request, in milliseconds.
+        budget: {'queries': max queries, 'latency_ms': max milliseconds}; a
+            missing or None limit is not checked.
+
+    Returns:
+        A list containing 'queries' and/or 'latency'.
+    """
+    exceeded = []
+    if budget.get('queries') is not None and profile.queries > budget['queries']:
+        exceeded.append('queries')
+    if budget.get('latency_ms') is not None and total_ms > budget['latency_ms']:
+        exceeded.append('latency')
+    return exceeded
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        profile = _current_profile.get()
+        if profile is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            profile.render_seconds += time.perf_counter() - started
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """The Django template backend, timing each render into the current RequestProfile."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
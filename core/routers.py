@@ -0,0 +1,129 @@
+"""
+Database routing between the primary and its read replicas.
+
+Every write goes to 'default'. Reads go to a replica alias from
+DATABASE_REPLICAS only inside use_replica(), which wraps the heavy read-only
+paths (progress exports and reports), and only while the current request has
+not written anything: after a write, and for REPLICA_STICKY_SECONDS afterwards
+for the user who wrote (see core.middleware.ReplicaStickinessMiddleware),
+reads stay on the primary so users see their own changes despite replication
+lag. Values for the shared cache are built inside use_primary(), as a lagging
+replica's result would be served to every user until the entry expires.
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, List
+
+from django.conf import settings
+
+PRIMARY = 'default'
+
+# Set by use_replica(): reads in this context may go to a replica
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+# Set for a request from a user who wrote recently
+_primary_pinned = contextvars.ContextVar('primary_pinned', default=False)
+# Set after a write in this context
+_wrote = contextvars.ContextVar('wrote', default=False)
+
+# Writes that do not make replica data stale for the user (the session is saved on every request)
+IGNORED_WRITE_APPS = ('sessions',)
+
+
+def replica_aliases() -> List[str]:
+    """Return the configured replica aliases."""
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+@contextmanager
+def use_replica():
+    """
+    Allow reads to go to a replica; usable as a context manager or a decorator.
+
+    Writes still go to the primary, and after the first one the remaining
+    reads in the same context do too.
+    """
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Keep reads on the primary, even inside use_replica()."""
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def routing_scope(pinned: bool = False):
+    """
+    Start fresh routing state, e.g. for one request.
+
+    Args:
+        pinned: Keep every read on the primary, for a user who wrote recently.
+    """
+    pin_token, wrote_token = _primary_pinned.set(pinned), _wrote.set(False)
+    try:
+        yield
+    finally:
+        _wrote.reset(wrote_token)
+        _primary_pinned.reset(pin_token)
+
+
+def has_written() -> bool:
+    """Return True if the current context has written to the primary."""
+    return _wrote.get()
+
+
+def iterate_in_context(iterable: Iterable[Any]) -> Iterator[Any]:
+    """
+    Iterate in a snapshot of the current context.
+
+    A streamed response is consumed after the view has returned, outside
+    use_replica(); this keeps the view's routing for the queries run while
+    the rows are produced.
+    """
+    # Taken now, not on the first next() as the body of a generator would be
+    return _iterate(contextvars.copy_context(), iter(iterable))
+
+
+def _iterate(context: contextvars.Context, iterator: Iterator[Any]) -> Iterator[Any]:
+    while True:
+        try:
+            item = context.run(next, iterator)
+        except StopIteration:
+            return
+        yield item
+
+
+class ReplicaRouter:
+    """Send writes to the primary and use_replica() reads to a replica."""
+
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get() or _primary_pinned.get() or _wrote.get():
+            return None
+        replicas = replica_aliases()
+        if not replicas:
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in IGNORED_WRITE_APPS:
+            _wrote.set(True)
+        # Explicit, or an instance read from a replica would be saved back to it
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
@@ -0,0 +1,263 @@
+"""
+In-memory availability index for tutors, students and vehicles.
+
+Loads every lesson (together with its vehicle allocation) for a date range in a
+single query and answers slot suggestion, conflict and vehicle availability
+questions from memory, so callers run in a constant number of queries no matter
+how many slots or resources they check.
+"""
+import logging
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import date, time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+TUTOR = 'tutor'
+STUDENT = 'student'
+VEHICLE = 'vehicle'
+
+
+def to_minutes(value: time) -> int:
+    """Convert a time of day to minutes since midnight."""
+    return value.hour * 60 + value.minute
+
+
+def hourly_slots(first_hour: int = 8, last_hour: int = 18) -> List[Tuple[time, time]]:
+    """
+    Build the default one-hour lesson slots (8 AM to 6 PM).
+
+    Args:
+        first_hour: Hour the first slot starts at.
+        last_hour: Hour the last slot ends at.
+
+    Returns:
+        List of (start_time, end_time) tuples.
+    """
+    return [(time(hour, 0), time(hour + 1, 0)) for hour in range(first_hour, last_hour)]
+
+
+class IntervalList:
+    """Busy intervals of a single resource on a single day, sorted by start minute."""
+
+    def __init__(self):
+        self._starts: List[int] = []
+        self._items: List[Tuple[int, int, Optional[int]]] = []
+        self._max_length = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, start: int, end: int, lesson_id: Optional[int] = None) -> None:
+        position = bisect_right(self._starts, start)
+        self._starts.insert(position, start)
+        self._items.insert(position, (start, end, lesson_id))
+        self._max_length = max(self._max_length, end - start)
+
+    def remove(self, lesson_id: int) -> None:
+        for position, item in enumerate(self._items):
+            if item[2] == lesson_id:
+                del self._starts[position]
+                del self._items[position]
+                return
+
+    def overlaps(self, start: int, end: int, exclude_lesson_id: Optional[int] = None) -> bool:
+        """Return True if any interval intersects [start, end)."""
+        # Only intervals starting before `end` can overlap, and none starting
+        # more than the longest interval before `start` can reach it.
+        position = bisect_left(self._starts, end)
+        earliest = start - self._max_length
+        for item_position in range(position - 1, -1, -1):
+            item_start, item_end, item_id = self._items[item_position]
+            if item_start < earliest:
+                break
+            if item_end > start and (exclude_lesson_id is None or item_id != exclude_lesson_id):
+                return True
+        return False
+
+
+class AvailabilityIndex:
+    """
+    Snapshot of who and what is busy over a date range.
+
+    Usage:
+        index = AvailabilityIndex.load(lesson_date)
+        if not index.has_conflict(tutor.id, student.id, lesson_date, start, end):
+            vehicles = index.available_vehicles(lesson_date, start, end)
+    """
+
+    def __init__(self, date_from: date, date_to: Optional[date] = None, tracks_vehicles: bool = True):
+        self.date_from = date_from
+        self.date_to = date_to or date_from
+        self.tracks_vehicles = tracks_vehicles
+        self._busy: Dict[Tuple[str, int, date], IntervalList] = defaultdict(IntervalList)
+        self._lessons: Dict[int, Tuple[int, int, date, int, int, Optional[int]]] = {}
+        self._vehicles = None
+
+    @classmethod
+    def load(cls, date_from: date, date_to: Optional[date] = None,
+             tutor_ids: Optional[Iterable[int]] = None,
+             student_ids: Optional[Iterable[int]] = None) -> 'AvailabilityIndex':
+        """
+        Load all lessons and vehicle allocations for a date range in one query.
+
+        Args:
+            date_from: First date covered by the index.
+            date_to: Last date covered by the index (defaults to date_from).
+            tutor_ids: Optionally restrict the index to these tutors' lessons.
+            student_ids: Optionally restrict the index to these students' lessons.
+
+        Returns:
+            A populated AvailabilityIndex. When restricted to specific tutors or
+            students it cannot answer vehicle questions.
+        """
+        from ..models import Lesson
+
+        restricted = tutor_ids is not None or student_ids is not None
+        index = cls(date_from, date_to, tracks_vehicles=not restricted)
+
+        lessons = Lesson.objects.filter(date__range=(index.date_from, index.date_to))
+        if restricted:
+            participants = Q()
+            if tutor_ids is not None:
+                participants |= Q(tutor_id__in=list(tutor_ids))
+            if student_ids is not None:
+                participants |= Q(student_id__in=list(student_ids))
+            lessons = lessons.filter(participants)
+
+        rows = lessons.values_list(
+            'id', 'tutor_id', 'student_id', 'date', 'start_time', 'end_time',
+            'vehicle_allocation__vehicle_id'
+        )
+        for lesson_id, tutor_id, student_id, lesson_date, start_time, end_time, vehicle_id in rows:
+            index.add_lesson(lesson_id, tutor_id, student_id, lesson_date, start_time, end_time, vehicle_id)
+
+        logger.debug(f"Availability index loaded {len(index._lessons)} lessons "
+                     f"for {index.date_from} - {index.date_to}")
+        return index
+
+    def add_lesson(self, lesson_id: Optional[int], tutor_id: int, student_id: int, lesson_date: date,
+                   start_time: time, end_time: time, vehicle_id: Optional[int] = None) -> None:
+        """Record a lesson as busy time for its tutor, student and vehicle."""
+        start, end = to_minutes(start_time), to_minutes(end_time)
+        self._busy[(TUTOR, tutor_id, lesson_date)].add(start, end, lesson_id)
+        self._busy[(STUDENT, student_id, lesson_date)].add(start, end, lesson_id)
+        if vehicle_id is not None:
+            self._busy[(VEHICLE, vehicle_id, lesson_date)].add(start, end, lesson_id)
+        if lesson_id is not None:
+            self._lessons[lesson_id] = (tutor_id, student_id, lesson_date, start, end, vehicle_id)
+
+    def allocate_vehicle(self, lesson_id: int, vehicle_id: int) -> None:
+        """Record a vehicle allocation for a lesson already in the index."""
+        tutor_id, student_id, lesson_date, start, end, _ = self._lessons[lesson_id]
+        self._busy[(VEHICLE, vehicle_id, lesson_date)].add(start, end, lesson_id)
+        self._lessons[lesson_id] = (tutor_id, student_id, lesson_date, start, end, vehicle_id)
+
+    def remove_lesson(self, lesson_id: int) -> None:
+        """Forget a lesson, freeing its tutor, student and vehicle."""
+        entry = self._lessons.pop(lesson_id, None)
+        if entry is None:
+            return
+        tutor_id, student_id, lesson_date, _, _, vehicle_id = entry
+        self._busy[(TUTOR, tutor_id, lesson_date)].remove(lesson_id)
+        self._busy[(STUDENT, student_id, lesson_date)].remove(lesson_id)
+        if vehicle_id is not None:
+            self._busy[(VEHICLE, vehicle_id, lesson_date)].remove(lesson_id)
+
+    def _is_free(self, kind: str, resource_id: int, lesson_date: date, start_time: time,
+                 end_time: time, exclude_lesson_id: Optional[int] = None) -> bool:
+        intervals = self._busy.get((kind, resource_id, lesson_date))
+        if not intervals:
+            return True
+        return not intervals.overlaps(to_minutes(start_time), to_minutes(end_time), exclude_lesson_id)
+
+    def tutor_is_free(self, tutor_id: int, lesson_date: date, start_time: time, end_time: time,
+                      exclude_lesson_id: Optional[int] = None) -> bool:
+        return self._is_free(TUTOR, tutor_id, lesson_date, start_time, end_time, exclude_lesson_id)
+
+    def student_is_free(self, student_id: int, lesson_date: date, start_time: time, end_time: time,
+                        exclude_lesson_id: Optional[int] = None) -> bool:
+        return self._is_free(STUDENT, student_id, lesson_date, start_time, end_time, exclude_lesson_id)
+
+    def vehicle_is_free(self, vehicle_id: int, lesson_date: date, start_time: time, end_time: time,
+                        exclude_lesson_id: Optional[int] = None) -> bool:
+        return self._is_free(VEHICLE, vehicle_id, lesson_date, start_time, end_time, exclude_lesson_id)
+
+    def has_conflict(self, tutor_id: int, student_id: int, lesson_date: date, start_time: time,
+                     end_time: time, exclude_lesson_id: Optional[int] = None) -> bool:
+        """
+        Check whether the tutor or the student is already booked in the given window.
+
+        Args:
+            tutor_id: ID of the tutor
+            student_id: ID of the student
+            lesson_date: The date of the lesson
+            start_time: Start time of the lesson
+            end_time: End time of the lesson
+            exclude_lesson_id: Lesson to ignore (e.g. the one being rescheduled)
+
+        Returns:
+            True if either participant is busy.
+        """
+        return not (
+            self.tutor_is_free(tutor_id, lesson_date, start_time, end_time, exclude_lesson_id) and
+            self.student_is_free(student_id, lesson_date, start_time, end_time, exclude_lesson_id)
+        )
+
+    @property
+    def vehicles(self) -> list:
+        """Vehicles marked as available, loaded once on first use."""
+        if not self.tracks_vehicles:
+            raise RuntimeError("This availability index was restricted to tutors/students "
+                               "and does not track vehicle allocations.")
+        if self._vehicles is None:
+            from ..models import Vehicle
+            self._vehicles = list(Vehicle.objects.filter(is_available=True))
+        return self._vehicles
+
+    def available_vehicles(self, lesson_date: date, start_time: time, end_time: time,
+                           vehicle_class: Optional[str] = None) -> list:
+        """
+        List vehicles free for the whole window.
+
+        Args:
+            lesson_date: The date of the lesson
+            start_time: Start time of the lesson
+            end_time: End time of the lesson
+            vehicle_class: Only return vehicles of this class (optional)
+
+        Returns:
+            List of Vehicle instances in the model's default ordering.
+        """
+        return [
+            vehicle for vehicle in self.vehicles
+            if (vehicle_class is None or vehicle.vehicle_class == vehicle_class) and
+            self.vehicle_is_free(vehicle.id, lesson_date, start_time, end_time)
+        ]
+
+    def free_slots(self, tutor_id: int, student_id: int, lesson_date: date,
+                   slots: Optional[List[Tuple[time, time]]] = None) -> List[Dict]:
+        """
+        List the slots where tutor and student are free, with vehicle counts.
+
+        Args:
+            tutor_id: ID of the tutor
+            student_id: ID of the student
+            lesson_date: The date to check
+            slots: Candidate (start_time, end_time) slots, hourly 8-18 by default
+
+        Returns:
+            List of dicts with start_time, end_time and available_vehicles.
+        """
+        free = []
+        for start_time, end_time in slots or hourly_slots():
+            if self.has_conflict(tutor_id, student_id, lesson_date, start_time, end_time):
+                continue
+            entry = {'start_time': start_time, 'end_time': end_time}
+            if self.tracks_vehicles:
+                entry['available_vehicles'] = len(self.available_vehicles(lesson_date, start_time, end_time))
+            free.append(entry)
+        return free
@@ -0,0 +1,262 @@
+"""
+Atomic booking service.
+
+The conflict check, lesson insert and vehicle allocation run in one transaction.
+The tutor and student rows are locked with SELECT ... FOR UPDATE (and candidate
+vehicles with SKIP LOCKED), so two bookings for the same people queue for the
+lock and the second sees the first in its conflict check; it only fails with
+BookingConflict if the slots overlap. Bookings for unrelated tutors and
+students proceed in parallel. SQLite has no row locks: transactions there take the
+database write lock when they begin (transaction_mode IMMEDIATE), so concurrent
+bookings queue for up to the busy timeout and then see the earlier booking in
+their conflict check; a booking still waiting when the timeout expires fails
+with "database is locked", which is reported the same way.
+
+On PostgreSQL, exclusion constraints on the lesson table reject overlapping
+lessons for a tutor or student (migration 0015). The participant locks and the
+conflict query are skipped there, and a violation is reported as a conflict.
+"""
+import logging
+from datetime import date, time
+from typing import Any, Dict, Optional, Tuple
+
+from django.db import IntegrityError, OperationalError, connections, router, transaction
+from django.db.models import Q
+
+from .metrics import BOOKINGS, VEHICLE_ALLOCATIONS, VEHICLE_ALLOCATION_SECONDS
+
+logger = logging.getLogger(__name__)
+
+CONFLICT_MESSAGE = 'This time slot is already booked for you or the tutor.'
+BUSY_MESSAGE = 'This time slot is being booked by someone else right now. Please try again.'
+
+# SQLSTATE raised when a row violates an exclusion constraint
+EXCLUSION_VIOLATION = '23P01'
+
+
+class BookingConflict(Exception):
+    """Raised when a lesson cannot be booked because the slot is taken or being claimed."""
+
+
+def database_enforces_overlaps() -> bool:
+    """True when the lesson table's database rejects overlapping lessons by itself."""
+    from ..models import Lesson
+
+    return connections[router.db_for_write(Lesson)].vendor == 'postgresql'
+
+
+def is_overlap_violation(error: Exception) -> bool:
+    """True if a database error was raised by a lesson overlap exclusion constraint."""
+    cause = error.__cause__
+    # psycopg 3 exposes sqlstate, psycopg2 pgcode
+    return EXCLUSION_VIOLATION in (getattr(cause, 'sqlstate', None), getattr(cause, 'pgcode', None))
+
+
+def _race_lost(error: Exception) -> BookingConflict:
+    return BookingConflict(CONFLICT_MESSAGE if is_overlap_violation(error) else BUSY_MESSAGE)
+
+
+def _lock_participants(*user_ids: int) -> None:
+    """Lock the tutor and student rows in a stable order to avoid deadlocks."""
+    from ..models import User
+
+    list(
+        User.objects.select_for_update()
+        .filter(pk__in=user_ids)
+        .order_by('pk')
+        .values_list('pk', flat=True)
+    )
+
+
+def conflicting_lessons(tutor_id: int, student_id: int, lesson_date: date, start_time: time,
+                        end_time: time, exclude_lesson_id: Optional[int] = None):
+    """Lessons of the tutor or the student that overlap the given window."""
+    from ..models import Lesson, lesson_bounds
+
+    clashes = Lesson.objects.overlapping(*lesson_bounds(lesson_date, start_time, end_time)).filter(
+        Q(tutor_id=tutor_id) | Q(student_id=student_id)
+    )
+    if exclude_lesson_id is not None:
+        clashes = clashes.exclude(pk=exclude_lesson_id)
+    return clashes
+
+
+def _check_conflicts(tutor_id: int, student_id: int, lesson_date: date, start_time: time,
+                     end_time: time, exclude_lesson_id: Optional[int] = None) -> None:
+    if conflicting_lessons(tutor_id, student_id, lesson_date, start_time, end_time, exclude_lesson_id).exists():
+        raise BookingConflict(CONFLICT_MESSAGE)
+
+
+def allocate_vehicle(lesson, student_class: str = 'class1') -> Tuple[Optional[Any], Dict[str, Any]]:
+    """
+    Allocate the best free vehicle to a lesson, skipping vehicles another booking is claiming.
+
+    Must run inside a transaction so the vehicle row lock is held until commit.
+
+    Args:
+        lesson (Lesson): The lesson to allocate a vehicle for.
+        student_class (str): The driving class of the student.
+
+    Returns:
+        Tuple[VehicleAllocation, Dict]: The created vehicle allocation (or None) and allocation info.
+    """
+    with VEHICLE_ALLOCATION_SECONDS.time():
+        allocation, allocation_info = _allocate_vehicle(lesson, student_class)
+
+    if allocation is None:
+        VEHICLE_ALLOCATIONS.labels(result='none').inc()
+    elif allocation.vehicle.vehicle_class == student_class:
+        VEHICLE_ALLOCATIONS.labels(result='requested_class').inc()
+    else:
+        VEHICLE_ALLOCATIONS.labels(result='fallback').inc()
+    return allocation, allocation_info
+
+
+def _allocate_vehicle(lesson, student_class: str) -> Tuple[Optional[Any], Dict[str, Any]]:
+    from ..ai_helper import ai_helper
+    from ..models import Vehicle, VehicleAllocation
+    from .fleet import FleetAllocator
+
+    allocator = FleetAllocator.load(lesson.date)
+    suggestions = ai_helper.suggest_available_vehicles(
+        lesson.date, lesson.start_time, lesson.end_time, student_class, allocator=allocator
+    )
+
+    allocation_info = {
+        'success': False,
+        'message': 'No vehicle available for this time slot.',
+        'vehicle_info': None,
+        'suggestions_count': len(suggestions),
+        'recommendation': None
+    }
+
+    for suggestion in suggestions:
+        vehicle = suggestion['vehicle']
+
+        # Another booking holds this vehicle: try the next suggestion instead of waiting
+        locked = Vehicle.objects.select_for_update(skip_locked=True).filter(pk=vehicle.pk)
+        if not list(locked.values_list('pk', flat=True)):
+            continue
+
+        # Re-check under the lock; the suggestion was computed before it was taken
+        if VehicleAllocation.objects.filter(
+            vehicle=vehicle,
+            lesson__starts_at__lt=lesson.ends_at,
+            lesson__ends_at__gt=lesson.starts_at
+        ).exists():
+            continue
+
+        allocation = VehicleAllocation.objects.create(lesson=lesson, vehicle=vehicle,
+                                                      requested_class=student_class)
+        allocation_info.update({
+            'success': True,
+            'message': f"Vehicle {vehicle.registration_number} allocated successfully!",
+            'vehicle_info': {
+                'registration_number': vehicle.registration_number,
+                'make': vehicle.make,
+                'model': vehicle.model,
+                'vehicle_class': vehicle.get_vehicle_class_display(),
+                'vehicle_type': vehicle.get_vehicle_type_display()
+            },
+            'recommendation': suggestion['recommendation'],
+            'confidence': suggestion['confidence']
+        })
+        logger.info(f"AI-suggested vehicle {vehicle.registration_number} allocated to lesson {lesson.id} "
+                    f"(confidence: {suggestion['confidence']}%)")
+        return allocation, allocation_info
+
+    logger.warning(f"No suitable vehicle available for lesson {lesson.id} on {lesson.date} "
+                   f"{lesson.start_time}-{lesson.end_time} (class: {student_class})")
+
+    if not suggestions:
+        # Check if there are vehicles available at different times
+        class_vehicle = next((v for v in allocator.vehicles if v.vehicle_class == student_class), None)
+        if class_vehicle:
+            allocation_info['message'] = (
+                f"No {class_vehicle.get_vehicle_class_display()} "
+                f"vehicles available at this time. Try a different time slot or contact admin."
+            )
+        else:
+            allocation_info['message'] = (
+                f"No {student_class} vehicles are currently available. "
+                f"Please contact admin or try a different vehicle class."
+            )
+
+    return None, allocation_info
+
+
+def book_lesson(student, tutor, lesson_date: date, start_time: time, end_time: time,
+                location: str, student_class: str = 'class1'):
+    """
+    Book a lesson and allocate a vehicle atomically.
+
+    Args:
+        student (User): The student booking the lesson.
+        tutor (User): The tutor for the lesson.
+        lesson_date: The date of the lesson.
+        start_time: Start time of the lesson.
+        end_time: End time of the lesson.
+        location: Where the lesson takes place.
+        student_class: The driving class used to pick a vehicle.
+
+    Returns:
+        Tuple[Lesson, Dict]: The created lesson and the vehicle allocation info.
+
+    Raises:
+        BookingConflict: If the slot is taken or another booking is claiming it.
+    """
+    from ..models import Lesson
+
+    try:
+        with transaction.atomic():
+            if not database_enforces_overlaps():
+                _lock_participants(student.pk, tutor.pk)
+                _check_conflicts(tutor.pk, student.pk, lesson_date, start_time, end_time)
+            lesson = Lesson.objects.create(
+                student=student,
+                tutor=tutor,
+                date=lesson_date,
+                start_time=start_time,
+                end_time=end_time,
+                location=location
+            )
+            _, allocation_info = allocate_vehicle(lesson, student_class)
+    except BookingConflict:
+        BOOKINGS.labels(operation='book', outcome='conflict').inc()
+        raise
+    except (OperationalError, IntegrityError) as e:
+        logger.warning(f"Booking for {student.username} with {tutor.username} on {lesson_date} "
+                       f"lost a concurrent race: {e}")
+        BOOKINGS.labels(operation='book', outcome='conflict' if is_overlap_violation(e) else 'busy').inc()
+        raise _race_lost(e) from e
+
+    BOOKINGS.labels(operation='book', outcome='booked').inc()
+    return lesson, allocation_info
+
+
+def reschedule_lesson(lesson) -> None:
+    """
+    Save a lesson whose date or times were changed, checking conflicts under lock.
+
+    Args:
+        lesson (Lesson): The lesson with its new date and times set but not yet saved.
+
+    Raises:
+        BookingConflict: If the new slot is taken or another booking is claiming it.
+    """
+    try:
+        with transaction.atomic():
+            if not database_enforces_overlaps():
+                _lock_participants(lesson.student_id, lesson.tutor_id)
+                _check_conflicts(lesson.tutor_id, lesson.student_id, lesson.date,
+                                 lesson.start_time, lesson.end_time, exclude_lesson_id=lesson.pk)
+            lesson.save()
+    except BookingConflict:
+        BOOKINGS.labels(operation='reschedule', outcome='conflict').inc()
+        raise
+    except (OperationalError, IntegrityError) as e:
+        logger.warning(f"Reschedule of lesson {lesson.pk} lost a concurrent race: {e}")
+        BOOKINGS.labels(operation='reschedule', outcome='conflict' if is_overlap_violation(e) else 'busy').inc()
+        raise _race_lost(e) from e
+
+    BOOKINGS.labels(operation='reschedule', outcome='booked').inc()
@@ -0,0 +1,92 @@
+"""
+Namespaced, versioned cache keys.
+
+Cached objects are grouped in namespaces (dashboards, reports, ...). Every key
+embeds its namespace's current version, which is itself stored in the cache, so
+bump_namespace() retires all of a namespace's entries with one write: the old
+entries are never read again and expire on their own timeouts. That works the
+same on every cache backend, including ones that cannot list or scan keys.
+"""
+import logging
+import time
+from typing import Any, Callable, Iterable, Optional
+
+from django.core.cache import cache
+
+from ..routers import use_primary
+from .metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD = 'dashboard'
+STUDENT_STATUS = 'student_status'
+REPORTS = 'reports'
+FLEET = 'fleet'
+
+NAMESPACES = (DASHBOARD, STUDENT_STATUS, REPORTS, FLEET)
+
+
+def _version_key(namespace: str) -> str:
+    return f'ns:{namespace}:version'
+
+
+def _initial_version() -> int:
+    # Clock-based, so a counter that was evicted never restarts at a number it
+    # already handed out and resurrects entries written under that version
+    return time.time_ns() // 1000
+
+
+def namespace_version(namespace: str) -> int:
+    """The namespace's current version, initialising it on first use."""
+    return cache.get_or_set(_version_key(namespace), _initial_version, None)
+
+
+def make_key(namespace: str, *parts) -> str:
+    """
+    Build a cache key inside a namespace.
+
+    Args:
+        namespace: One of NAMESPACES.
+        *parts: Values identifying the object within the namespace.
+
+    Returns:
+        '<namespace>:v<version>:<part>:<part>...'
+    """
+    return ':'.join([namespace, f'v{namespace_version(namespace)}', *(str(part) for part in parts)])
+
+
+def get_or_build(key: str, build: Callable[[], Any], timeout: Optional[int]) -> Any:
+    """
+    Return the cached value for a make_key() key, building and caching it on a miss.
+
+    The value is built from the primary database, never a replica, since it
+    is shared by every user. Hits and misses are counted per namespace in the
+    cache metrics.
+    """
+    value = cache.get(key)
+    namespace = key.split(':', 1)[0]
+    if value is not None:
+        CACHE_REQUESTS.labels(namespace=namespace, result='hit').inc()
+        return value
+    CACHE_REQUESTS.labels(namespace=namespace, result='miss').inc()
+    with use_primary():
+        value = build()
+    cache.set(key, value, timeout)
+    return value
+
+
+def bump_namespace(namespace: str) -> int:
+    """Invalidate every key in the namespace and return its new version."""
+    key = _version_key(namespace)
+    try:
+        version = cache.incr(key)
+    except ValueError:
+        version = _initial_version()
+        cache.set(key, version, None)
+    logger.info(f"Cache namespace '{namespace}' bumped to version {version}")
+    return version
+
+
+def bump_namespaces(namespaces: Iterable[str]) -> None:
+    for namespace in namespaces:
+        bump_namespace(namespace)
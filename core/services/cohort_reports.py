@@ -0,0 +1,185 @@
+"""
+Bulk progress report export for a cohort of students.
+
+Students are read in chunks with their lessons and progress records
+prefetched, report data is assembled in the parent process without further
+queries, and PDF/CSV rendering (the CPU-bound part) is spread over a
+ProcessPoolExecutor. Finished reports are written into a ZIP archive whose
+bytes are yielded as they are produced, so the archive can be streamed to a
+file or an HTTP response.
+"""
+import csv
+import io
+import logging
+import os
+import time as timer
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import date
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from django.db.models import Exists, OuterRef, Prefetch
+
+from .reports import progress_report_rows, render_progress_report_pdf
+
+logger = logging.getLogger(__name__)
+
+REPORT_FORMATS = ('pdf', 'csv')
+
+
+def cohort_students(tutor_id: Optional[int] = None, date_from: Optional[date] = None,
+                    date_to: Optional[date] = None, level: Optional[str] = None):
+    """
+    Students matching the cohort filters, with everything a report needs prefetched.
+
+    Args:
+        tutor_id: Only students who had a lesson with this tutor.
+        date_from: Only students with a lesson on or after this date.
+        date_to: Only students with a lesson on or before this date.
+        level: Only students at this level (see User.get_level).
+
+    Returns:
+        QuerySet of students ordered by username.
+    """
+    from ..models import User, Lesson, StudentProgress
+
+    students = User.objects.filter(role='student')
+
+    lesson_filter = {}
+    if tutor_id:
+        lesson_filter['tutor_id'] = tutor_id
+    if date_from:
+        lesson_filter['date__gte'] = date_from
+    if date_to:
+        lesson_filter['date__lte'] = date_to
+    if lesson_filter:
+        students = students.filter(Exists(Lesson.objects.filter(student=OuterRef('pk'), **lesson_filter)))
+
+    if level:
+        students = students.with_lesson_stats().filter(level=level)
+
+    return students.prefetch_related(
+        Prefetch('student_lessons', queryset=Lesson.objects.select_related('tutor').order_by('date', 'start_time')),
+        Prefetch('progress_records', queryset=StudentProgress.objects.order_by('-created_at')),
+    ).order_by('username')
+
+
+def render_report_files(slug: str, report_data: Dict[str, Any],
+                        formats: Sequence[str]) -> List[Tuple[str, bytes]]:
+    """
+    Render one student's report in the requested formats.
+
+    Runs in pool workers, so it only touches the report data it is given.
+
+    Returns:
+        List of (archive name, file content) pairs.
+    """
+    files = []
+    if 'pdf' in formats:
+        files.append((f'{slug}/progress_report.pdf', render_progress_report_pdf(report_data)))
+    if 'csv' in formats:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(progress_report_rows(report_data))
+        files.append((f'{slug}/progress_report.csv', buffer.getvalue().encode('utf-8')))
+    return files
+
+
+class _ZipBuffer(io.RawIOBase):
+    """Write-only, unseekable sink that hands written bytes back to the generator."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class CohortReportExport:
+    """
+    Export the progress reports of a cohort as a streamed ZIP archive.
+
+    Usage:
+        export = CohortReportExport(cohort_students(tutor_id=3))
+        for chunk in export.iter_zip():
+            output.write(chunk)
+        export.stats  # students, reports, seconds, reports_per_second
+    """
+
+    def __init__(self, students, formats: Sequence[str] = REPORT_FORMATS, workers: Optional[int] = None,
+                 chunk_size: int = 100):
+        """
+        Args:
+            students: Queryset from cohort_students().
+            formats: Report formats to include ('pdf', 'csv').
+            workers: Rendering processes (defaults to the number of cores; 0 renders in-process).
+            chunk_size: Students fetched per query.
+        """
+        unknown = set(formats) - set(REPORT_FORMATS)
+        if unknown or not formats:
+            raise ValueError(f"Formats must be a non-empty subset of {REPORT_FORMATS}, got {list(formats)}")
+        self.students = students
+        self.formats = tuple(formats)
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.chunk_size = chunk_size
+        self.stats: Dict[str, Any] = {'students': 0, 'reports': 0, 'failed': 0, 'seconds': 0.0,
+                                      'reports_per_second': 0.0}
+
+    def _report_jobs(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        from ..ai_helper import ai_helper
+
+        for student in self.students.iterator(chunk_size=self.chunk_size):
+            report_data = ai_helper.generate_comprehensive_report_data(student.id, student=student)
+            if 'error' in report_data:
+                logger.error(f"Skipping cohort report for {student.username}: {report_data['error']}")
+                self.stats['failed'] += 1
+                continue
+            yield f'{student.username}_{student.id}', report_data
+
+    def iter_zip(self) -> Iterator[bytes]:
+        """Yield the ZIP archive's bytes as reports finish rendering."""
+        started = timer.perf_counter()
+        sink = _ZipBuffer()
+
+        with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for files in self._rendered_reports():
+                self.stats['students'] += 1
+                for name, content in files:
+                    archive.writestr(name, content)
+                    self.stats['reports'] += 1
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+        yield sink.drain()
+
+        elapsed = timer.perf_counter() - started
+        self.stats['seconds'] = round(elapsed, 3)
+        self.stats['reports_per_second'] = round(self.stats['reports'] / elapsed, 2) if elapsed else 0.0
+        logger.info(f"Cohort export: {self.stats['reports']} reports for {self.stats['students']} students "
+                    f"in {elapsed:.2f}s ({self.stats['reports_per_second']} reports/s)")
+
+    def _rendered_reports(self) -> Iterator[List[Tuple[str, bytes]]]:
+        if self.workers <= 0:
+            for slug, report_data in self._report_jobs():
+                yield render_report_files(slug, report_data, self.formats)
+            return
+
+        # Keep a bounded number of renders in flight so memory stays flat
+        max_pending = self.workers * 2
+        pending: Deque[Future] = deque()
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            for slug, report_data in self._report_jobs():
+                pending.append(pool.submit(render_report_files, slug, report_data, self.formats))
+                if len(pending) >= max_pending:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
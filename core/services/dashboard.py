@@ -0,0 +1,157 @@
+"""
+Cached dashboard data per role.
+
+Each role's dashboard figures are built once and cached: per user for students
+and tutors, and once for all admins. Keys include the current date because the
+lesson lists are relative to today. The signal receivers in core.signals delete
+exactly the keys a Lesson, StudentProgress, VehicleAllocation or Notification
+change affects, so a repeat dashboard visit costs a couple of cache reads.
+invalidate_all_dashboards() bumps the whole namespace for changes too broad to
+track per user. Invalidation waits for the writer's transaction to commit, so a
+dashboard rebuilt in the meantime cannot cache the data from before the write.
+"""
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .cache_keys import DASHBOARD, bump_namespace, get_or_build, make_key
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_LIMIT = 20
+
+
+def _today_key(*parts) -> str:
+    return make_key(DASHBOARD, *parts, timezone.localdate().isoformat())
+
+
+def student_key(user_id: int) -> str:
+    return _today_key('student', user_id)
+
+
+def tutor_key(user_id: int) -> str:
+    return _today_key('tutor', user_id)
+
+
+def admin_key() -> str:
+    return _today_key('admin')
+
+
+def notifications_key(user_id: int) -> str:
+    return make_key(DASHBOARD, 'notifications', user_id)
+
+
+def _timeout() -> int:
+    return getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300)
+
+
+def _cached(key: str, build) -> Dict[str, Any]:
+    return get_or_build(key, build, _timeout())
+
+
+def build_student_dashboard(user) -> Dict[str, Any]:
+    """Upcoming lessons, progress records and the progress analysis of a student (2 queries)."""
+    from ..ai_helper import ai_helper
+    from ..models import StudentProgress
+
+    all_lessons = list(user.student_lessons.select_related('tutor').order_by('date', 'start_time'))
+    progress = list(
+        StudentProgress.objects.filter(student=user).select_related('lesson__tutor').order_by('-created_at')
+    )
+    today = timezone.localdate()
+    return {
+        'lessons': [lesson for lesson in all_lessons if lesson.date >= today],
+        'progress': progress,
+        'ai_analysis': ai_helper._analyze_progress(user, all_lessons, progress),
+    }
+
+
+def build_tutor_dashboard(user) -> Dict[str, Any]:
+    """Upcoming lessons, taught students and lessons still missing progress notes of a tutor."""
+    from ..models import User, StudentProgress
+
+    today = timezone.localdate()
+    lessons = list(user.tutor_lessons.filter(date__gte=today).select_related('student').order_by('date', 'start_time'))
+    students = list(User.objects.filter(role='student', student_lessons__tutor=user).distinct())
+    lessons_without_progress = list(
+        user.tutor_lessons.filter(date__lte=today)
+        .exclude(id__in=StudentProgress.objects.values_list('lesson_id', flat=True))
+        .select_related('student').order_by('-date')[:10]
+    )
+    return {
+        'lessons': lessons,
+        'students': students,
+        'lessons_without_progress': lessons_without_progress,
+    }
+
+
+def build_admin_dashboard() -> Dict[str, Any]:
+    """School-wide counts, recent lessons and the vehicle utilisation report."""
+    from django.db.models import Count, Q
+    from ..ai_helper import ai_helper
+    from ..models import User, Lesson
+
+    counts = User.objects.aggregate(
+        user_count=Count('pk'),
+        student_count=Count('pk', filter=Q(role='student')),
+        tutor_count=Count('pk', filter=Q(role='tutor')),
+    )
+    return {
+        **counts,
+        'lesson_count': Lesson.objects.count(),
+        'recent_lessons': list(
+            Lesson.objects.select_related('student', 'tutor').order_by('-date', '-start_time')[:10]
+        ),
+        'vehicle_report': ai_helper.get_vehicle_utilization_report(),
+    }
+
+
+def get_role_dashboard(user) -> Dict[str, Any]:
+    """The cached dashboard data for the user's role (empty for unknown roles)."""
+    if user.role == 'student':
+        return _cached(student_key(user.id), lambda: build_student_dashboard(user))
+    if user.role == 'tutor':
+        return _cached(tutor_key(user.id), lambda: build_tutor_dashboard(user))
+    if user.role == 'admin':
+        return _cached(admin_key(), build_admin_dashboard)
+    return {}
+
+
+def get_unread_notifications(user) -> List:
+    """The user's newest unread notifications, cached until one is added or read."""
+    from ..models import Notification
+
+    if not user.unread_notifications:
+        return []
+    return _cached(notifications_key(user.id), lambda: list(
+        Notification.objects.filter(user=user, is_read=False).order_by('-created_at')[:NOTIFICATION_LIMIT]
+    ))
+
+
+def invalidate_dashboards(student_ids: Iterable[Optional[int]] = (), tutor_ids: Iterable[Optional[int]] = (),
+                          admin: bool = False) -> None:
+    keys = [student_key(user_id) for user_id in set(student_ids) if user_id]
+    keys += [tutor_key(user_id) for user_id in set(tutor_ids) if user_id]
+    if admin:
+        keys.append(admin_key())
+    if keys:
+        transaction.on_commit(lambda: _delete(keys))
+
+
+def invalidate_notifications(user_ids: Iterable[int]) -> None:
+    keys = [notifications_key(user_id) for user_id in set(user_ids)]
+    if keys:
+        transaction.on_commit(lambda: _delete(keys))
+
+
+def invalidate_all_dashboards() -> None:
+    transaction.on_commit(lambda: bump_namespace(DASHBOARD))
+
+
+def _delete(keys: List[str]) -> None:
+    cache.delete_many(keys)
+    logger.debug(f"Dashboard cache invalidated: {keys}")
@@ -0,0 +1,260 @@
+"""
+Transactional email outbox.
+
+Views never talk to SMTP. They add OutboxEmail rows in the same transaction as
+the change that triggers the email, and a worker drains the outbox in batches
+over one reused mail connection. Failed sends are retried with exponential
+backoff and dead-lettered after EMAIL_OUTBOX_MAX_ATTEMPTS.
+
+The worker is the drain_email_outbox Celery task (also run periodically by
+beat) or the drain_email_outbox management command. After each commit that
+enqueued mail a drain is kicked according to EMAIL_OUTBOX_BACKEND: 'celery'
+queues the task, 'thread' drains in a local background thread, and an empty
+value leaves the outbox to the periodic worker alone.
+"""
+import logging
+import threading
+import time as timer
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+KICK_CACHE_KEY = 'email_outbox:kick'
+METRICS_LATENCY_SAMPLE = 1000
+UNSENT_STATUSES = ('pending', 'sending', 'dead')
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+def enqueue_email(to_email: str, subject: str, body: str, html_body: str = ''):
+    """
+    Queue one email. Call inside the transaction of the change that triggers it.
+
+    Returns:
+        OutboxEmail: The queued row.
+    """
+    from ..models import OutboxEmail
+
+    email = OutboxEmail.objects.create(to_email=to_email, subject=subject, body=body, html_body=html_body)
+    transaction.on_commit(kick_outbox_drain)
+    return email
+
+
+def enqueue_emails(messages: Iterable[Dict[str, str]]) -> List:
+    """
+    Queue many emails with one INSERT.
+
+    Args:
+        messages: Dicts with to_email, subject, body and optionally html_body.
+
+    Returns:
+        The queued OutboxEmail rows.
+    """
+    from ..models import OutboxEmail
+
+    emails = OutboxEmail.objects.bulk_create([OutboxEmail(**message) for message in messages])
+    if emails:
+        transaction.on_commit(kick_outbox_drain)
+    return emails
+
+
+def kick_outbox_drain() -> None:
+    """Start a drain soon, at most once per second however many emails were queued."""
+    backend = _setting('EMAIL_OUTBOX_BACKEND', 'thread')
+    if not backend or not cache.add(KICK_CACHE_KEY, 1, 1):
+        return
+
+    if backend == 'celery':
+        from ..tasks import drain_email_outbox
+        try:
+            drain_email_outbox.apply_async(retry=False)
+            return
+        except Exception as e:
+            logger.warning(f"Could not queue email outbox drain, draining locally: {e}")
+
+    threading.Thread(target=_drain_in_thread, daemon=True).start()
+
+
+def _drain_in_thread() -> None:
+    try:
+        drain_outbox()
+    except Exception as e:
+        logger.error(f"Background email outbox drain failed: {e}")
+    finally:
+        connections.close_all()
+
+
+def backoff_delay(attempts: int) -> timedelta:
+    """Delay before the next try after `attempts` failures: base * 2^(attempts-1), capped."""
+    base = _setting('EMAIL_OUTBOX_BACKOFF_SECONDS', 30)
+    cap = _setting('EMAIL_OUTBOX_MAX_BACKOFF_SECONDS', 3600)
+    return timedelta(seconds=min(cap, base * 2 ** max(0, attempts - 1)))
+
+
+def _claim_batch(batch_size: int) -> List:
+    """
+    Claim due emails for this worker.
+
+    Claimed rows are marked 'sending' with a lease in next_attempt_at, so a
+    worker that dies mid-batch only delays its emails until the lease expires.
+    """
+    from ..models import OutboxEmail
+
+    now = timezone.now()
+    lease = timedelta(seconds=_setting('EMAIL_OUTBOX_LEASE_SECONDS', 300))
+    with transaction.atomic():
+        ids = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status__in=['pending', 'sending'], next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        OutboxEmail.objects.filter(id__in=ids).update(status='sending', next_attempt_at=now + lease)
+    return list(OutboxEmail.objects.filter(id__in=ids).order_by('id'))
+
+
+def _to_message(email, connection) -> EmailMultiAlternatives:
+    message = EmailMultiAlternatives(subject=email.subject, body=email.body, to=[email.to_email],
+                                     connection=connection)
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def _record_failure(email, error: Exception, max_attempts: int) -> str:
+    from ..models import OutboxEmail
+
+    attempts = email.attempts + 1
+    if attempts >= max_attempts:
+        status, next_attempt_at = 'dead', timezone.now()
+        logger.error(f"Email {email.id} to {email.to_email} dead-lettered after {attempts} attempts: {error}")
+    else:
+        status, next_attempt_at = 'pending', timezone.now() + backoff_delay(attempts)
+        logger.warning(f"Email {email.id} to {email.to_email} failed (attempt {attempts}), "
+                       f"retrying at {next_attempt_at}: {error}")
+    OutboxEmail.objects.filter(id=email.id).update(
+        status=status, attempts=attempts, next_attempt_at=next_attempt_at, last_error=str(error)[:2000]
+    )
+    return status
+
+
+def drain_outbox(batch_size: Optional[int] = None, max_batches: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Send due outbox emails in batches over one mail connection.
+
+    Args:
+        batch_size: Emails claimed per batch (EMAIL_OUTBOX_BATCH_SIZE by default).
+        max_batches: Stop after this many batches (until the outbox is empty by default).
+
+    Returns:
+        Dict with sent, retried and dead counts, batches and seconds.
+    """
+    from ..models import OutboxEmail
+
+    batch_size = batch_size or _setting('EMAIL_OUTBOX_BATCH_SIZE', 100)
+    max_attempts = _setting('EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    stats = {'sent': 0, 'retried': 0, 'dead': 0, 'batches': 0, 'seconds': 0.0}
+    started = timer.perf_counter()
+
+    connection = None
+    try:
+        while max_batches is None or stats['batches'] < max_batches:
+            batch = _claim_batch(batch_size)
+            if not batch:
+                break
+            stats['batches'] += 1
+
+            if connection is None:
+                try:
+                    connection = get_connection()
+                    connection.open()
+                except Exception as e:
+                    # Mail server unreachable: push the whole batch back with backoff
+                    connection = None
+                    for email in batch:
+                        status = _record_failure(email, e, max_attempts)
+                        stats['dead' if status == 'dead' else 'retried'] += 1
+                    break
+
+            sent_ids = []
+            for email in batch:
+                try:
+                    connection.send_messages([_to_message(email, connection)])
+                    sent_ids.append(email.id)
+                except Exception as e:
+                    status = _record_failure(email, e, max_attempts)
+                    stats['dead' if status == 'dead' else 'retried'] += 1
+
+            if sent_ids:
+                OutboxEmail.objects.filter(id__in=sent_ids).update(
+                    status='sent', sent_at=timezone.now(), last_error=''
+                )
+                stats['sent'] += len(sent_ids)
+    finally:
+        if connection is not None:
+            connection.close()
+
+    stats['seconds'] = round(timer.perf_counter() - started, 3)
+    if stats['batches']:
+        logger.info(f"Email outbox drained: {stats['sent']} sent, {stats['retried']} retrying, "
+                    f"{stats['dead']} dead-lettered in {stats['seconds']}s")
+    return stats
+
+
+def outbox_depth() -> Dict[str, int]:
+    """Number of emails per unsent status (pending, sending, dead), from the status index."""
+    from django.db.models import Count
+    from ..models import OutboxEmail
+
+    counts = dict(
+        OutboxEmail.objects.filter(status__in=UNSENT_STATUSES).order_by()
+        .values_list('status').annotate(count=Count('id'))
+    )
+    return {status: counts.get(status, 0) for status in UNSENT_STATUSES}
+
+
+def outbox_metrics() -> Dict[str, Any]:
+    """
+    Queue depth and send latency of the outbox.
+
+    Returns:
+        Dict with pending, sending and dead counts, the age of the oldest due
+        email and the average and 95th percentile queue-to-send latency over
+        the most recently sent emails, all in seconds.
+    """
+    from django.db.models import Count, Min, Q
+    from ..models import OutboxEmail
+
+    now = timezone.now()
+    counts = OutboxEmail.objects.aggregate(
+        pending=Count('id', filter=Q(status='pending')),
+        sending=Count('id', filter=Q(status='sending')),
+        dead=Count('id', filter=Q(status='dead')),
+        oldest=Min('created_at', filter=Q(status__in=['pending', 'sending'])),
+    )
+
+    latencies = sorted(
+        (sent_at - created_at).total_seconds()
+        for created_at, sent_at in OutboxEmail.objects.filter(status='sent')
+        .order_by('-sent_at').values_list('created_at', 'sent_at')[:METRICS_LATENCY_SAMPLE]
+    )
+
+    return {
+        'pending': counts['pending'],
+        'sending': counts['sending'],
+        'dead': counts['dead'],
+        'oldest_pending_seconds': round((now - counts['oldest']).total_seconds(), 3) if counts['oldest'] else 0.0,
+        'avg_latency_seconds': round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        'p95_latency_seconds': round(latencies[int(0.95 * (len(latencies) - 1))], 3) if latencies else 0.0,
+    }
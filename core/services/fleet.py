@@ -0,0 +1,242 @@
+"""
+Fleet allocation engine.
+
+Loads the fleet and one day's allocations once and assigns vehicles from memory:
+single lessons are matched against per-vehicle interval lists, and a whole day
+can be re-optimized with an interval sweep that keeps existing allocations where
+possible, prefers the requested vehicle class and falls back to other classes.
+"""
+import heapq
+import logging
+from collections import defaultdict
+from datetime import date, time
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db import transaction
+
+from .availability import IntervalList, to_minutes
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CLASS = 'class1'
+
+
+class FleetAllocator:
+    """
+    Vehicle availability for one day.
+
+    Usage:
+        allocator = FleetAllocator.load(lesson_date)
+        candidates = allocator.candidates(start_time, end_time, 'class2')
+    """
+
+    def __init__(self, lesson_date: date, vehicles: list):
+        self.lesson_date = lesson_date
+        self.vehicles = list(vehicles)
+        self._by_id = {vehicle.id: vehicle for vehicle in self.vehicles}
+        self._busy: Dict[int, IntervalList] = defaultdict(IntervalList)
+
+    @classmethod
+    def load(cls, lesson_date: date) -> 'FleetAllocator':
+        """
+        Load available vehicles and the day's allocations (two queries).
+
+        Args:
+            lesson_date: The day to allocate vehicles for.
+
+        Returns:
+            A populated FleetAllocator.
+        """
+        from ..models import Vehicle, VehicleAllocation
+
+        allocator = cls(lesson_date, Vehicle.objects.filter(is_available=True))
+        rows = VehicleAllocation.objects.filter(lesson__date=lesson_date).values_list(
+            'vehicle_id', 'lesson_id', 'lesson__start_time', 'lesson__end_time'
+        )
+        for vehicle_id, lesson_id, start_time, end_time in rows:
+            allocator.reserve(vehicle_id, lesson_id, start_time, end_time)
+        return allocator
+
+    def reserve(self, vehicle_id: int, lesson_id: Optional[int], start_time: time, end_time: time) -> None:
+        """Mark a vehicle busy for a lesson."""
+        self._busy[vehicle_id].add(to_minutes(start_time), to_minutes(end_time), lesson_id)
+
+    def is_free(self, vehicle_id: int, start_time: time, end_time: time,
+                exclude_lesson_id: Optional[int] = None) -> bool:
+        intervals = self._busy.get(vehicle_id)
+        if not intervals:
+            return True
+        return not intervals.overlaps(to_minutes(start_time), to_minutes(end_time), exclude_lesson_id)
+
+    def candidates(self, start_time: time, end_time: time,
+                   vehicle_class: str = DEFAULT_CLASS) -> List[Tuple[Any, bool]]:
+        """
+        Free vehicles for a window, requested class first.
+
+        Args:
+            start_time: Start time of the lesson
+            end_time: End time of the lesson
+            vehicle_class: The requested driving class
+
+        Returns:
+            List of (vehicle, is_class_match) tuples, matches first.
+        """
+        free = [vehicle for vehicle in self.vehicles if self.is_free(vehicle.id, start_time, end_time)]
+        matches = [(vehicle, True) for vehicle in free if vehicle.vehicle_class == vehicle_class]
+        fallbacks = [(vehicle, False) for vehicle in free if vehicle.vehicle_class != vehicle_class]
+        return matches + fallbacks
+
+    def optimize(self, lessons: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Assign vehicles to a day's lessons in one interval sweep.
+
+        Lessons already holding a vehicle of their requested class keep it. The
+        rest are swept in start order; each takes, in order of preference, its
+        current vehicle, a free vehicle of its class, or a free vehicle of the
+        class with the most spare vehicles.
+
+        Args:
+            lessons: Dicts with id, start_time, end_time, vehicle_class and
+                vehicle_id (current allocation or None).
+
+        Returns:
+            Dict with assignments (lesson id -> vehicle id), unassigned lesson
+            ids, and the number of class mismatches and vehicle swaps.
+        """
+        assignments: Dict[int, int] = {}
+        busy: Dict[int, IntervalList] = defaultdict(IntervalList)
+        pending = []
+
+        # Pin lessons whose current vehicle already matches their class
+        for lesson in lessons:
+            vehicle = self._by_id.get(lesson.get('vehicle_id'))
+            if vehicle and vehicle.vehicle_class == lesson['vehicle_class']:
+                start, end = to_minutes(lesson['start_time']), to_minutes(lesson['end_time'])
+                if not busy[vehicle.id].overlaps(start, end):
+                    busy[vehicle.id].add(start, end, lesson['id'])
+                    assignments[lesson['id']] = vehicle.id
+                    continue
+            pending.append(lesson)
+
+        pending.sort(key=lambda l: (to_minutes(l['start_time']), -to_minutes(l['end_time'])))
+
+        free_by_class: Dict[str, set] = defaultdict(set)
+        for vehicle in self.vehicles:
+            free_by_class[vehicle.vehicle_class].add(vehicle.id)
+        releases: List[Tuple[int, int]] = []  # (end minute, vehicle id) heap
+
+        unassigned = []
+        for lesson in pending:
+            start, end = to_minutes(lesson['start_time']), to_minutes(lesson['end_time'])
+            while releases and releases[0][0] <= start:
+                _, vehicle_id = heapq.heappop(releases)
+                free_by_class[self._by_id[vehicle_id].vehicle_class].add(vehicle_id)
+
+            def usable(vehicle_id):
+                return not busy[vehicle_id].overlaps(start, end)
+
+            choice = None
+            current = lesson.get('vehicle_id')
+            wanted = free_by_class.get(lesson['vehicle_class'], set())
+            if current in wanted and usable(current):
+                choice = current
+            else:
+                choice = next((v for v in sorted(wanted) if usable(v)), None)
+            if choice is None and current in self._by_id and \
+                    current in free_by_class[self._by_id[current].vehicle_class] and usable(current):
+                choice = current
+            if choice is None:
+                for _, pool in sorted(free_by_class.items(), key=lambda item: -len(item[1])):
+                    choice = next((v for v in sorted(pool) if usable(v)), None)
+                    if choice is not None:
+                        break
+
+            if choice is None:
+                unassigned.append(lesson['id'])
+                continue
+
+            free_by_class[self._by_id[choice].vehicle_class].discard(choice)
+            busy[choice].add(start, end, lesson['id'])
+            heapq.heappush(releases, (end, choice))
+            assignments[lesson['id']] = choice
+
+        by_id = {lesson['id']: lesson for lesson in lessons}
+        mismatches = sum(
+            1 for lesson_id, vehicle_id in assignments.items()
+            if self._by_id[vehicle_id].vehicle_class != by_id[lesson_id]['vehicle_class']
+        )
+        swaps = sum(
+            1 for lesson_id, vehicle_id in assignments.items()
+            if by_id[lesson_id].get('vehicle_id') not in (None, vehicle_id)
+        )
+        return {
+            'assignments': assignments,
+            'unassigned': unassigned,
+            'class_mismatches': mismatches,
+            'vehicle_swaps': swaps,
+        }
+
+
+def reoptimize_day(lesson_date: date, dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Re-assign vehicles for every lesson on a day and write the changes in bulk.
+
+    Lessons without an allocation are given one for the default class.
+
+    Args:
+        lesson_date: The day to re-optimize.
+        dry_run: Compute the plan without writing it.
+
+    Returns:
+        The optimizer result plus the number of allocations created, updated and removed.
+    """
+    from ..models import Lesson, Vehicle, VehicleAllocation
+
+    rows = Lesson.objects.filter(date=lesson_date).values_list(
+        'id', 'start_time', 'end_time', 'vehicle_allocation__vehicle_id', 'vehicle_allocation__requested_class'
+    )
+    lessons = [
+        {
+            'id': lesson_id,
+            'start_time': start_time,
+            'end_time': end_time,
+            'vehicle_id': vehicle_id,
+            'vehicle_class': requested_class or DEFAULT_CLASS,
+        }
+        for lesson_id, start_time, end_time, vehicle_id, requested_class in rows
+    ]
+
+    allocator = FleetAllocator(lesson_date, Vehicle.objects.filter(is_available=True))
+    result = allocator.optimize(lessons)
+    result.update({'created': 0, 'updated': 0, 'removed': 0})
+    if dry_run:
+        return result
+
+    current = {lesson['id']: lesson for lesson in lessons}
+    assignments = result['assignments']
+    with transaction.atomic():
+        existing = {
+            allocation.lesson_id: allocation
+            for allocation in VehicleAllocation.objects.select_for_update().filter(lesson__date=lesson_date)
+        }
+        to_update = []
+        for lesson_id, vehicle_id in assignments.items():
+            allocation = existing.get(lesson_id)
+            if allocation and allocation.vehicle_id != vehicle_id:
+                allocation.vehicle_id = vehicle_id
+                to_update.append(allocation)
+        to_create = [
+            VehicleAllocation(lesson_id=lesson_id, vehicle_id=vehicle_id,
+                              requested_class=current[lesson_id]['vehicle_class'])
+            for lesson_id, vehicle_id in assignments.items() if lesson_id not in existing
+        ]
+        stale = [lesson_id for lesson_id in result['unassigned'] if lesson_id in existing]
+
+        VehicleAllocation.objects.bulk_update(to_update, ['vehicle'])
+        VehicleAllocation.objects.bulk_create(to_create)
+        VehicleAllocation.objects.filter(lesson_id__in=stale).delete()
+
+    result.update({'created': len(to_create), 'updated': len(to_update), 'removed': len(stale)})
+    logger.info(f"Re-optimized vehicles for {lesson_date}: {len(assignments)} assigned, "
+                f"{result['class_mismatches']} class mismatches, {result['vehicle_swaps']} swaps")
+    return result
@@ -0,0 +1,81 @@
+"""
+Maintenance of the denormalized User.lessons_taken counter.
+
+Lesson create/delete signals adjust the counter with atomic F() expressions.
+Bulk operations run inside suspend_lesson_counters(), which collects the
+affected students and reconciles their counters in one grouped UPDATE.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable, Optional, Set
+
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+_suspended: ContextVar[Optional[Set[int]]] = ContextVar('lesson_counters_suspended', default=None)
+
+
+def counters_suspended_for(student_id: int) -> bool:
+    """
+    Record a student as touched if counters are suspended.
+
+    Returns:
+        True if the caller should skip its per-row counter update.
+    """
+    touched = _suspended.get()
+    if touched is None:
+        return False
+    touched.add(student_id)
+    return True
+
+
+@contextmanager
+def suspend_lesson_counters(reconcile: bool = True):
+    """
+    Suspend per-lesson counter updates for the duration of a bulk operation.
+
+    Usage:
+        with suspend_lesson_counters() as touched:
+            lessons = Lesson.objects.bulk_create(...)
+            touched.update(lesson.student_id for lesson in lessons)
+
+    Students whose lessons are saved or deleted inside the block are collected
+    automatically; bulk_create/update callers add their student ids to the
+    yielded set. On a clean exit the collected counters are reconciled in one
+    UPDATE. Nested blocks share the outermost block's set.
+    """
+    touched = _suspended.get()
+    if touched is not None:
+        yield touched
+        return
+
+    touched = set()
+    token = _suspended.set(touched)
+    try:
+        yield touched
+    finally:
+        _suspended.reset(token)
+    if reconcile and touched:
+        reconcile_lessons_taken(touched)
+
+
+def reconcile_lessons_taken(student_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recompute lessons_taken from the Lesson table in one set-based UPDATE.
+
+    Args:
+        student_ids: Students to reconcile (all users when None).
+
+    Returns:
+        Number of user rows updated.
+    """
+    from ..models import User, Lesson
+
+    lesson_counts = Lesson.objects.filter(
+        student=OuterRef('pk')
+    ).order_by().values('student').annotate(total=Count('pk')).values('total')
+
+    users = User.objects.all()
+    if student_ids is not None:
+        users = users.filter(pk__in=list(student_ids))
+    return users.update(lessons_taken=Coalesce(Subquery(lesson_counts), Value(0)))
@@ -0,0 +1,177 @@
+"""
+Live per-user events for the server-sent events stream.
+
+Publishers (NotificationService, the Notification post_save receiver) hand
+events to a broker after their transaction commits; each open SSE connection
+holds one subscription and receives the events for its user. The broker class
+is chosen by LIVE_EVENTS_BACKEND so a cross-process backend can replace the
+default InProcessBroker, which only reaches clients connected to the same
+server process.
+
+A subscription is a small slotted object wrapping a bounded asyncio queue, and
+connections are plain async generators rather than tasks, so an idle client
+costs a few hundred bytes plus its socket.
+"""
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Optional, Set
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .metrics import LIVE_EVENT_CONNECTIONS, LIVE_EVENT_QUEUE_DEPTH, LIVE_EVENTS_DROPPED
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = 'core.services.live_events.InProcessBroker'
+DEFAULT_QUEUE_SIZE = 100
+
+
+class Subscription:
+    """One connected client's event queue, bound to the event loop that reads it."""
+
+    __slots__ = ('user_id', 'queue', 'loop', 'dropped')
+
+    def __init__(self, user_id: int, maxsize: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.loop = asyncio.get_running_loop()
+        self.dropped = 0
+
+    def _put(self, event: Dict[str, Any]) -> None:
+        # Runs on the subscriber's loop. A client that stops reading loses its
+        # oldest events instead of growing the queue without bound.
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            LIVE_EVENTS_DROPPED.inc()
+        else:
+            LIVE_EVENT_QUEUE_DEPTH.inc()
+        self.queue.put_nowait(event)
+
+    def deliver(self, event: Dict[str, Any]) -> None:
+        """Queue an event from any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The client's loop has closed; it will unsubscribe on its way out
+            pass
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Next event, or None if nothing arrives within `timeout` seconds."""
+        try:
+            event = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        LIVE_EVENT_QUEUE_DEPTH.dec()
+        return event
+
+
+class EventBroker:
+    """Interface for live event backends."""
+
+    def subscribe(self, user_id: int) -> Subscription:
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        raise NotImplementedError
+
+    def publish(self, user_id: int, event: Dict[str, Any]) -> int:
+        """Deliver an event to the user's subscribers and return how many there were."""
+        raise NotImplementedError
+
+
+class InProcessBroker(EventBroker):
+    """Fan events out to subscriptions held by this process."""
+
+    def __init__(self, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id, self.queue_size)
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        LIVE_EVENT_CONNECTIONS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is None or subscription not in subscribers:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.user_id]
+        LIVE_EVENT_CONNECTIONS.dec()
+        # Events the client never read leave the queue with it
+        LIVE_EVENT_QUEUE_DEPTH.dec(subscription.queue.qsize())
+
+    def publish(self, user_id: int, event: Dict[str, Any]) -> int:
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+        return len(subscribers)
+
+    def connection_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+_broker: Optional[EventBroker] = None
+_broker_lock = threading.Lock()
+
+
+def get_broker() -> EventBroker:
+    """The process-wide broker configured by LIVE_EVENTS_BACKEND."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                backend = getattr(settings, 'LIVE_EVENTS_BACKEND', DEFAULT_BACKEND)
+                _broker = import_string(backend)(
+                    queue_size=getattr(settings, 'LIVE_EVENTS_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)
+                )
+    return _broker
+
+
+def reset_broker() -> None:
+    """Drop the configured broker so the next get_broker() rebuilds it (used by tests)."""
+    global _broker
+    with _broker_lock:
+        _broker = None
+
+
+def notification_event(notification) -> Dict[str, Any]:
+    return {
+        'event': 'notification',
+        'id': notification.id,
+        'data': {
+            'id': notification.id,
+            'message': notification.message,
+            'kind': notification.kind,
+            'created_at': notification.created_at.isoformat(),
+        },
+    }
+
+
+def publish_notifications(notifications: Iterable) -> None:
+    """Publish the notifications to their users once the current transaction commits."""
+    events = [(notification.user_id, notification_event(notification)) for notification in notifications]
+    if not events:
+        return
+
+    def publish():
+        broker = get_broker()
+        for user_id, event in events:
+            try:
+                broker.publish(user_id, event)
+            except Exception as e:
+                logger.warning(f"Could not publish live event to user {user_id}: {e}")
+
+    transaction.on_commit(publish)
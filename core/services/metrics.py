@@ -0,0 +1,108 @@
+"""
+Operational metrics in the Prometheus text format, served at /metrics/.
+
+The counters, gauges and histograms below use prometheus_client in
+multiprocess mode: every server process writes its values to its own files in
+PROMETHEUS_MULTIPROC_DIR (see settings), and a scrape sums the files of all
+processes. Gauges that describe shared state, such as the email outbox, and
+the cache hit ratio are computed at scrape time by ScrapeCollector.
+"""
+import logging
+import os
+from typing import Dict, Iterator
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily, Metric
+from prometheus_client.multiprocess import MultiProcessCollector
+
+logger = logging.getLogger(__name__)
+
+# Each metric opens its file in the directory when it is declared below
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+CACHE_REQUESTS_NAME = 'drivingschool_cache_requests'
+
+
+class ScrapeCollector:
+    """The values of every process, plus the gauges computed when scraped."""
+
+    def __init__(self):
+        self.processes = MultiProcessCollector(None)
+
+    def collect(self) -> Iterator[Metric]:
+        lookups: Dict[str, Dict[str, float]] = {}
+        for family in self.processes.collect():
+            if family.name == CACHE_REQUESTS_NAME:
+                for sample in family.samples:
+                    if sample.name.endswith('_total'):
+                        lookups.setdefault(sample.labels['namespace'], {})[sample.labels['result']] = sample.value
+            yield family
+
+        hit_ratio = GaugeMetricFamily(
+            'drivingschool_cache_hit_ratio',
+            'Share of cache lookups that were hits, by key namespace, since the metrics directory was emptied.',
+            labels=['namespace'],
+        )
+        for namespace, counts in sorted(lookups.items()):
+            if sum(counts.values()):
+                hit_ratio.add_metric([namespace], counts.get('hit', 0.0) / sum(counts.values()))
+        yield hit_ratio
+
+        outbox = GaugeMetricFamily('drivingschool_email_outbox_emails',
+                                   'Emails in the outbox that are not sent, by status.', labels=['status'])
+        try:
+            from .email_outbox import outbox_depth
+
+            for status, count in outbox_depth().items():
+                outbox.add_metric([status], count)
+        except Exception as e:
+            logger.warning(f"Could not read the email outbox depth: {e}")
+        yield outbox
+
+
+def render() -> bytes:
+    """All metrics of all processes in the Prometheus text exposition format."""
+    registry = CollectorRegistry()
+    registry.register(ScrapeCollector())
+    return generate_latest(registry)
+
+
+BOOKINGS = Counter(
+    'drivingschool_bookings_total',
+    'Lesson bookings and reschedules by outcome: booked, conflict (slot taken) or busy (lost a race).',
+    ['operation', 'outcome'],
+)
+VEHICLE_ALLOCATIONS = Counter(
+    'drivingschool_vehicle_allocations_total',
+    'Vehicle allocations for booked lessons: requested_class, fallback (another class) or none.',
+    ['result'],
+)
+VEHICLE_ALLOCATION_SECONDS = Histogram(
+    'drivingschool_vehicle_allocation_seconds',
+    'Time to pick and lock a vehicle for a booked lesson.',
+)
+# Summed over live processes; see mark_process_dead in settings
+LIVE_EVENT_CONNECTIONS = Gauge(
+    'drivingschool_live_event_connections',
+    'Open notification streams.',
+    multiprocess_mode='livesum',
+)
+LIVE_EVENT_QUEUE_DEPTH = Gauge(
+    'drivingschool_live_event_queue_depth',
+    'Notification events queued for connected clients and not yet sent.',
+    multiprocess_mode='livesum',
+)
+LIVE_EVENTS_DROPPED = Counter(
+    'drivingschool_live_events_dropped_total',
+    'Notification events dropped because a client fell behind.',
+)
+CACHE_REQUESTS = Counter(
+    f'{CACHE_REQUESTS_NAME}_total',
+    'Cache lookups by key namespace and result (hit or miss).',
+    ['namespace', 'result'],
+)
+REQUEST_SECONDS = Histogram(
+    'drivingschool_http_request_duration_seconds',
+    'Time to handle a request, by URL name.',
+    ['view', 'method'],
+)
@@ -1,10 +1,27 @@
-from django.core.mail import send_mail
+import base64
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Sequence, Tuple
+
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
 from django.template.loader import render_to_string
+from django.utils import timezone
 from django.utils.html import strip_tags
-from core.models import Notification, Lesson
-from django.contrib.auth.models import User
-from django.utils.timezone import now
+from core.models import Notification, Lesson, User
+
+from .dashboard import invalidate_notifications
+from .email_outbox import enqueue_email, enqueue_emails
+from .live_events import publish_notifications
+
+logger = logging.getLogger(__name__)
+
+INBOX_PAGE_SIZE = 20
+INBOX_MAX_PAGE_SIZE = 100
+PRUNE_BATCH_SIZE = 1000
 
 def send_lesson_notification_email(user: User, lesson: Lesson, message: str) -> None:
     subject = 'Upcoming Driving Lesson Reminder'
@@ -14,12 +31,214 @@ def send_lesson_notification_email(user: User, lesson: Lesson, message: str) ->
         'message': message,
     })
     plain_message = strip_tags(html_message)
-    from_email = settings.DEFAULT_FROM_EMAIL
-    recipient_list = [user.email]
-    send_mail(subject, plain_message, from_email, recipient_list, html_message=html_message)
+    # Queued in the outbox; the outbox worker does the SMTP round trip
+    enqueue_email(user.email, subject, plain_message, html_body=html_message)
 
 def create_and_send_notification(user: User, lesson: Lesson, message: str) -> None:
-    # Create notification in DB
-    Notification.objects.create(user=user, message=message)
-    # Send email notification
-    send_lesson_notification_email(user, lesson, message)
+    with transaction.atomic():
+        # Create notification in DB
+        NotificationService.send_notification(user, message, 'lesson_reminder', email=False)
+        # Send email notification
+        send_lesson_notification_email(user, lesson, message)
+
+def encode_cursor(notification: Notification) -> str:
+    """Opaque inbox cursor pointing just past `notification` in (created_at, id) order."""
+    raw = f"{notification.created_at.isoformat()}|{notification.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Parse a cursor made by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, notification_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(notification_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+class NotificationService:
+    """
+    Fan notifications out to many users at once.
+
+    Notifications are written with one bulk_create, their emails are queued in
+    the outbox with one INSERT, and each recipient's unread_notifications
+    counter is bumped with one UPDATE per distinct increment, so the dashboard
+    can show badge counts without counting the Notification table. Connected
+    clients get the notifications over the live event stream after commit.
+    """
+
+    EMAIL_SUBJECT = 'Driving School Notification'
+
+    @classmethod
+    def send_many(cls, items: Iterable[Tuple[User, str, str]], email: bool = True,
+                  subject: Optional[str] = None) -> List[Notification]:
+        """
+        Create many notifications and queue their emails.
+
+        Args:
+            items: (user, message, kind) tuples; kind is one of Notification.KIND_CHOICES.
+            email: Whether to queue an email to every recipient with an address.
+            subject: Email subject (EMAIL_SUBJECT by default).
+
+        Returns:
+            The created Notification objects.
+        """
+        items = list(items)
+        if not items:
+            return []
+
+        with transaction.atomic():
+            notifications = Notification.objects.bulk_create(
+                [Notification(user=user, message=message, kind=kind) for user, message, kind in items]
+            )
+            cls._increment_unread(Counter(user.id for user, _, _ in items))
+            invalidate_notifications(user.id for user, _, _ in items)
+            publish_notifications(notifications)
+            emails = []
+            if email:
+                emails = enqueue_emails(
+                    {'to_email': user.email, 'subject': subject or cls.EMAIL_SUBJECT, 'body': message}
+                    for user, message, _ in items if user.email
+                )
+
+        logger.info(f"Created {len(notifications)} notifications and queued {len(emails)} emails in one batch")
+        return notifications
+
+    @classmethod
+    def send_notification(cls, user: User, message: str, kind: str = 'general',
+                          email: bool = True) -> Notification:
+        """Notify a single user; see send_many."""
+        return cls.send_many([(user, message, kind)], email=email)[0]
+
+    @staticmethod
+    def _increment_unread(counts: Counter) -> None:
+        # Users who received the same number of notifications share one UPDATE
+        by_increment = defaultdict(list)
+        for user_id, increment in counts.items():
+            by_increment[increment].append(user_id)
+        for increment, user_ids in by_increment.items():
+            User.objects.filter(pk__in=user_ids).update(
+                unread_notifications=F('unread_notifications') + increment
+            )
+
+    @staticmethod
+    def mark_read(user: User, notification_ids: Optional[Sequence[int]] = None) -> int:
+        """
+        Mark some or all of a user's unread notifications as read.
+
+        Args:
+            user: Owner of the notifications.
+            notification_ids: Notifications to mark (all unread ones when None).
+
+        Returns:
+            Number of notifications that changed from unread to read.
+        """
+        unread = Notification.objects.filter(user=user, is_read=False)
+        if notification_ids is not None:
+            unread = unread.filter(id__in=list(notification_ids))
+        with transaction.atomic():
+            marked = unread.update(is_read=True)
+            if marked:
+                User.objects.filter(pk=user.pk).update(
+                    unread_notifications=Greatest(F('unread_notifications') - marked, 0)
+                )
+                invalidate_notifications([user.pk])
+        return marked
+
+    @staticmethod
+    def inbox_page(user: User, cursor: Optional[str] = None, limit: int = INBOX_PAGE_SIZE,
+                   unread_only: bool = False) -> Tuple[List[Notification], Optional[str]]:
+        """
+        One page of a user's notifications, newest first, using keyset pagination.
+
+        Pages are sliced by (created_at, id) rather than OFFSET, so every page
+        costs the same index range scan however deep the user scrolls.
+
+        Args:
+            user: Owner of the notifications.
+            cursor: next_cursor of the previous page (first page when None).
+            limit: Page size, capped at INBOX_MAX_PAGE_SIZE.
+            unread_only: Only list unread notifications.
+
+        Returns:
+            Tuple of (notifications, next_cursor); next_cursor is None on the last page.
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        limit = max(1, min(limit, INBOX_MAX_PAGE_SIZE))
+        notifications = Notification.objects.filter(user=user)
+        if unread_only:
+            notifications = notifications.filter(is_read=False)
+        if cursor:
+            created_at, notification_id = decode_cursor(cursor)
+            notifications = notifications.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=notification_id)
+            )
+
+        page = list(notifications.order_by('-created_at', '-id')[:limit + 1])
+        if len(page) > limit:
+            page = page[:limit]
+            return page, encode_cursor(page[-1])
+        return page, None
+
+    @staticmethod
+    def prune_read(older_than_days: Optional[int] = None, batch_size: int = PRUNE_BATCH_SIZE) -> int:
+        """
+        Delete read notifications older than the retention period, in batches.
+
+        Each batch is its own short transaction, and the scan walks forward by
+        id, so a large backlog never holds long locks or rescans rows it kept.
+        Unread notifications are never pruned, so the unread counters don't change.
+
+        Args:
+            older_than_days: Retention in days (NOTIFICATION_RETENTION_DAYS by default).
+            batch_size: Notifications deleted per batch.
+
+        Returns:
+            Number of notifications deleted.
+        """
+        if older_than_days is None:
+            older_than_days = getattr(settings, 'NOTIFICATION_RETENTION_DAYS', 90)
+        cutoff = timezone.now() - timedelta(days=older_than_days)
+        expired = Notification.objects.filter(is_read=True, created_at__lt=cutoff).order_by('id')
+
+        deleted, last_id = 0, 0
+        while True:
+            ids = list(expired.filter(id__gt=last_id).values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            with transaction.atomic():
+                Notification.objects.filter(id__in=ids).delete()
+            deleted += len(ids)
+            last_id = ids[-1]
+
+        if deleted:
+            logger.info(f"Pruned {deleted} read notifications older than {older_than_days} days")
+        return deleted
+
+    @staticmethod
+    def reconcile_unread_counts(user_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Recompute unread_notifications from the Notification table in one UPDATE.
+
+        Args:
+            user_ids: Users to reconcile (all users when None).
+
+        Returns:
+            Number of user rows updated.
+        """
+        unread_counts = Notification.objects.filter(
+            user=OuterRef('pk'), is_read=False
+        ).order_by().values('user').annotate(total=Count('pk')).values('total')
+
+        users = User.objects.all()
+        if user_ids is not None:
+            users = users.filter(pk__in=list(user_ids))
+        return users.update(unread_notifications=Coalesce(Subquery(unread_counts), Value(0)))
@@ -0,0 +1,142 @@
+"""
+Upcoming-lesson reminders.
+
+Each run scans the time window between the previous successful run and now, so
+a late or skipped beat tick only widens the next window instead of losing
+reminders. Every reminder sent is recorded as a LessonReminder (unique per
+lesson and lead time), which makes overlapping or repeated runs harmless.
+Lessons are loaded with their student and tutor in one query per lead time,
+notifications are written in one batch through NotificationService and the
+emails are queued in the outbox in batches.
+"""
+import logging
+import time as timer
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .email_outbox import enqueue_emails
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = 'lesson_reminders'
+DEFAULT_LEAD_MINUTES = (24 * 60, 60, 10)
+REMINDER_SUBJECT = 'Upcoming Driving Lesson Reminder'
+
+
+def lead_minutes_setting() -> List[int]:
+    """Configured lead times in minutes, shortest first."""
+    leads = getattr(settings, 'LESSON_REMINDER_LEAD_MINUTES', DEFAULT_LEAD_MINUTES)
+    return sorted({int(lead) for lead in leads if int(lead) > 0})
+
+
+def lessons_starting_between(start: datetime, end: datetime):
+    """Lessons starting in the window (start, end]."""
+    from ..models import Lesson
+
+    return Lesson.objects.filter(starts_at__gt=start, starts_at__lte=end)
+
+
+def reminder_message(lesson) -> str:
+    return (f"Reminder: Your driving lesson with {lesson.tutor.get_full_name() or lesson.tutor.username} "
+            f"starts at {lesson.start_time.strftime('%H:%M')} on {lesson.date:%d %b %Y}.")
+
+
+def _reminder_email(lesson, message: str) -> Dict[str, str]:
+    html_body = render_to_string('email/lesson_notification.html', {
+        'user': lesson.student,
+        'lesson': lesson,
+        'message': message,
+    })
+    return {'to_email': lesson.student.email, 'subject': REMINDER_SUBJECT,
+            'body': strip_tags(html_body), 'html_body': html_body}
+
+
+def _chunks(items: List, size: int) -> Iterable[List]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def send_due_reminders(now: Optional[datetime] = None,
+                       lead_minutes: Optional[Iterable[int]] = None) -> Dict[str, Any]:
+    """
+    Send every reminder that fell due since the last successful run.
+
+    For a lead time L the window is (previous run + L, now + L], clipped so it
+    never starts before now (lessons that already began get no reminder) and
+    never reaches back further than LESSON_REMINDER_MAX_CATCHUP_MINUTES. When
+    one run finds a lesson due at several lead times, only the shortest lead
+    is sent and the longer ones are recorded as done.
+
+    Args:
+        now: End of the scan window (the current time by default).
+        lead_minutes: Lead times to scan (LESSON_REMINDER_LEAD_MINUTES by default).
+
+    Returns:
+        Dict with the window, the number of reminders sent per lead time, the
+        total sent and the seconds taken.
+    """
+    from ..models import LessonReminder, SchedulerCheckpoint
+    from .notification_service import NotificationService
+
+    started = timer.perf_counter()
+    now = now or timezone.now()
+    leads = sorted(set(lead_minutes)) if lead_minutes is not None else lead_minutes_setting()
+    catchup = timedelta(minutes=getattr(settings, 'LESSON_REMINDER_MAX_CATCHUP_MINUTES', 60))
+    batch_size = getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 100)
+
+    with transaction.atomic():
+        # The checkpoint row doubles as a lock, so concurrent runs take turns
+        checkpoint, _ = SchedulerCheckpoint.objects.select_for_update().get_or_create(
+            name=CHECKPOINT_NAME, defaults={'last_run_at': now - catchup}
+        )
+        window_start = max(checkpoint.last_run_at, now - catchup)
+
+        reminded = set()
+        records, notifications, emails = [], [], []
+        by_lead = {}
+        for lead in leads:
+            offset = timedelta(minutes=lead)
+            due = (
+                lessons_starting_between(max(window_start + offset, now), now + offset)
+                .exclude(Exists(LessonReminder.objects.filter(lesson=OuterRef('pk'), lead_minutes=lead)))
+                .select_related('student', 'tutor')
+                .order_by('date', 'start_time', 'id')
+            )
+            by_lead[lead] = 0
+            for lesson in due:
+                records.append(LessonReminder(lesson=lesson, lead_minutes=lead))
+                if lesson.id in reminded:
+                    continue
+                reminded.add(lesson.id)
+                by_lead[lead] += 1
+                message = reminder_message(lesson)
+                notifications.append((lesson.student, message, 'lesson_reminder'))
+                if lesson.student.email:
+                    emails.append(_reminder_email(lesson, message))
+
+        LessonReminder.objects.bulk_create(records, batch_size=batch_size, ignore_conflicts=True)
+        NotificationService.send_many(notifications, email=False)
+        for batch in _chunks(emails, batch_size):
+            enqueue_emails(batch)
+
+        checkpoint.last_run_at = now
+        checkpoint.save(update_fields=['last_run_at'])
+
+    stats = {
+        'window_start': window_start,
+        'window_end': now,
+        'by_lead': by_lead,
+        'sent': len(reminded),
+        'seconds': round(timer.perf_counter() - started, 3),
+    }
+    if reminded:
+        logger.info(f"Sent {stats['sent']} lesson reminders for {window_start:%H:%M:%S}-{now:%H:%M:%S} "
+                    f"({by_lead}) in {stats['seconds']}s")
+    return stats
@@ -0,0 +1,453 @@
+"""
+Report renderers shared by the export views.
+
+CSV exports are streamed: rows are produced by generators over chunked
+querysets and written through an Echo pseudo-buffer, so memory stays flat
+and the first bytes go out before the whole export is built.
+
+PDF progress reports are rendered off the request path (Celery, a local
+thread or inline, see PDF_REPORT_BACKEND) and stored under MEDIA_ROOT keyed by
+student id and a fingerprint of the data they were built from, so unchanged
+reports are served straight from disk.
+"""
+import csv
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from ..routers import PRIMARY, use_primary
+from .cache_keys import REPORTS, make_key
+from .student_status import progress_status, students_with_progress_counts
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_SIZE = 2000
+UTF8_BOM = '\ufeff'
+
+# Bump when the PDF layout changes so cached artifacts are rebuilt
+PDF_REPORT_VERSION = 1
+PDF_STATE_TIMEOUT = 600
+PDF_PENDING = 'pending'
+PDF_FAILED = 'failed'
+
+
+class Echo:
+    """File-like object whose write() returns the value instead of buffering it."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def stream_csv(rows: Iterable[Iterable[Any]], filename: str, bom: bool = False) -> StreamingHttpResponse:
+    """
+    Build a StreamingHttpResponse that writes rows as CSV lazily.
+
+    Args:
+        rows: Iterable of rows; consumed while the response is being sent.
+        filename: Download filename for Content-Disposition.
+        bom: Prefix the output with a UTF-8 BOM so Excel detects the encoding.
+
+    Returns:
+        StreamingHttpResponse: The CSV download.
+    """
+    writer = csv.writer(Echo())
+
+    def generate() -> Iterator[str]:
+        if bom:
+            yield UTF8_BOM
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(generate(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def student_status_rows(export_date_str: str, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[list]:
+    """
+    Yield the student status export, one row per student.
+
+    Progress counts come from one annotated query read in chunks.
+    """
+    yield ['Student Username', 'Progress Records Count', 'Status', 'Export Date']
+
+    students = students_with_progress_counts().values_list('username', 'progress_count')
+    for username, progress_count in students.iterator(chunk_size=chunk_size):
+        yield [
+            username,
+            progress_count,
+            progress_status(progress_count),
+            f'"{export_date_str}"'  # Wrap in quotes to force Excel to treat as text
+        ]
+
+
+def progress_report_rows(report_data: Dict[str, Any]) -> Iterator[list]:
+    """Yield the rows of a student's progress report CSV."""
+    # Student Information
+    yield ['STUDENT PROGRESS REPORT']
+    yield ['Generated:', report_data['generated_at']]
+    yield []
+
+    yield ['STUDENT INFORMATION']
+    for key, value in report_data['student_info'].items():
+        yield [key.replace('_', ' ').title(), value]
+    yield []
+
+    # Statistics
+    yield ['STATISTICS']
+    for key, value in report_data['statistics'].items():
+        yield [key.replace('_', ' ').title(), value]
+    yield []
+
+    # AI Insights
+    yield ['AI INSIGHTS']
+    yield ['Analysis', report_data['ai_insights']['analysis']]
+    yield ['Feedback', report_data['ai_insights']['feedback']]
+    yield ['Progress Score', f"{report_data['ai_insights']['progress_score']}%"]
+    yield []
+
+    # Recommendations
+    yield ['RECOMMENDATIONS']
+    for rec in report_data['ai_insights']['recommendations']:
+        yield ['', rec]
+    yield []
+
+    # Lesson History
+    yield ['LESSON HISTORY']
+    yield ['Date', 'Time', 'Duration (min)', 'Tutor', 'Location', 'Skills Covered', 'Progress Notes',
+           'Instructor Feedback', 'Next Focus']
+
+    for lesson in report_data['lesson_history']:
+        yield [
+            lesson['date'],
+            lesson['time'],
+            lesson['duration'],
+            lesson['tutor'],
+            lesson['location'],
+            lesson['skills_covered'],
+            lesson['progress_notes'],
+            lesson['instructor_feedback'],
+            lesson['next_focus']
+        ]
+
+
+def render_progress_report_pdf(report_data: Dict[str, Any]) -> bytes:
+    """
+    Render a student's progress report as a PDF document.
+
+    Args:
+        report_data: Dictionary from DrivingSchoolAI.generate_comprehensive_report_data.
+
+    Returns:
+        bytes: The PDF document.
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+
+    # Create PDF buffer
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+    
+    # Container for the 'Flowable' objects
+    elements = []
+    
+    # Get styles
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        spaceAfter=30,
+        textColor=colors.HexColor('#2c3e50')
+    )
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=14,
+        spaceAfter=12,
+        textColor=colors.HexColor('#34495e')
+    )
+    
+    # Title
+    elements.append(Paragraph("Student Progress Report", title_style))
+    elements.append(Paragraph(f"Generated: {report_data['generated_at']}", styles['Normal']))
+    elements.append(Spacer(1, 20))
+    
+    # Student Information
+    elements.append(Paragraph("Student Information", heading_style))
+    student_data = [
+        ['Name', report_data['student_info']['name']],
+        ['Email', report_data['student_info']['email']],
+        ['Phone', report_data['student_info']['phone']],
+        ['Registration Date', report_data['student_info']['registration_date']]
+    ]
+    
+    student_table = Table(student_data, colWidths=[2*inch, 4*inch])
+    student_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#ecf0f1')),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    elements.append(student_table)
+    elements.append(Spacer(1, 20))
+    
+    # Statistics
+    elements.append(Paragraph("Statistics", heading_style))
+    stats_data = [
+        ['Total Lessons', str(report_data['statistics']['total_lessons'])],
+        ['Total Hours', f"{report_data['statistics']['total_hours']} hours"],
+        ['Lessons with Progress', str(report_data['statistics']['lessons_with_progress'])],
+        ['Completion Rate', f"{report_data['statistics']['completion_rate']}%"],
+        ['Recent Lessons (30 days)', str(report_data['statistics']['recent_lessons_30_days'])],
+        ['Progress Score', f"{report_data['statistics']['progress_score']}%"]
+    ]
+    
+    stats_table = Table(stats_data, colWidths=[2*inch, 4*inch])
+    stats_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#ecf0f1')),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    elements.append(stats_table)
+    elements.append(Spacer(1, 20))
+    
+    # AI Insights
+    elements.append(Paragraph("AI Insights", heading_style))
+    elements.append(Paragraph(f"<b>Analysis:</b> {report_data['ai_insights']['analysis']}", styles['Normal']))
+    elements.append(Spacer(1, 10))
+    elements.append(Paragraph(f"<b>AI Feedback:</b> {report_data['ai_insights']['feedback']}", styles['Normal']))
+    elements.append(Spacer(1, 10))
+    
+    if report_data['ai_insights']['recommendations']:
+        elements.append(Paragraph("<b>Recommendations:</b>", styles['Normal']))
+        for rec in report_data['ai_insights']['recommendations']:
+            elements.append(Paragraph(f"• {rec}", styles['Normal']))
+    elements.append(Spacer(1, 20))
+    
+    # Lesson History
+    if report_data['lesson_history']:
+        elements.append(Paragraph("Lesson History", heading_style))
+        
+        # Create lesson history table
+        lesson_headers = ['Date', 'Time', 'Duration', 'Tutor', 'Skills Covered']
+        lesson_data = [lesson_headers]
+        
+        for lesson in report_data['lesson_history'][:10]:  # Limit to first 10 lessons for PDF
+            lesson_data.append([
+                str(lesson['date']),
+                lesson['time'],
+                f"{lesson['duration']}min",
+                lesson['tutor'],
+                lesson['skills_covered'][:50] + '...' if len(lesson['skills_covered']) > 50 else lesson['skills_covered']
+            ])
+        
+        lesson_table = Table(lesson_data, colWidths=[1*inch, 1*inch, 0.8*inch, 1.2*inch, 2*inch])
+        lesson_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498db')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP')
+        ]))
+        elements.append(lesson_table)
+    
+    # Build PDF
+    doc.build(elements)
+    
+
+    pdf_data = buffer.getvalue()
+    buffer.close()
+    return pdf_data
+
+
+class ProgressReportArtifact:
+    """
+    A student's PDF progress report on disk.
+
+    The fingerprint covers the student's profile, the number and latest
+    update of their lessons and progress records, the current date (the report
+    contains date-relative statistics) and PDF_REPORT_VERSION. Any change gives
+    a new file name, so a stored file never needs invalidating.
+    """
+
+    def __init__(self, student):
+        # Fingerprint the data the builder will read: it runs on the primary,
+        # outside the view's use_replica(), and would otherwise write another file
+        with use_primary():
+            if student._state.db != PRIMARY:
+                student = type(student).objects.get(pk=student.pk)
+            self.student = student
+            self.fingerprint = self._compute_fingerprint()
+        self.directory = Path(settings.MEDIA_ROOT) / 'reports' / 'progress' / str(student.pk)
+        self.path = self.directory / f'{self.fingerprint}.pdf'
+
+    def _compute_fingerprint(self) -> str:
+        from ..models import Lesson, StudentProgress
+
+        lessons = Lesson.objects.filter(student=self.student).aggregate(total=Count('pk'), latest=Max('updated_at'))
+        progress = StudentProgress.objects.filter(student=self.student).aggregate(
+            total=Count('pk'), latest=Max('created_at')
+        )
+        student = self.student
+        parts = [
+            PDF_REPORT_VERSION, student.pk, student.get_full_name(), student.username, student.email,
+            student.phone, student.date_joined, lessons['total'], lessons['latest'],
+            progress['total'], progress['latest'], timezone.localdate(),
+        ]
+        return hashlib.sha256('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:32]
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.fingerprint}"'
+
+    @property
+    def filename(self) -> str:
+        name = self.student.get_full_name() or self.student.username
+        return f'progress_report_{name.replace(" ", "_")}.pdf'
+
+    @property
+    def state_key(self) -> str:
+        return make_key(REPORTS, 'pdf_state', self.student.pk, self.fingerprint)
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def state(self) -> Optional[str]:
+        """PDF_PENDING or PDF_FAILED while the artifact is missing, else None."""
+        return cache.get(self.state_key)
+
+    def write(self, pdf_data: bytes) -> None:
+        """Store the PDF atomically and remove this student's outdated reports."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(pdf_data)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        for stale in self.directory.glob('*.pdf'):
+            if stale != self.path:
+                stale.unlink(missing_ok=True)
+
+
+def build_progress_report_pdf(student_id: int) -> Optional[Path]:
+    """
+    Render and store a student's PDF report unless an up-to-date one exists.
+
+    Args:
+        student_id: ID of the student.
+
+    Returns:
+        Path to the stored PDF, or None if the report could not be built.
+
+    Raises:
+        Exception: Whatever rendering or storing raised, after the report's
+            state has been set to PDF_FAILED.
+    """
+    from ..ai_helper import ai_helper
+    from ..models import User
+
+    student = User.objects.filter(pk=student_id, role='student').first()
+    if student is None:
+        logger.warning(f"PDF report requested for unknown student {student_id}")
+        return None
+
+    artifact = ProgressReportArtifact(student)
+    if artifact.exists():
+        cache.delete(artifact.state_key)
+        return artifact.path
+
+    try:
+        report_data = ai_helper.generate_comprehensive_report_data(student_id)
+        if 'error' in report_data:
+            logger.error(f"PDF report for student {student_id} failed: {report_data['error']}")
+            cache.set(artifact.state_key, PDF_FAILED, PDF_STATE_TIMEOUT)
+            return None
+        artifact.write(render_progress_report_pdf(report_data))
+    except Exception:
+        # Otherwise the state stays pending and clients poll until it expires
+        cache.set(artifact.state_key, PDF_FAILED, PDF_STATE_TIMEOUT)
+        raise
+
+    cache.delete(artifact.state_key)
+    logger.info(f"Stored PDF report for student {student_id} at {artifact.path}")
+    return artifact.path
+
+
+def _build_in_thread(student_id: int) -> None:
+    try:
+        build_progress_report_pdf(student_id)
+    except Exception as e:
+        logger.error(f"Background PDF report for student {student_id} failed: {e}")
+    finally:
+        connections.close_all()
+
+
+def request_progress_report_pdf(artifact: ProgressReportArtifact) -> Optional[str]:
+    """
+    Make sure a missing PDF artifact is being generated.
+
+    Generation is dispatched at most once per fingerprint while it is pending.
+    With PDF_REPORT_BACKEND = 'celery' the task goes to the worker, falling
+    back to a local thread if the broker is unreachable; 'thread' always uses
+    a local thread and 'inline' builds the file before returning.
+
+    Args:
+        artifact: The student's report artifact.
+
+    Returns:
+        None once the file exists, otherwise PDF_PENDING or PDF_FAILED.
+    """
+    if artifact.exists():
+        return None
+
+    state = artifact.state()
+    if state is not None:
+        return state
+
+    backend = getattr(settings, 'PDF_REPORT_BACKEND', 'thread')
+    student_id = artifact.student.pk
+
+    if backend == 'inline':
+        build_progress_report_pdf(student_id)
+        return None if artifact.exists() else artifact.state() or PDF_FAILED
+
+    if not cache.add(artifact.state_key, PDF_PENDING, PDF_STATE_TIMEOUT):
+        return artifact.state()
+
+    if backend == 'celery':
+        from ..tasks import generate_progress_report_pdf
+        try:
+            generate_progress_report_pdf.apply_async(args=[student_id], retry=False)
+            return PDF_PENDING
+        except Exception as e:
+            logger.warning(f"Could not queue PDF report for student {student_id}, building locally: {e}")
+
+    threading.Thread(target=_build_in_thread, args=(student_id,), daemon=True).start()
+    return PDF_PENDING
@@ -0,0 +1,60 @@
+"""
+SQLite connection tuning.
+
+Every new SQLite connection runs the PRAGMAs in SQLITE_PRAGMAS (see
+core.signals). WAL journaling lets readers work alongside the single writer,
+busy_timeout makes a writer wait for the lock instead of failing at once with
+"database is locked", and a larger page cache plus memory-mapped I/O keep hot
+pages out of the read() path, so new connections do not start cold.
+"""
+import logging
+import re
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+logger = logging.getLogger(__name__)
+
+PRAGMA_NAME = re.compile(r'^[a-z_]+$')
+PRAGMA_VALUE = re.compile(r'^-?\w+$')
+
+
+def pragma_statements(pragmas: Dict[str, Any]) -> List[str]:
+    """
+    Build the PRAGMA statements for a settings dict.
+
+    Args:
+        pragmas: PRAGMA name -> value, e.g. {'journal_mode': 'WAL'}.
+
+    Returns:
+        The statements, busy_timeout first so a journal mode switch already
+        waits for other connections.
+
+    Raises:
+        ImproperlyConfigured: If a name or value is not a plain word or number.
+    """
+    statements = []
+    for name, value in sorted(pragmas.items(), key=lambda item: item[0] != 'busy_timeout'):
+        if not PRAGMA_NAME.match(name) or not PRAGMA_VALUE.match(str(value)):
+            raise ImproperlyConfigured(f"Invalid SQLite PRAGMA in SQLITE_PRAGMAS: {name!r} = {value!r}")
+        statements.append(f'PRAGMA {name} = {value}')
+    return statements
+
+
+def apply_pragmas(cursor, pragmas: Dict[str, Any]) -> None:
+    """Run the PRAGMAs on a DB-API cursor."""
+    for statement in pragma_statements(pragmas):
+        cursor.execute(statement)
+
+
+def configure_connection(connection) -> None:
+    """Apply SQLITE_PRAGMAS to a freshly opened Django connection (other vendors are left alone)."""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None)
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, pragmas)
+    logger.debug(f"Applied SQLite pragmas to connection '{connection.alias}'")
@@ -0,0 +1,116 @@
+"""
+Aggregates for the admin student status dashboard.
+
+Every figure is computed in the database with grouped queries, so the cost does
+not depend on how many students or lessons there are. The summary is cached and
+invalidated by the Lesson/StudentProgress signals in core.signals once the
+writing transaction commits.
+"""
+import logging
+from typing import Any, Dict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import ExtractWeekDay
+
+from .cache_keys import STUDENT_STATUS, get_or_build, make_key
+
+logger = logging.getLogger(__name__)
+
+# ExtractWeekDay numbers days from 1 (Sunday) to 7 (Saturday)
+WEEKDAY_NAMES = {2: 'Monday', 3: 'Tuesday', 4: 'Wednesday', 5: 'Thursday',
+                 6: 'Friday', 7: 'Saturday', 1: 'Sunday'}
+
+# Progress-record thresholds shared by the dashboard and the CSV export
+BEGINNER_MAX_RECORDS = 2
+INTERMEDIATE_MAX_RECORDS = 5
+
+
+def progress_status(progress_count: int) -> str:
+    """Map a student's number of progress records to a status label."""
+    if progress_count <= BEGINNER_MAX_RECORDS:
+        return 'Beginner'
+    if progress_count <= INTERMEDIATE_MAX_RECORDS:
+        return 'Intermediate'
+    return 'Advanced'
+
+
+def students_with_progress_counts():
+    """Students annotated with progress_count, ordered by username."""
+    from ..models import User
+
+    return User.objects.filter(role='student').annotate(
+        progress_count=Count('progress_records')
+    ).order_by('username')
+
+
+def build_student_status_summary(list_limit: int) -> Dict[str, Any]:
+    """
+    Compute the dashboard figures with a fixed number of queries.
+
+    Args:
+        list_limit: Maximum number of students listed individually.
+
+    Returns:
+        Dict with student_count, lesson_count, student_progress (username ->
+        progress records, at most list_limit entries), progress_distribution
+        and lesson_frequency.
+    """
+    from ..models import Lesson
+
+    students = students_with_progress_counts()
+    buckets = students.aggregate(
+        total=Count('pk'),
+        beginner=Count('pk', filter=Q(progress_count__lte=BEGINNER_MAX_RECORDS)),
+        intermediate=Count('pk', filter=Q(progress_count__gt=BEGINNER_MAX_RECORDS,
+                                          progress_count__lte=INTERMEDIATE_MAX_RECORDS)),
+    )
+    advanced = buckets['total'] - buckets['beginner'] - buckets['intermediate']
+
+    lesson_frequency = {name: 0 for name in WEEKDAY_NAMES.values()}
+    lesson_count = 0
+    weekday_rows = Lesson.objects.order_by().annotate(
+        weekday=ExtractWeekDay('date')
+    ).values('weekday').annotate(total=Count('pk')).values_list('weekday', 'total')
+    for weekday, total in weekday_rows:
+        lesson_frequency[WEEKDAY_NAMES[weekday]] = total
+        lesson_count += total
+
+    student_progress = dict(students.values_list('username', 'progress_count')[:list_limit])
+
+    return {
+        'student_count': buckets['total'],
+        'lesson_count': lesson_count,
+        'student_progress': student_progress,
+        'progress_distribution': {
+            'Beginner': buckets['beginner'],
+            'Intermediate': buckets['intermediate'],
+            'Advanced': advanced,
+        },
+        'lesson_frequency': lesson_frequency,
+    }
+
+
+def summary_key() -> str:
+    return make_key(STUDENT_STATUS, 'summary')
+
+
+def get_student_status_summary() -> Dict[str, Any]:
+    """Return the cached dashboard summary, rebuilding it on a miss."""
+    return get_or_build(
+        summary_key(),
+        lambda: build_student_status_summary(getattr(settings, 'STUDENT_STATUS_LIST_LIMIT', 100)),
+        getattr(settings, 'STUDENT_STATUS_CACHE_TIMEOUT', 300),
+    )
+
+
+def invalidate_student_status_summary() -> None:
+    key = summary_key()
+    transaction.on_commit(lambda: _delete(key))
+
+
+def _delete(key: str) -> None:
+    cache.delete(key)
+    logger.debug("Student status summary cache invalidated")
@@ -0,0 +1,195 @@
+"""
+Bulk timetable engine.
+
+Loads existing commitments once, assigns students to tutors and slots in memory
+and writes the resulting lessons with a single bulk_create.
+"""
+import logging
+from datetime import date, time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from django.db import transaction
+
+from .availability import AvailabilityIndex
+from .dashboard import invalidate_all_dashboards
+from .lesson_counters import suspend_lesson_counters
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOTS = [(time(10, 0), time(11, 0))]
+
+
+class TimetableEngine:
+    """
+    Assign every student at most `lessons_per_day` lessons per date.
+
+    Slots are tried in order for each student; among the tutors free in a slot
+    the one with the fewest lessons assigned in this run is chosen, so the load
+    is spread evenly across instructors.
+    """
+
+    def __init__(self, dates: Sequence[date], slots: Optional[Sequence[Tuple[time, time]]] = None,
+                 location: str = 'Driving School HQ', lessons_per_day: int = 1):
+        self.dates = sorted(dates)
+        self.slots = list(slots or DEFAULT_SLOTS)
+        self.location = location
+        self.lessons_per_day = lessons_per_day
+        self.planned: List[Dict[str, Any]] = []
+        self.unplaced: List[Dict[str, Any]] = []
+
+    def plan(self, students: Optional[list] = None, tutors: Optional[list] = None) -> List[Dict[str, Any]]:
+        """
+        Build the timetable in memory without writing anything.
+
+        Args:
+            students: Students to schedule (all students by default).
+            tutors: Tutors to schedule with (all tutors by default).
+
+        Returns:
+            List of planned lessons as dicts of student, tutor, date, start_time, end_time.
+        """
+        from ..models import User
+
+        if students is None:
+            students = list(User.objects.filter(role='student').order_by('id'))
+        if tutors is None:
+            tutors = list(User.objects.filter(role='tutor').order_by('id'))
+
+        self.planned, self.unplaced = [], []
+        if not self.dates:
+            return self.planned
+
+        index = AvailabilityIndex.load(self.dates[0], self.dates[-1])
+        tutor_load = {tutor.id: 0 for tutor in tutors}
+
+        for lesson_date in self.dates:
+            # Tutors still free per slot, computed once per slot instead of per student
+            free_tutors = {
+                slot: [t for t in tutors if index.tutor_is_free(t.id, lesson_date, *slot)]
+                for slot in self.slots
+            }
+
+            for student in students:
+                placed = 0
+                for slot in self.slots:
+                    if placed >= self.lessons_per_day:
+                        break
+                    start_time, end_time = slot
+                    if not index.student_is_free(student.id, lesson_date, start_time, end_time):
+                        continue
+                    candidates = [t for t in free_tutors[slot]
+                                  if index.tutor_is_free(t.id, lesson_date, start_time, end_time)]
+                    if not candidates:
+                        continue
+
+                    tutor = min(candidates, key=lambda t: (tutor_load[t.id], t.id))
+                    tutor_load[tutor.id] += 1
+                    free_tutors[slot].remove(tutor)
+                    index.add_lesson(None, tutor.id, student.id, lesson_date, start_time, end_time)
+                    self.planned.append({
+                        'student': student,
+                        'tutor': tutor,
+                        'date': lesson_date,
+                        'start_time': start_time,
+                        'end_time': end_time,
+                    })
+                    placed += 1
+
+                if placed == 0:
+                    self.unplaced.append({
+                        'student': student,
+                        'date': lesson_date,
+                        'reason': 'No free instructor in any slot',
+                    })
+
+        return self.planned
+
+    def commit(self, notify: bool = True) -> List:
+        """
+        Write the planned lessons with one bulk_create and notify everyone in one batch.
+
+        Args:
+            notify: Whether to send notifications to students and tutors.
+
+        Returns:
+            The created Lesson objects.
+        """
+        from ..models import Lesson
+
+        with transaction.atomic(), suspend_lesson_counters() as touched:
+            lessons = Lesson.objects.bulk_create([
+                Lesson(
+                    student=entry['student'],
+                    tutor=entry['tutor'],
+                    date=entry['date'],
+                    start_time=entry['start_time'],
+                    end_time=entry['end_time'],
+                    location=self.location,
+                )
+                for entry in self.planned
+            ])
+
+            # bulk_create skips post_save; lessons_taken is reconciled in one UPDATE on exit
+            touched.update(entry['student'].id for entry in self.planned)
+            # A run schedules most of the school; retire every dashboard with one version bump
+            if self.planned:
+                invalidate_all_dashboards()
+
+            if notify and self.planned:
+                transaction.on_commit(self._send_notifications)
+
+        logger.info(f"Timetable engine created {len(lessons)} lessons; "
+                    f"{len(self.unplaced)} student-days could not be placed")
+        return lessons
+
+    def _send_notifications(self) -> None:
+        from .notification_service import NotificationService
+
+        items = []
+        for entry in self.planned:
+            items.append((
+                entry['student'],
+                f"Lesson scheduled with {entry['tutor'].username} "
+                f"on {entry['date']} at {entry['start_time']}.",
+                'lesson_scheduled',
+            ))
+            items.append((
+                entry['tutor'],
+                f"Lesson scheduled with {entry['student'].username} "
+                f"on {entry['date']} at {entry['start_time']}.",
+                'lesson_scheduled',
+            ))
+        NotificationService.send_many(items)
+
+    def run(self, notify: bool = True) -> Dict[str, Any]:
+        """
+        Plan and commit the timetable.
+
+        Returns:
+            Summary dict with the number of lessons created, the placed lessons
+            and the student-days that could not be placed.
+        """
+        self.plan()
+        lessons = self.commit(notify=notify)
+        return {
+            'created': len(lessons),
+            'placed_students': len({entry['student'].id for entry in self.planned}),
+            'placed': [
+                {
+                    'student': entry['student'].username,
+                    'tutor': entry['tutor'].username,
+                    'date': entry['date'],
+                    'start_time': entry['start_time'],
+                    'end_time': entry['end_time'],
+                }
+                for entry in self.planned
+            ],
+            'unplaced': [
+                {
+                    'student': entry['student'].username,
+                    'date': entry['date'],
+                    'reason': entry['reason'],
+                }
+                for entry in self.unplaced
+            ],
+        }
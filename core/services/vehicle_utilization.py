@@ -0,0 +1,166 @@
+"""
+Vehicle utilisation report for the admin dashboard.
+
+Allocations in the reporting window are read with one grouped query: one row
+per vehicle, weekday and lesson slot, with the number of lessons booked in it
+and their summed duration_minutes. Booked minutes are measured against the
+fleet's operating hours and rolled up per vehicle and per vehicle class; the
+slots' start and end times spread them over weekday-by-hour heatmaps. The
+result is cached for a short time, so dashboard loads share one computation.
+"""
+import logging
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractIsoWeekDay
+from django.utils import timezone
+
+from .availability import to_minutes
+from .cache_keys import FLEET, get_or_build, make_key
+
+logger = logging.getLogger(__name__)
+
+# ExtractIsoWeekDay and date.isoweekday() number days from 1 (Monday) to 7 (Sunday)
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+HIGH_UTILIZATION = 50
+MEDIUM_UTILIZATION = 20
+
+
+def utilization_status(percentage: float) -> str:
+    if percentage > HIGH_UTILIZATION:
+        return 'High'
+    if percentage > MEDIUM_UTILIZATION:
+        return 'Medium'
+    return 'Low'
+
+
+def _percentage(minutes: float, capacity: float) -> float:
+    return round(minutes / capacity * 100, 1) if capacity else 0
+
+
+def _hour_split(start: int, end: int):
+    """Yield (hour, minutes) for the part of [start, end) minutes falling in each hour."""
+    for hour in range(start // 60, (end - 1) // 60 + 1):
+        yield hour, min(end, (hour + 1) * 60) - max(start, hour * 60)
+
+
+def _weekday_counts(first_day: date, days: int) -> Counter:
+    return Counter((first_day + timedelta(days=offset)).isoweekday() for offset in range(days))
+
+
+def _heatmap(minutes: Dict[tuple, int], hours: List[int], weekday_counts: Counter,
+             vehicle_count: int) -> List[Dict[str, Any]]:
+    """Rows of per-hour cells for each weekday; a cell is the share of the fleet booked in that hour."""
+    rows = []
+    for weekday, name in enumerate(WEEKDAYS, start=1):
+        capacity = weekday_counts[weekday] * 60 * vehicle_count
+        cells = []
+        for hour in hours:
+            percentage = min(_percentage(minutes.get((weekday, hour), 0), capacity), 100)
+            cells.append({'hour': hour, 'percentage': percentage, 'alpha': round(percentage / 100, 2)})
+        rows.append({'day': name, 'cells': cells})
+    return rows
+
+
+def build_vehicle_utilization(days: int, opening_hour: int, closing_hour: int,
+                              today: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Compute fleet utilisation over the last `days` days (two queries).
+
+    Args:
+        days: Length of the reporting window, ending today.
+        opening_hour: Hour the fleet's working day starts.
+        closing_hour: Hour the fleet's working day ends.
+        today: Last day of the window (defaults to the local date).
+
+    Returns:
+        Dict with vehicles (per-vehicle rows, busiest first), classes (per-class
+        rows), heatmap_hours, heatmap (weekday rows of hourly cells), class_heatmaps,
+        total_vehicles, average_utilization and the window bounds.
+    """
+    from ..models import Vehicle, VehicleAllocation
+
+    today = today or timezone.localdate()
+    first_day = today - timedelta(days=days - 1)
+    vehicles = list(Vehicle.objects.all())
+
+    rows = VehicleAllocation.objects.filter(
+        lesson__date__gte=first_day, lesson__date__lte=today
+    ).annotate(weekday=ExtractIsoWeekDay('lesson__date')).values(
+        'vehicle_id', 'weekday', 'lesson__start_time', 'lesson__end_time'
+    ).annotate(lessons=Count('pk'), minutes=Sum('lesson__duration_minutes')).order_by()
+
+    vehicle_classes = {vehicle.id: vehicle.vehicle_class for vehicle in vehicles}
+    booked = Counter()
+    lesson_counts = Counter()
+    fleet_hours = Counter()
+    class_hours = defaultdict(Counter)
+    hours = set(range(opening_hour, closing_hour))
+    for row in rows:
+        vehicle_id, lessons = row['vehicle_id'], row['lessons']
+        booked[vehicle_id] += row['minutes']
+        lesson_counts[vehicle_id] += lessons
+        start, end = to_minutes(row['lesson__start_time']), to_minutes(row['lesson__end_time'])
+        for hour, minutes in _hour_split(start, end):
+            fleet_hours[row['weekday'], hour] += minutes * lessons
+            class_hours[vehicle_classes[vehicle_id]][row['weekday'], hour] += minutes * lessons
+            hours.add(hour)
+
+    capacity = days * (closing_hour - opening_hour) * 60
+    report_vehicles = []
+    for vehicle in vehicles:
+        percentage = _percentage(booked[vehicle.id], capacity)
+        report_vehicles.append({
+            'vehicle': vehicle,
+            'recent_lessons': lesson_counts[vehicle.id],
+            'booked_minutes': booked[vehicle.id],
+            'utilization_percentage': percentage,
+            'status': utilization_status(percentage),
+        })
+    report_vehicles.sort(key=lambda item: -item['utilization_percentage'])
+
+    class_labels = dict(Vehicle.VEHICLE_CLASS_CHOICES)
+    fleet_by_class = Counter(vehicle_classes.values())
+    classes = []
+    for vehicle_class, vehicle_count in sorted(fleet_by_class.items()):
+        minutes = sum(booked[vehicle_id] for vehicle_id, cls in vehicle_classes.items() if cls == vehicle_class)
+        percentage = _percentage(minutes, capacity * vehicle_count)
+        classes.append({
+            'vehicle_class': vehicle_class,
+            'label': class_labels.get(vehicle_class, vehicle_class),
+            'vehicle_count': vehicle_count,
+            'booked_minutes': minutes,
+            'utilization_percentage': percentage,
+            'status': utilization_status(percentage),
+        })
+
+    weekday_counts = _weekday_counts(first_day, days)
+    heatmap_hours = sorted(hours)
+    return {
+        'vehicles': report_vehicles,
+        'classes': classes,
+        'heatmap_hours': heatmap_hours,
+        'heatmap': _heatmap(fleet_hours, heatmap_hours, weekday_counts, len(vehicles)),
+        'class_heatmaps': {
+            vehicle_class: _heatmap(class_hours[vehicle_class], heatmap_hours, weekday_counts, vehicle_count)
+            for vehicle_class, vehicle_count in fleet_by_class.items()
+        },
+        'total_vehicles': len(vehicles),
+        'average_utilization': _percentage(sum(booked.values()), capacity * len(vehicles)),
+        'first_day': first_day,
+        'last_day': today,
+    }
+
+
+def get_vehicle_utilization() -> Dict[str, Any]:
+    """The cached utilisation report, rebuilt at most every VEHICLE_UTILIZATION_CACHE_TIMEOUT seconds."""
+    days = getattr(settings, 'VEHICLE_UTILIZATION_DAYS', 30)
+    opening_hour, closing_hour = getattr(settings, 'FLEET_OPERATING_HOURS', (8, 18))
+    today = timezone.localdate()
+    key = make_key(FLEET, 'utilization', days, opening_hour, closing_hour, today.isoformat())
+    return get_or_build(key, lambda: build_vehicle_utilization(days, opening_hour, closing_hour, today),
+                        getattr(settings, 'VEHICLE_UTILIZATION_CACHE_TIMEOUT', 120))
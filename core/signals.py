@@ -0,0 +1,81 @@
+"""
+Signal receivers for the core app: cache invalidation and database connection setup.
+
+Connected in CoreConfig.ready().
+"""
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import User, Lesson, StudentProgress, VehicleAllocation, Notification
+from .services.dashboard import invalidate_dashboards, invalidate_notifications
+from .services.sqlite_tuning import configure_connection
+from .services.student_status import invalidate_student_status_summary
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+@receiver(post_save, sender=StudentProgress)
+@receiver(post_delete, sender=StudentProgress)
+def invalidate_student_status_on_change(sender, **kwargs):
+    invalidate_student_status_summary()
+
+
+@receiver(post_save, sender=User)
+def invalidate_student_status_on_new_student(sender, instance, created, **kwargs):
+    # Ignore routine saves such as last_login updates; only a new student changes the counts
+    if created and instance.role == 'student':
+        invalidate_student_status_summary()
+
+
+@receiver(post_delete, sender=User)
+def invalidate_student_status_on_student_removed(sender, instance, **kwargs):
+    if instance.role == 'student':
+        invalidate_student_status_summary()
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def invalidate_dashboards_on_lesson_change(sender, instance, **kwargs):
+    student_ids, tutor_ids = [instance.student_id], [instance.tutor_id]
+    # A reschedule may move the lesson to another tutor; both dashboards must be refreshed
+    previous = getattr(instance, '_loaded_participants', None)
+    if previous:
+        student_ids.append(previous[0])
+        tutor_ids.append(previous[1])
+    invalidate_dashboards(student_ids, tutor_ids, admin=True)
+
+
+@receiver(post_save, sender=StudentProgress)
+@receiver(post_delete, sender=StudentProgress)
+def invalidate_dashboards_on_progress_change(sender, instance, **kwargs):
+    tutor_id = Lesson.objects.filter(pk=instance.lesson_id).values_list('tutor_id', flat=True).first()
+    invalidate_dashboards([instance.student_id], [tutor_id])
+
+
+@receiver(post_save, sender=VehicleAllocation)
+@receiver(post_delete, sender=VehicleAllocation)
+def invalidate_admin_dashboard_on_allocation_change(sender, **kwargs):
+    invalidate_dashboards(admin=True)
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def invalidate_notifications_on_change(sender, instance, **kwargs):
+    invalidate_notifications([instance.user_id])
+
+
+@receiver(post_save, sender=User)
+def invalidate_admin_dashboard_on_new_user(sender, instance, created, **kwargs):
+    if created:
+        invalidate_dashboards(admin=True)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_admin_dashboard_on_user_removed(sender, instance, **kwargs):
+    invalidate_dashboards(admin=True)
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    configure_connection(connection)
@@ -0,0 +1,67 @@
+"""
+Tests for the in-memory availability index.
+"""
+from datetime import time, timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core.ai_helper import ai_helper
+from core.models import User, Lesson, Vehicle, VehicleAllocation
+from core.services.availability import AvailabilityIndex, IntervalList
+
+
+class IntervalListTests(TestCase):
+    def test_overlap_detection(self):
+        intervals = IntervalList()
+        intervals.add(600, 660, 1)   # 10:00 - 11:00
+        intervals.add(480, 720, 2)   # 08:00 - 12:00
+        intervals.add(840, 870, 3)   # 14:00 - 14:30
+
+        self.assertTrue(intervals.overlaps(690, 700))
+        self.assertFalse(intervals.overlaps(720, 840))  # touching edges do not overlap
+        self.assertTrue(intervals.overlaps(860, 900))
+        self.assertFalse(intervals.overlaps(690, 700, exclude_lesson_id=2))
+
+        intervals.remove(2)
+        self.assertFalse(intervals.overlaps(690, 700))
+
+
+class AvailabilityIndexTests(TestCase):
+    def setUp(self):
+        self.day = timezone.now().date() + timedelta(days=1)
+        self.student = User.objects.create_user(username='idx_student', password='pass', role='student')
+        self.other_student = User.objects.create_user(username='idx_student2', password='pass', role='student')
+        self.tutor = User.objects.create_user(username='idx_tutor', password='pass', role='tutor')
+        self.vehicles = [
+            Vehicle.objects.create(registration_number=f'IDX{i}', make='Toyota', model='Corolla', year=2020,
+                                   vehicle_class='class1', vehicle_type='sedan')
+            for i in range(3)
+        ]
+        lesson = Lesson.objects.create(student=self.other_student, tutor=self.tutor, date=self.day,
+                                       start_time=time(10, 0), end_time=time(11, 0), location='HQ')
+        VehicleAllocation.objects.create(lesson=lesson, vehicle=self.vehicles[0])
+
+    def test_conflicts_and_vehicles_from_memory(self):
+        index = AvailabilityIndex.load(self.day)
+        with self.assertNumQueries(1):
+            self.assertTrue(index.has_conflict(self.tutor.id, self.student.id, self.day, time(10, 30), time(11, 30)))
+            self.assertFalse(index.has_conflict(self.tutor.id, self.student.id, self.day, time(11, 0), time(12, 0)))
+            self.assertEqual(len(index.available_vehicles(self.day, time(10, 0), time(11, 0))), 2)
+            self.assertEqual(len(index.available_vehicles(self.day, time(12, 0), time(13, 0))), 3)
+
+    def test_restricted_index_does_not_track_vehicles(self):
+        index = AvailabilityIndex.load(self.day, tutor_ids=[self.tutor.id], student_ids=[self.student.id])
+        self.assertTrue(index.has_conflict(self.tutor.id, self.student.id, self.day, time(10, 0), time(11, 0)))
+        with self.assertRaises(RuntimeError):
+            index.available_vehicles(self.day, time(10, 0), time(11, 0))
+
+    def test_slot_suggestion_runs_in_constant_queries(self):
+        for i in range(5):
+            Vehicle.objects.create(registration_number=f'EXTRA{i}', make='Honda', model='Fit', year=2021,
+                                   vehicle_class='class2', vehicle_type='hatchback')
+        # tutor + student lookups, one lesson query and one vehicle query
+        with self.assertNumQueries(4):
+            suggestions = ai_helper.suggest_optimal_lesson_times(self.tutor.id, self.student.id, self.day)
+        self.assertEqual(len(suggestions), 5)
+        self.assertNotIn(time(10, 0), [s['start_time'] for s in suggestions])
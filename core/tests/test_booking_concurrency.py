@@ -0,0 +1,71 @@
+"""
+Concurrency stress tests for the atomic booking service.
+"""
+import threading
+from datetime import time, timedelta
+
+from django.db import connection
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from core.models import User, Lesson, Vehicle, VehicleAllocation
+from core.services import booking
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    workers = 8
+
+    def setUp(self):
+        self.day = timezone.now().date() + timedelta(days=3)
+        self.students = [
+            User.objects.create_user(username=f'race_student{i}', role='student')
+            for i in range(self.workers)
+        ]
+        self.tutors = [
+            User.objects.create_user(username=f'race_tutor{i}', role='tutor')
+            for i in range(self.workers)
+        ]
+        self.vehicle = Vehicle.objects.create(registration_number='RACE1', make='Toyota', model='Yaris',
+                                              year=2022, vehicle_class='class1', vehicle_type='hatchback')
+
+    def _book_in_parallel(self, pairs):
+        barrier = threading.Barrier(len(pairs))
+        outcomes = []
+
+        def attempt(student, tutor):
+            try:
+                barrier.wait()
+                booking.book_lesson(student, tutor, self.day, time(10, 0), time(11, 0), 'HQ')
+                outcomes.append('booked')
+            except booking.BookingConflict:
+                outcomes.append('conflict')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attempt, args=pair) for pair in pairs]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def test_parallel_bookings_for_one_tutor_never_double_book(self):
+        tutor = self.tutors[0]
+        outcomes = self._book_in_parallel([(student, tutor) for student in self.students])
+
+        self.assertEqual(len(outcomes), self.workers)
+        self.assertLessEqual(outcomes.count('booked'), 1)
+        self.assertEqual(Lesson.objects.filter(tutor=tutor, date=self.day).count(), outcomes.count('booked'))
+
+    def test_parallel_bookings_never_share_a_vehicle(self):
+        outcomes = self._book_in_parallel(list(zip(self.students, self.tutors)))
+
+        self.assertEqual(len(outcomes), self.workers)
+        self.assertLessEqual(
+            VehicleAllocation.objects.filter(vehicle=self.vehicle, lesson__date=self.day).count(), 1
+        )
+
+    def test_sequential_conflict_is_reported(self):
+        booking.book_lesson(self.students[0], self.tutors[0], self.day, time(10, 0), time(11, 0), 'HQ')
+        with self.assertRaises(booking.BookingConflict):
+            booking.book_lesson(self.students[1], self.tutors[0], self.day, time(10, 30), time(11, 30), 'HQ')
@@ -0,0 +1,71 @@
+"""
+Tests for the namespaced, versioned cache keys.
+"""
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from core.models import User
+from core.services.cache_keys import DASHBOARD, REPORTS, bump_namespace, make_key, namespace_version
+from core.services.dashboard import get_role_dashboard, invalidate_all_dashboards, student_key
+
+
+class CacheKeyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_tests_use_the_local_cache(self):
+        self.assertEqual(settings.CACHES['default']['BACKEND'], 'django.core.cache.backends.locmem.LocMemCache')
+
+    def test_key_embeds_namespace_and_version(self):
+        version = namespace_version(REPORTS)
+        self.assertEqual(make_key(REPORTS, 'pdf_state', 7), f'reports:v{version}:pdf_state:7')
+
+    def test_bump_retires_only_that_namespace(self):
+        cache.set(make_key(DASHBOARD, 'a'), 1)
+        cache.set(make_key(REPORTS, 'a'), 2)
+
+        bump_namespace(DASHBOARD)
+
+        self.assertIsNone(cache.get(make_key(DASHBOARD, 'a')))
+        self.assertEqual(cache.get(make_key(REPORTS, 'a')), 2)
+
+    def test_lost_version_counter_does_not_resurrect_old_entries(self):
+        clock = 'core.services.cache_keys.time.time_ns'
+        with mock.patch(clock, return_value=1_000_000_000):
+            old_key = make_key(DASHBOARD, 'a')
+        cache.set(old_key, 1)
+        bump_namespace(DASHBOARD)
+        # Simulate eviction of the counter itself; it restarts from the clock
+        cache.delete(f'ns:{DASHBOARD}:version')
+
+        with mock.patch(clock, return_value=5_000_000_000):
+            self.assertEqual(make_key(DASHBOARD, 'a'), 'dashboard:v5000000:a')
+        self.assertIsNone(cache.get(make_key(DASHBOARD, 'a')))
+
+    def test_invalidate_all_dashboards(self):
+        student = User.objects.create_user(username='ns_student', role='student')
+        get_role_dashboard(student)
+        self.assertIsNotNone(cache.get(student_key(student.id)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_all_dashboards()
+
+        self.assertIsNone(cache.get(student_key(student.id)))
+
+    def test_bump_command(self):
+        out = StringIO()
+        before = namespace_version(DASHBOARD)
+        call_command('bump_cache_namespace', DASHBOARD, stdout=out)
+        self.assertEqual(namespace_version(DASHBOARD), before + 1)
+        self.assertIn('dashboard: now at version', out.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command('bump_cache_namespace', 'nonsense', stdout=out)
+        with self.assertRaises(CommandError):
+            call_command('bump_cache_namespace', stdout=out)
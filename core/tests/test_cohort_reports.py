@@ -0,0 +1,91 @@
+"""
+Tests for the cohort progress report ZIP export.
+"""
+import io
+import os
+import tempfile
+import zipfile
+from datetime import date, time
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from core.models import User, Lesson, StudentProgress
+from core.services.cohort_reports import CohortReportExport, cohort_students
+
+
+class CohortReportExportTests(TestCase):
+    def setUp(self):
+        self.tutor = User.objects.create_user(username='cohort_tutor', role='tutor')
+        self.other_tutor = User.objects.create_user(username='other_tutor', role='tutor')
+        self.students = [self._student(f'cohort{i}', lessons=i + 1, tutor=self.tutor) for i in range(3)]
+        self.advanced = self._student('advanced', lessons=11, tutor=self.other_tutor)
+
+    def _student(self, username, lessons, tutor):
+        student = User.objects.create_user(username=username, role='student')
+        for i in range(lessons):
+            lesson = Lesson.objects.create(student=student, tutor=tutor, date=date(2024, 1, 1 + i),
+                                           start_time=time(10, 0), end_time=time(11, 0), location='HQ')
+            StudentProgress.objects.create(student=student, lesson=lesson, progress_notes=f'note {i}',
+                                           skills_covered='parking', next_lesson_focus='f', instructor_feedback='good')
+        return student
+
+    def _archive(self, export):
+        return zipfile.ZipFile(io.BytesIO(b''.join(export.iter_zip())))
+
+    def test_filters(self):
+        self.assertEqual(list(cohort_students(tutor_id=self.tutor.id)), self.students)
+        self.assertEqual(list(cohort_students(date_from=date(2024, 1, 4))), [self.advanced])
+        self.assertEqual(list(cohort_students(level='Advanced')), [self.advanced])
+
+    def test_report_data_uses_prefetched_rows(self):
+        export = CohortReportExport(cohort_students(), formats=['csv'], workers=0)
+        # students, lessons with tutors and progress records: one query each
+        with self.assertNumQueries(3):
+            archive = self._archive(export)
+
+        self.assertEqual(len(archive.namelist()), 4)
+        self.assertEqual(export.stats['students'], 4)
+        report = archive.read(f'cohort2_{self.students[2].id}/progress_report.csv').decode('utf-8')
+        self.assertIn('Total Lessons,3', report)
+        self.assertIn('note 2', report)
+
+    def test_process_pool_renders_pdf_and_csv(self):
+        export = CohortReportExport(cohort_students(tutor_id=self.tutor.id), workers=2)
+        archive = self._archive(export)
+
+        self.assertEqual(sorted(archive.namelist()), sorted(
+            f'{s.username}_{s.id}/progress_report.{ext}' for s in self.students for ext in ('pdf', 'csv')
+        ))
+        self.assertTrue(archive.read(f'cohort0_{self.students[0].id}/progress_report.pdf').startswith(b'%PDF'))
+        self.assertEqual(export.stats['reports'], 6)
+        self.assertGreater(export.stats['reports_per_second'], 0)
+
+    def test_command_writes_archive_and_reports_throughput(self):
+        fd, path = tempfile.mkstemp(suffix='.zip')
+        os.close(fd)
+        self.addCleanup(os.unlink, path)
+
+        out = io.StringIO()
+        call_command('export_cohort_reports', path, '--level', 'Advanced', '--workers', '0', stdout=out)
+        self.assertIn('Exported 2 reports for 1 students', out.getvalue())
+        self.assertIn('reports/s', out.getvalue())
+        with zipfile.ZipFile(path) as archive:
+            self.assertEqual(len(archive.namelist()), 2)
+
+    def test_admin_endpoint_streams_zip(self):
+        admin = User.objects.create_user(username='cohort_admin', role='admin')
+        url = reverse('export_cohort_reports')
+
+        self.client.force_login(self.tutor)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(admin)
+        with self.settings(COHORT_EXPORT_WORKERS=0):
+            response = self.client.get(url, {'tutor': self.other_tutor.id, 'formats': 'csv'})
+            self.assertEqual(response['Content-Type'], 'application/zip')
+            archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(archive.namelist(), [f'advanced_{self.advanced.id}/progress_report.csv'])
+
+        self.assertEqual(self.client.get(url, {'date_from': 'yesterday'}).status_code, 400)
@@ -0,0 +1,121 @@
+"""
+Tests for the cached per-role dashboard data and its signal-driven invalidation.
+"""
+from datetime import time, timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import User, Lesson, StudentProgress, Vehicle, VehicleAllocation
+from core.services.dashboard import admin_key, get_role_dashboard, student_key, tutor_key
+from core.services.notification_service import NotificationService
+
+
+@override_settings(EMAIL_OUTBOX_BACKEND='')
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tomorrow = timezone.localdate() + timedelta(days=1)
+        self.student = User.objects.create_user(username='dash_student', role='student', password='pass')
+        self.tutor = User.objects.create_user(username='dash_tutor', role='tutor', password='pass')
+        self.other_tutor = User.objects.create_user(username='dash_tutor2', role='tutor', password='pass')
+        self.admin = User.objects.create_user(username='dash_admin', role='admin', password='pass')
+        self.lesson = Lesson.objects.create(student=self.student, tutor=self.tutor, date=self.tomorrow,
+                                            start_time=time(9, 0), end_time=time(10, 0), location='HQ')
+
+    def _warm(self, *users):
+        for user in users:
+            get_role_dashboard(user)
+
+    def test_repeat_dashboard_hits_skip_role_queries(self):
+        self.client.login(username='dash_student', password='pass')
+        self.client.get(reverse('dashboard'))
+
+        # Session and user lookups only; lessons, progress and analysis come from the cache
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual([lesson.id for lesson in response.context['lessons']], [self.lesson.id])
+
+    def test_admin_data_is_shared(self):
+        other_admin = User.objects.create_user(username='dash_admin2', role='admin')
+        self._warm(self.admin)
+        with self.assertNumQueries(0):
+            data = get_role_dashboard(other_admin)
+        self.assertEqual(data['tutor_count'], 2)
+
+    def test_lesson_change_invalidates_only_its_participants(self):
+        bystander = User.objects.create_user(username='dash_bystander', role='student')
+        self._warm(self.student, self.tutor, self.other_tutor, bystander, self.admin)
+
+        # Reschedule onto another tutor: old and new tutor both change
+        lesson = Lesson.objects.get(pk=self.lesson.pk)
+        lesson.tutor = self.other_tutor
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson.save()
+
+        self.assertIsNone(cache.get(student_key(self.student.id)))
+        self.assertIsNone(cache.get(tutor_key(self.tutor.id)))
+        self.assertIsNone(cache.get(tutor_key(self.other_tutor.id)))
+        self.assertIsNone(cache.get(admin_key()))
+        self.assertIsNotNone(cache.get(student_key(bystander.id)))
+
+    def test_progress_and_allocation_changes(self):
+        self._warm(self.student, self.tutor, self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            StudentProgress.objects.create(student=self.student, lesson=self.lesson, progress_notes='n',
+                                           skills_covered='s', next_lesson_focus='f',
+                                           instructor_feedback='good')
+        self.assertIsNone(cache.get(student_key(self.student.id)))
+        self.assertIsNone(cache.get(tutor_key(self.tutor.id)))
+        self.assertIsNotNone(cache.get(admin_key()))
+
+        self.assertEqual(len(get_role_dashboard(self.student)['progress']), 1)
+
+        vehicle = Vehicle.objects.create(registration_number='DASH1', make='Toyota', model='Corolla', year=2020,
+                                         vehicle_class='class1', vehicle_type='sedan')
+        self._warm(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            VehicleAllocation.objects.create(lesson=self.lesson, vehicle=vehicle)
+        self.assertIsNone(cache.get(admin_key()))
+        self.assertIsNotNone(cache.get(student_key(self.student.id)))
+
+    def test_unread_notifications_refresh_after_send_and_read(self):
+        self.client.login(username='dash_student', password='pass')
+        NotificationService.send_notification(self.student, 'First', email=False)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual([n.message for n in response.context['notifications']], ['First'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            NotificationService.send_notification(self.student, 'Second', email=False)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(len(response.context['notifications']), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            NotificationService.mark_read(self.student)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(list(response.context['notifications']), [])
+
+    def test_instructor_approval_refreshes_tutor_dashboard(self):
+        self._warm(self.tutor)
+        self.client.login(username='dash_tutor', password='pass')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('mark_instructor_approved', args=[self.student.id]))
+
+        students = get_role_dashboard(self.tutor)['students']
+        self.assertTrue(students[0].instructor_approved)
+
+    def test_invalidation_waits_for_commit(self):
+        self._warm(self.student, self.tutor)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Lesson.objects.create(student=self.student, tutor=self.tutor, date=self.tomorrow,
+                                  start_time=time(11, 0), end_time=time(12, 0), location='HQ')
+            # Still in the writer's transaction: a rebuild now would cache uncommitted state
+            self.assertIsNotNone(cache.get(student_key(self.student.id)))
+
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(cache.get(student_key(self.student.id)))
+        self.assertIsNone(cache.get(tutor_key(self.tutor.id)))
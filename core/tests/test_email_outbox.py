@@ -0,0 +1,106 @@
+"""
+Tests for the transactional email outbox.
+"""
+from datetime import timedelta
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import User, Notification, OutboxEmail
+from core.services.email_outbox import drain_outbox, enqueue_email, kick_outbox_drain, outbox_metrics
+from core.views.lesson_views import send_notification
+
+
+class FlakyBackend(EmailBackend):
+    """locmem backend that rejects recipients containing 'bounce' and counts opened connections."""
+    opened = 0
+
+    def open(self):
+        FlakyBackend.opened += 1
+        return super().open()
+
+    def send_messages(self, messages):
+        for message in messages:
+            if any('bounce' in address for address in message.to):
+                raise ConnectionError('mailbox unavailable')
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND='core.tests.test_email_outbox.FlakyBackend',
+                   EMAIL_OUTBOX_MAX_ATTEMPTS=3, EMAIL_OUTBOX_BACKOFF_SECONDS=10)
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        FlakyBackend.opened = 0
+        self.user = User.objects.create_user(username='outbox_user', email='user@example.com')
+
+    def test_notification_is_queued_not_sent(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            send_notification(self.user, 'Lesson booked')
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Notification.objects.filter(user=self.user).count(), 1)
+        email = OutboxEmail.objects.get()
+        self.assertEqual((email.to_email, email.body, email.status), ('user@example.com', 'Lesson booked', 'pending'))
+        self.assertIn(kick_outbox_drain, callbacks)
+
+    def test_rolled_back_change_queues_nothing(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                send_notification(self.user, 'Lesson booked')
+                raise RuntimeError('booking failed')
+        self.assertFalse(OutboxEmail.objects.exists())
+        self.assertFalse(Notification.objects.exists())
+
+    def test_drain_sends_batches_over_one_connection(self):
+        for i in range(5):
+            enqueue_email(f'student{i}@example.com', 'Subject', f'Body {i}', html_body=f'<p>Body {i}</p>')
+
+        stats = drain_outbox(batch_size=2)
+
+        self.assertEqual((stats['sent'], stats['batches']), (5, 3))
+        self.assertEqual(FlakyBackend.opened, 1)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        self.assertEqual(OutboxEmail.objects.filter(status='sent', sent_at__isnull=False).count(), 5)
+        self.assertEqual(drain_outbox()['batches'], 0)
+
+    def test_failures_back_off_then_dead_letter(self):
+        enqueue_email('ok@example.com', 'Subject', 'Body')
+        bounced = enqueue_email('bounce@example.com', 'Subject', 'Body')
+
+        stats = drain_outbox()
+        self.assertEqual((stats['sent'], stats['retried']), (1, 1))
+        bounced.refresh_from_db()
+        self.assertEqual((bounced.status, bounced.attempts), ('pending', 1))
+        self.assertGreater(bounced.next_attempt_at, timezone.now() + timedelta(seconds=5))
+        self.assertIn('mailbox unavailable', bounced.last_error)
+
+        # Not due yet
+        self.assertEqual(drain_outbox()['batches'], 0)
+
+        OutboxEmail.objects.filter(pk=bounced.pk).update(next_attempt_at=timezone.now(), attempts=2)
+        self.assertEqual(drain_outbox()['dead'], 1)
+        bounced.refresh_from_db()
+        self.assertEqual((bounced.status, bounced.attempts), ('dead', 3))
+
+    def test_expired_lease_is_reclaimed(self):
+        email = enqueue_email('user@example.com', 'Subject', 'Body')
+        OutboxEmail.objects.filter(pk=email.pk).update(status='sending',
+                                                       next_attempt_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(drain_outbox()['sent'], 1)
+
+    def test_metrics_and_command(self):
+        enqueue_email('user@example.com', 'Subject', 'Body')
+        enqueue_email('bounce@example.com', 'Subject', 'Body')
+        self.assertEqual(outbox_metrics()['pending'], 2)
+
+        call_command('drain_email_outbox', stdout=open('/dev/null', 'w'))
+
+        metrics = outbox_metrics()
+        self.assertEqual((metrics['pending'], metrics['dead']), (1, 0))
+        self.assertGreaterEqual(metrics['avg_latency_seconds'], 0)
+        self.assertGreater(metrics['oldest_pending_seconds'], 0)
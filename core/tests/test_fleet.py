@@ -0,0 +1,93 @@
+"""
+Tests for the sweep-line fleet allocator.
+"""
+import time as timer
+from datetime import time, timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.ai_helper import ai_helper
+from core.models import User, Lesson, Vehicle, VehicleAllocation
+from core.services.fleet import FleetAllocator, reoptimize_day
+
+
+def _vehicle(pk, vehicle_class):
+    return Vehicle(id=pk, registration_number=f'V{pk}', make='Toyota', model='Corolla', year=2020,
+                   vehicle_class=vehicle_class, vehicle_type='sedan')
+
+
+class FleetAllocatorOptimizeTests(TestCase):
+    def test_prefers_class_then_falls_back(self):
+        day = timezone.now().date()
+        allocator = FleetAllocator(day, [_vehicle(1, 'class1'), _vehicle(2, 'class2')])
+        lessons = [
+            {'id': 10, 'start_time': time(9, 0), 'end_time': time(10, 0), 'vehicle_class': 'class1', 'vehicle_id': None},
+            {'id': 11, 'start_time': time(9, 30), 'end_time': time(10, 30), 'vehicle_class': 'class1', 'vehicle_id': None},
+            {'id': 12, 'start_time': time(10, 0), 'end_time': time(11, 0), 'vehicle_class': 'class1', 'vehicle_id': None},
+            {'id': 13, 'start_time': time(9, 45), 'end_time': time(10, 15), 'vehicle_class': 'class1', 'vehicle_id': None},
+        ]
+        result = allocator.optimize(lessons)
+
+        self.assertEqual(result['assignments'][10], 1)
+        self.assertEqual(result['assignments'][11], 2)   # fallback to the other class
+        self.assertEqual(result['assignments'][12], 1)   # class1 vehicle freed at 10:00
+        self.assertEqual(result['unassigned'], [13])
+        self.assertEqual(result['class_mismatches'], 1)
+
+    def test_keeps_existing_matching_allocations(self):
+        day = timezone.now().date()
+        allocator = FleetAllocator(day, [_vehicle(1, 'class1'), _vehicle(2, 'class1')])
+        lessons = [
+            {'id': 10, 'start_time': time(9, 0), 'end_time': time(10, 0), 'vehicle_class': 'class1', 'vehicle_id': 2},
+            {'id': 11, 'start_time': time(9, 0), 'end_time': time(10, 0), 'vehicle_class': 'class1', 'vehicle_id': None},
+        ]
+        result = allocator.optimize(lessons)
+
+        self.assertEqual(result['assignments'], {10: 2, 11: 1})
+        self.assertEqual(result['vehicle_swaps'], 0)
+
+
+class ReoptimizeDayTests(TestCase):
+    def setUp(self):
+        self.day = timezone.now().date() + timedelta(days=1)
+        self.student = User.objects.create_user(username='fleet_student', role='student')
+        self.tutor = User.objects.create_user(username='fleet_tutor', role='tutor')
+        Vehicle.objects.bulk_create([
+            Vehicle(registration_number=f'FL{i}', make='Toyota', model='Corolla', year=2020,
+                    vehicle_class='class1' if i % 3 else 'class2', vehicle_type='sedan')
+            for i in range(60)
+        ])
+
+    def test_whole_day_in_constant_queries(self):
+        Lesson.objects.bulk_create([
+            Lesson(student=self.student, tutor=self.tutor, date=self.day,
+                   start_time=time(8 + (i % 10), 0), end_time=time(9 + (i % 10), 0), location='HQ')
+            for i in range(500)
+        ])
+
+        started = timer.perf_counter()
+        result = reoptimize_day(self.day, dry_run=True)
+        self.assertLess(timer.perf_counter() - started, 1.0)
+        self.assertEqual(len(result['assignments']), 500)
+        self.assertEqual(result['unassigned'], [])
+
+        # lessons, vehicles, savepoint pair, existing allocations and the batched insert
+        with CaptureQueriesContext(connection) as queries:
+            result = reoptimize_day(self.day)
+        self.assertLessEqual(len(queries), 10)
+        self.assertEqual(result['created'], 500)
+        self.assertEqual(VehicleAllocation.objects.filter(lesson__date=self.day).count(), 500)
+
+    def test_suggestions_use_two_queries(self):
+        lesson = Lesson.objects.create(student=self.student, tutor=self.tutor, date=self.day,
+                                       start_time=time(10, 0), end_time=time(11, 0), location='HQ')
+        VehicleAllocation.objects.create(lesson=lesson, vehicle=Vehicle.objects.first())
+
+        with self.assertNumQueries(2):
+            suggestions = ai_helper.suggest_available_vehicles(self.day, time(10, 30), time(11, 30), 'class2')
+        self.assertEqual(len(suggestions), 59)
+        self.assertEqual(suggestions[0]['recommendation'], 'Perfect Match')
+        self.assertEqual(suggestions[-1]['recommendation'], 'Alternative Option')
@@ -0,0 +1,72 @@
+"""
+Tests for User.lessons_taken counter maintenance.
+"""
+from datetime import time, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import User, Lesson
+from core.services.lesson_counters import reconcile_lessons_taken, suspend_lesson_counters
+
+
+class LessonCounterTests(TestCase):
+    def setUp(self):
+        self.day = timezone.now().date() + timedelta(days=1)
+        self.student = User.objects.create_user(username='counter_student', role='student')
+        self.tutor = User.objects.create_user(username='counter_tutor', role='tutor')
+
+    def _lesson(self, hour=10):
+        return Lesson(student=self.student, tutor=self.tutor, date=self.day,
+                      start_time=time(hour, 0), end_time=time(hour + 1, 0), location='HQ')
+
+    def _count(self):
+        return User.objects.get(pk=self.student.pk).lessons_taken
+
+    def test_create_and_delete_adjust_counter(self):
+        with self.assertNumQueries(2):   # insert and one F() update, no COUNT
+            lesson = Lesson.objects.create(student=self.student, tutor=self.tutor, date=self.day,
+                                           start_time=time(10, 0), end_time=time(11, 0), location='HQ')
+        self.assertEqual(self._count(), 1)
+
+        lesson.delete()
+        self.assertEqual(self._count(), 0)
+
+    def test_update_leaves_counter_alone(self):
+        lesson = self._lesson()
+        lesson.save()
+        lesson.start_time, lesson.end_time = time(12, 0), time(13, 0)
+        with self.assertNumQueries(1):
+            lesson.save()
+        self.assertEqual(self._count(), 1)
+
+    def test_suspended_block_reconciles_once(self):
+        with suspend_lesson_counters() as touched:
+            for hour in (8, 9, 10):
+                self._lesson(hour).save()
+            lessons = Lesson.objects.bulk_create([self._lesson(14), self._lesson(15)])
+            touched.update(lesson.student_id for lesson in lessons)
+            self.assertEqual(self._count(), 0)
+        self.assertEqual(self._count(), 5)
+
+        with suspend_lesson_counters():
+            Lesson.objects.filter(start_time__gte=time(14, 0)).delete()
+        self.assertEqual(self._count(), 3)
+
+    def test_recompute_command_fixes_drift(self):
+        Lesson.objects.bulk_create([self._lesson(8), self._lesson(9)])
+        User.objects.filter(pk=self.tutor.pk).update(lessons_taken=7)
+
+        out = StringIO()
+        with self.assertNumQueries(1):
+            call_command('recompute_lesson_counters', stdout=out)
+        self.assertIn('Recomputed lesson counters', out.getvalue())
+        self.assertEqual(self._count(), 2)
+        self.assertEqual(User.objects.get(pk=self.tutor.pk).lessons_taken, 0)
+
+    def test_reconcile_limited_to_students(self):
+        Lesson.objects.bulk_create([self._lesson(8)])
+        self.assertEqual(reconcile_lessons_taken([self.student.pk]), 1)
+        self.assertEqual(self._count(), 1)
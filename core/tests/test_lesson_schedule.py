@@ -0,0 +1,76 @@
+"""
+Tests for the denormalized starts_at/ends_at/duration_minutes columns on Lesson.
+"""
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+
+from core.models import User, Lesson, lesson_bounds
+from core.services import booking
+from core.services.reminders import lessons_starting_between
+
+
+@override_settings(EMAIL_OUTBOX_BACKEND='')
+class LessonScheduleTests(TestCase):
+    def setUp(self):
+        self.day = date(2030, 5, 6)
+        self.student = User.objects.create_user(username='sched_student', role='student')
+        self.other_student = User.objects.create_user(username='sched_student2', role='student')
+        self.tutor = User.objects.create_user(username='sched_tutor', role='tutor')
+
+    def _lesson(self, start, end, student=None, day=None):
+        return Lesson.objects.create(student=student or self.student, tutor=self.tutor, date=day or self.day,
+                                     start_time=start, end_time=end, location='HQ')
+
+    def test_columns_follow_date_and_times(self):
+        lesson = self._lesson(time(9, 0), time(10, 30))
+        self.assertEqual(lesson.starts_at, datetime(2030, 5, 6, 9, 0, tzinfo=dt_timezone.utc))
+        self.assertEqual(lesson.duration_minutes, 90)
+        self.assertEqual(lesson.get_duration(), 90)
+
+        lesson.start_time, lesson.end_time = time(14, 0), time(15, 0)
+        lesson.save(update_fields=['start_time', 'end_time'])
+        lesson.refresh_from_db()
+        self.assertEqual(lesson.starts_at.hour, 14)
+        self.assertEqual(lesson.duration_minutes, 60)
+
+    def test_bulk_create_fills_columns(self):
+        Lesson.objects.bulk_create([
+            Lesson(student=self.student, tutor=self.tutor, date=self.day, start_time=time(h, 0),
+                   end_time=time(h, 45), location='HQ')
+            for h in (9, 10)
+        ])
+        self.assertEqual(Lesson.objects.aggregate(total=Sum('duration_minutes'))['total'], 90)
+
+    def test_overlapping_is_half_open(self):
+        lesson = self._lesson(time(9, 0), time(10, 0))
+        self.assertEqual(list(Lesson.objects.overlapping(*lesson_bounds(self.day, time(9, 30), time(10, 30)))),
+                         [lesson])
+        self.assertFalse(Lesson.objects.overlapping(*lesson_bounds(self.day, time(10, 0), time(11, 0))).exists())
+
+    def test_booking_conflicts_use_the_range(self):
+        booking.book_lesson(self.student, self.tutor, self.day, time(9, 0), time(10, 0), 'HQ')
+
+        # Same tutor, overlapping: rejected; back-to-back: allowed
+        with self.assertRaises(booking.BookingConflict):
+            booking.book_lesson(self.other_student, self.tutor, self.day, time(9, 30), time(10, 30), 'HQ')
+        booking.book_lesson(self.other_student, self.tutor, self.day, time(10, 0), time(11, 0), 'HQ')
+
+        # A reschedule may overlap its own old slot
+        lesson = Lesson.objects.get(student=self.student)
+        lesson.start_time, lesson.end_time = time(8, 30), time(9, 30)
+        booking.reschedule_lesson(lesson)
+        self.assertEqual(Lesson.objects.get(pk=lesson.pk).starts_at.time(), time(8, 30))
+
+    def test_reminder_window_crosses_midnight(self):
+        next_day = self.day + timedelta(days=1)
+        late = self._lesson(time(23, 55), time(23, 59))
+        early = self._lesson(time(0, 5), time(1, 0), day=next_day)
+        self._lesson(time(0, 30), time(1, 30), student=self.other_student, day=next_day)
+
+        start = datetime(2030, 5, 6, 23, 55, tzinfo=dt_timezone.utc)
+        found = set(lessons_starting_between(start, start + timedelta(minutes=15)))
+
+        self.assertEqual(found, {early})
+        self.assertNotIn(late, found)  # starts exactly at the exclusive lower bound
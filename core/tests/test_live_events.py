@@ -0,0 +1,146 @@
+"""
+Tests for the live notification event stream.
+"""
+import asyncio
+import threading
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.models import User, Notification
+from core.services.live_events import InProcessBroker, get_broker, reset_broker
+from core.services.notification_service import NotificationService
+from core.views.notification_views import format_sse, notification_events
+
+
+class InProcessBrokerTests(TestCase):
+    def test_publish_reaches_only_the_users_subscribers(self):
+        broker = InProcessBroker(queue_size=10)
+
+        async def scenario():
+            mine, theirs = broker.subscribe(1), broker.subscribe(2)
+            # Publishers run in request threads, not on the subscriber's loop
+            thread = threading.Thread(target=broker.publish, args=(1, {'event': 'notification', 'id': 5, 'data': {}}))
+            thread.start()
+            thread.join()
+            received = await mine.get(timeout=1)
+            nothing = await theirs.get(timeout=0.05)
+            broker.unsubscribe(mine)
+            broker.unsubscribe(theirs)
+            return received, nothing
+
+        received, nothing = asyncio.run(scenario())
+        self.assertEqual(received['id'], 5)
+        self.assertIsNone(nothing)
+        self.assertEqual(broker.connection_count(), 0)
+        self.assertEqual(broker.publish(1, {'event': 'notification', 'data': {}}), 0)
+
+    def test_slow_client_queue_is_bounded(self):
+        broker = InProcessBroker(queue_size=3)
+
+        async def scenario():
+            subscription = broker.subscribe(1)
+            for i in range(10):
+                broker.publish(1, {'event': 'notification', 'id': i, 'data': {}})
+            await asyncio.sleep(0)
+            ids = []
+            while (event := await subscription.get(timeout=0.01)) is not None:
+                ids.append(event['id'])
+            return ids, subscription.dropped
+
+        ids, dropped = asyncio.run(scenario())
+        self.assertEqual(ids, [7, 8, 9])
+        self.assertEqual(dropped, 7)
+
+    def test_format_sse(self):
+        frame = format_sse({'event': 'notification', 'id': 3, 'data': {'message': 'Hi'}})
+        self.assertEqual(frame, 'id: 3\nevent: notification\ndata: {"message":"Hi"}\n\n')
+
+
+@override_settings(EMAIL_OUTBOX_BACKEND='', LIVE_EVENTS_HEARTBEAT_SECONDS=0.05)
+class NotificationStreamTests(TestCase):
+    def setUp(self):
+        reset_broker()
+        self.user = User.objects.create_user(username='stream_user', password='pass')
+        self.addCleanup(reset_broker)
+
+    async def test_stream_replays_missed_then_pushes_live(self):
+        old = await sync_to_async(NotificationService.send_notification)(self.user, 'Seen', email=False)
+        missed = await sync_to_async(NotificationService.send_notification)(self.user, 'Missed', email=False)
+        await self.user.arefresh_from_db()
+
+        stream = notification_events(self.user, last_event_id=old.id, max_seconds=5)
+        self.assertTrue((await anext(stream)).startswith('retry: '))
+        replayed = await anext(stream)
+        self.assertIn(f'id: {missed.id}', replayed)
+        self.assertIn('"Missed"', replayed)
+        unread = await anext(stream)
+        self.assertIn(f'id: {missed.id}', unread)
+        self.assertIn('"count":2', unread)
+
+        def book():
+            with self.captureOnCommitCallbacks(execute=True):
+                return NotificationService.send_notification(self.user, 'Lesson booked', 'lesson_booked', email=False)
+
+        booked = await sync_to_async(book)()
+        frame = await anext(stream)
+        while frame.startswith(':'):
+            frame = await anext(stream)
+        self.assertIn(f'id: {booked.id}', frame)
+        self.assertIn('"kind":"lesson_booked"', frame)
+        await stream.aclose()
+        self.assertEqual(get_broker().connection_count(), 0)
+
+    async def test_idle_stream_sends_keep_alive_and_ends(self):
+        stream = notification_events(self.user, max_seconds=0.2)
+        frames = [frame async for frame in stream]
+        self.assertIn(': keep-alive\n\n', frames)
+        self.assertEqual(get_broker().connection_count(), 0)
+
+    async def test_single_create_is_published_after_commit(self):
+        def create():
+            with self.captureOnCommitCallbacks(execute=True):
+                Notification.objects.create(user=self.user, message='Welcome', kind='registration')
+
+        subscription = get_broker().subscribe(self.user.id)
+        await sync_to_async(create)()
+        event = await subscription.get(timeout=1)
+        get_broker().unsubscribe(subscription)
+
+        self.assertEqual(event['data']['message'], 'Welcome')
+
+    def test_wsgi_request_gets_replay_and_close(self):
+        NotificationService.send_notification(self.user, 'Hello', email=False)
+        self.client.login(username='stream_user', password='pass')
+
+        response = self.client.get(reverse('notification_stream'), HTTP_LAST_EVENT_ID='0')
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = response.content.decode()
+        self.assertIn('"Hello"', body)
+        self.assertIn('"count":1', body)
+        self.assertEqual(self.client.get(reverse('notification_stream'), HTTP_LAST_EVENT_ID='x').status_code, 400)
+
+    def test_first_wsgi_connection_sets_a_cursor_for_the_next(self):
+        seen = NotificationService.send_notification(self.user, 'Already on the page', email=False)
+        self.client.login(username='stream_user', password='pass')
+
+        # A browser's first request has no Last-Event-ID
+        body = self.client.get(reverse('notification_stream')).content.decode()
+        self.assertNotIn('"Already on the page"', body)
+        self.assertIn(f'id: {seen.id}\nevent: unread\ndata: {{"count":1}}', body)
+
+        new = NotificationService.send_notification(self.user, 'Lesson booked', email=False)
+        body = self.client.get(reverse('notification_stream'), HTTP_LAST_EVENT_ID=str(seen.id)).content.decode()
+        self.assertIn('"Lesson booked"', body)
+        self.assertIn(f'id: {new.id}\nevent: unread\ndata: {{"count":2}}', body)
+
+    def test_unread_count_comes_from_the_counter(self):
+        NotificationService.send_notification(self.user, 'Hello', email=False)
+        self.client.login(username='stream_user', password='pass')
+        self.client.get(reverse('notification_stream'))
+
+        # Session, user and newest-notification lookups; no COUNT over the notifications
+        with self.assertNumQueries(3):
+            self.client.get(reverse('notification_stream'))
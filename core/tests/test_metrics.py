@@ -0,0 +1,151 @@
+"""
+Tests for the application metrics and the /metrics/ endpoint.
+
+Every test in a run shares the run's metrics directory, so the tests compare
+scrapes taken before and after the code they exercise.
+"""
+import asyncio
+import multiprocessing
+import os
+import unittest
+from datetime import date, time
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from prometheus_client import Counter, Gauge
+from prometheus_client.multiprocess import mark_process_dead
+from prometheus_client.parser import text_string_to_metric_families
+
+from core.models import User, Vehicle
+from core.services import booking, metrics
+from core.services.email_outbox import enqueue_email
+from core.services.live_events import InProcessBroker
+from core.services.student_status import get_student_status_summary
+
+
+def scraped():
+    """The current samples of every process, by (name, sorted labels)."""
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(metrics.render().decode('utf-8'))
+        for sample in family.samples
+    }
+
+
+def _child(counter, gauge):
+    counter.inc(2)
+    gauge.inc(5)
+
+
+@override_settings(EMAIL_OUTBOX_BACKEND='')
+class ApplicationMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.day = date(2030, 5, 6)
+        self.student = User.objects.create_user(username='metrics_student', role='student')
+        self.tutor = User.objects.create_user(username='metrics_tutor', role='tutor')
+        self.admin = User.objects.create_user(username='metrics_admin', role='admin')
+        Vehicle.objects.create(registration_number='MET1', make='Toyota', model='Corolla', year=2020,
+                               vehicle_class='class2', vehicle_type='sedan')
+
+    def assertIncreased(self, before, after, name, by, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.assertEqual(after.get(key, 0) - before.get(key, 0), by, key)
+
+    def test_booking_allocation_outbox_and_cache_metrics(self):
+        before = scraped()
+        booking.book_lesson(self.student, self.tutor, self.day, time(9, 0), time(10, 0), 'HQ')
+        with self.assertRaises(booking.BookingConflict):
+            booking.book_lesson(self.student, self.tutor, self.day, time(9, 30), time(10, 30), 'HQ')
+        enqueue_email('student@example.com', 'Hello', 'Body')
+        get_student_status_summary()
+        get_student_status_summary()
+        after = scraped()
+
+        bookings = 'drivingschool_bookings_total'
+        self.assertIncreased(before, after, bookings, 1, operation='book', outcome='booked')
+        self.assertIncreased(before, after, bookings, 1, operation='book', outcome='conflict')
+        # Only a class2 vehicle exists for the default class1 student
+        self.assertIncreased(before, after, 'drivingschool_vehicle_allocations_total', 1, result='fallback')
+        self.assertIncreased(before, after, 'drivingschool_vehicle_allocation_seconds_count', 1)
+        self.assertEqual(after['drivingschool_email_outbox_emails', (('status', 'pending'),)], 1)
+
+        lookups = 'drivingschool_cache_requests_total'
+        self.assertIncreased(before, after, lookups, 1, namespace='student_status', result='hit')
+        self.assertIncreased(before, after, lookups, 1, namespace='student_status', result='miss')
+        hits = after[lookups, (('namespace', 'student_status'), ('result', 'hit'))]
+        misses = after[lookups, (('namespace', 'student_status'), ('result', 'miss'))]
+        self.assertAlmostEqual(after['drivingschool_cache_hit_ratio', (('namespace', 'student_status'),)],
+                               hits / (hits + misses))
+
+    def test_request_latency_histogram(self):
+        self.client.force_login(self.student)
+        before = scraped()
+        self.client.get(reverse('generate_report'))
+        after = scraped()
+
+        name = 'drivingschool_http_request_duration_seconds'
+        self.assertIncreased(before, after, f'{name}_count', 1, view='generate_report', method='GET')
+        self.assertIncreased(before, after, f'{name}_bucket', 1, view='generate_report', method='GET', le='+Inf')
+
+    def test_live_event_gauges(self):
+        broker = InProcessBroker(queue_size=10)
+        before = scraped()
+
+        async def scenario():
+            subscription = broker.subscribe(self.student.id)
+            broker.publish(self.student.id, {'event': 'notification', 'data': {}})
+            broker.publish(self.student.id, {'event': 'notification', 'data': {}})
+            await asyncio.sleep(0)
+            await subscription.get(timeout=1)
+            return subscription
+
+        subscription = asyncio.run(scenario())
+        during = scraped()
+        self.assertIncreased(before, during, 'drivingschool_live_event_connections', 1)
+        self.assertIncreased(before, during, 'drivingschool_live_event_queue_depth', 1)
+
+        broker.unsubscribe(subscription)
+        after = scraped()
+        self.assertIncreased(before, after, 'drivingschool_live_event_connections', 0)
+        self.assertIncreased(before, after, 'drivingschool_live_event_queue_depth', 0)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'needs fork')
+    def test_values_are_aggregated_across_processes(self):
+        counter = Counter('drivingschool_test_forks_total', 'Across processes.', registry=None)
+        gauge = Gauge('drivingschool_test_forks_level', 'Live processes only.', registry=None,
+                      multiprocess_mode='livesum')
+        counter.inc()
+        gauge.inc()
+
+        child = multiprocessing.get_context('fork').Process(target=_child, args=(counter, gauge))
+        child.start()
+        child.join(10)
+        self.assertEqual(scraped()['drivingschool_test_forks_total', ()], 3)
+        self.assertEqual(scraped()['drivingschool_test_forks_level', ()], 6)
+
+        # As the server's child-exit hook does for an exited worker
+        mark_process_dead(child.pid)
+        self.assertEqual(scraped()['drivingschool_test_forks_total', ()], 3)
+        self.assertEqual(scraped()['drivingschool_test_forks_level', ()], 1)
+
+    def test_endpoint_is_for_admins(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version='))
+        self.assertIn(b'drivingschool_bookings_total', response.content)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_scraper_sends_the_token(self):
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+
+    @override_settings(METRICS_PUBLIC=True)
+    def test_can_be_made_public(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
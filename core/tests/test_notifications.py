@@ -0,0 +1,177 @@
+"""
+Tests for the batched notification service and the unread counters.
+"""
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import User, Notification, OutboxEmail
+from core.services.notification_service import NotificationService
+
+
+@override_settings(EMAIL_OUTBOX_BACKEND='')
+class NotificationServiceTests(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f'notify{i}', email=f'notify{i}@example.com', password='pass')
+            for i in range(4)
+        ]
+        self.no_email = User.objects.create_user(username='notify_quiet', password='pass')
+
+    def _unread(self, user):
+        return User.objects.values_list('unread_notifications', flat=True).get(pk=user.pk)
+
+    def test_send_many_batches_inserts_and_counters(self):
+        items = [(user, f'Lesson cancelled for {user.username}', 'lesson_cancelled') for user in self.users]
+        items.append((self.users[0], 'Second message', 'general'))
+        items.append((self.no_email, 'No email for me', 'general'))
+
+        # savepoint, notifications, two counter UPDATEs (1 and 2 each), outbox, release
+        with self.assertNumQueries(6):
+            notifications = NotificationService.send_many(items)
+
+        self.assertEqual(len(notifications), 6)
+        self.assertEqual(Notification.objects.filter(kind='lesson_cancelled').count(), 4)
+        self.assertEqual(OutboxEmail.objects.count(), 5)
+        self.assertEqual(self._unread(self.users[0]), 2)
+        self.assertEqual(self._unread(self.users[1]), 1)
+        self.assertEqual(self._unread(self.no_email), 1)
+
+    def test_single_create_and_delete_keep_counter(self):
+        user = self.users[0]
+        notification = Notification.objects.create(user=user, message='Hello')
+        Notification.objects.create(user=user, message='Already read', is_read=True)
+        self.assertEqual(self._unread(user), 1)
+
+        notification.delete()
+        self.assertEqual(self._unread(user), 0)
+
+    def test_mark_read_decrements_once(self):
+        user, other = self.users[0], self.users[1]
+        notifications = NotificationService.send_many([(user, f'Message {i}', 'general') for i in range(3)])
+        foreign = NotificationService.send_notification(other, 'Not yours')
+
+        self.assertEqual(NotificationService.mark_read(user, [notifications[0].id, foreign.id]), 1)
+        self.assertEqual(NotificationService.mark_read(user, [notifications[0].id]), 0)
+        self.assertEqual(self._unread(user), 2)
+        self.assertEqual(self._unread(other), 1)
+
+        self.assertEqual(NotificationService.mark_read(user), 2)
+        self.assertEqual(self._unread(user), 0)
+
+    def test_reconcile_fixes_drift(self):
+        user = self.users[0]
+        NotificationService.send_many([(user, 'One', 'general'), (user, 'Two', 'general')])
+        User.objects.filter(pk=user.pk).update(unread_notifications=7)
+
+        NotificationService.reconcile_unread_counts([user.id])
+
+        self.assertEqual(self._unread(user), 2)
+
+    def test_dashboard_skips_unread_query_without_notifications(self):
+        user = self.users[0]
+        self.client.login(username=user.username, password='pass')
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['unread_notification_count'], 0)
+        self.assertEqual(list(response.context['notifications']), [])
+
+        NotificationService.send_notification(user, 'Payment approved', 'payment_approved')
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['unread_notification_count'], 1)
+        self.assertContains(response, '<span id="unread-count">1</span> unread', html=False)
+
+    def test_mark_notification_read_view(self):
+        user = self.users[0]
+        notification = NotificationService.send_notification(user, 'Read me')
+        self.client.login(username=user.username, password='pass')
+
+        self.client.get(reverse('mark_notification_read', args=[notification.id]))
+
+        notification.refresh_from_db()
+        self.assertTrue(notification.is_read)
+        self.assertEqual(self._unread(user), 0)
+
+    def test_payment_decision_notifies_with_kind(self):
+        admin = User.objects.create_user(username='notify_admin', password='pass', is_staff=True, role='admin')
+        student = self.users[0]
+        self.client.login(username=admin.username, password='pass')
+
+        self.client.post(reverse('admin_approve_payment', args=[student.id]), {'action': 'approve'})
+
+        notification = Notification.objects.get(user=student)
+        self.assertEqual(notification.kind, 'payment_approved')
+        self.assertEqual(self._unread(student), 1)
+
+
+@override_settings(EMAIL_OUTBOX_BACKEND='')
+class NotificationInboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='inbox_user', password='pass')
+        self.other = User.objects.create_user(username='inbox_other', password='pass')
+        self.notifications = NotificationService.send_many(
+            [(self.user, f'Message {i}', 'general') for i in range(7)], email=False
+        )
+        # Two share a timestamp so the id tiebreaker is exercised
+        now = timezone.now()
+        for i, notification in enumerate(self.notifications):
+            Notification.objects.filter(pk=notification.pk).update(created_at=now - timedelta(minutes=min(i, 5)))
+        NotificationService.send_notification(self.other, 'Not yours', email=False)
+        self.client.login(username='inbox_user', password='pass')
+
+    def test_keyset_pages_cover_everything_once(self):
+        seen, cursor = [], None
+        while True:
+            page, cursor = NotificationService.inbox_page(self.user, cursor=cursor, limit=3)
+            seen.extend(n.message for n in page)
+            if cursor is None:
+                break
+        self.assertEqual(seen, [f'Message {i}' for i in range(5)] + ['Message 6', 'Message 5'])
+
+    def test_page_query_uses_no_offset(self):
+        _, cursor = NotificationService.inbox_page(self.user, limit=3)
+        with self.assertNumQueries(1) as queries:
+            NotificationService.inbox_page(self.user, cursor=cursor, limit=3)
+        self.assertNotIn('OFFSET', queries.captured_queries[0]['sql'])
+
+    def test_inbox_json_and_bad_cursor(self):
+        response = self.client.get(reverse('notification_inbox'), {'limit': 5}, HTTP_ACCEPT='application/json')
+        data = response.json()
+        self.assertEqual(len(data['notifications']), 5)
+        self.assertEqual(data['unread_count'], 7)
+
+        response = self.client.get(reverse('notification_inbox'), {'cursor': data['next_cursor']},
+                                   HTTP_ACCEPT='application/json')
+        self.assertEqual(len(response.json()['notifications']), 2)
+        self.assertIsNone(response.json()['next_cursor'])
+
+        self.assertEqual(self.client.get(reverse('notification_inbox'), {'cursor': '!!'}).status_code, 400)
+
+    def test_inbox_html(self):
+        response = self.client.get(reverse('notification_inbox'), {'unread': '1'})
+        self.assertContains(response, 'Message 0')
+        self.assertNotContains(response, 'Not yours')
+
+    def test_mark_selected_and_all_read(self):
+        ids = [self.notifications[0].id, self.notifications[1].id]
+        response = self.client.post(reverse('mark_notifications_read'), {'ids': ids}, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.json(), {'marked': 2, 'unread_count': 5})
+
+        response = self.client.post(reverse('mark_notifications_read'), {'all': '1'})
+        self.assertRedirects(response, reverse('notification_inbox'))
+        self.assertFalse(Notification.objects.filter(user=self.user, is_read=False).exists())
+        self.assertEqual(Notification.objects.filter(user=self.other, is_read=False).count(), 1)
+
+    def test_prune_deletes_only_old_read_notifications(self):
+        old = timezone.now() - timedelta(days=100)
+        Notification.objects.filter(pk__in=[n.pk for n in self.notifications[:4]]).update(created_at=old)
+        NotificationService.mark_read(self.user, [n.pk for n in self.notifications[:3]])
+
+        call_command('prune_notifications', '--days', '90', '--batch-size', '2', stdout=StringIO())
+
+        remaining = set(Notification.objects.filter(user=self.user).values_list('message', flat=True))
+        self.assertEqual(remaining, {f'Message {i}' for i in range(3, 7)})
+        self.assertEqual(User.objects.get(pk=self.user.pk).unread_notifications, 4)
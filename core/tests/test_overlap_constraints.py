@@ -0,0 +1,62 @@
+"""
+Tests for database-enforced lesson overlap rules (PostgreSQL exclusion constraints).
+"""
+import unittest
+from datetime import date, time
+
+from django.db import IntegrityError, connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.models import User, Lesson
+from core.services import booking
+
+
+class _DatabaseError(Exception):
+    def __init__(self, **attrs):
+        super().__init__('constraint')
+        self.__dict__.update(attrs)
+
+
+def _integrity_error(**cause_attrs):
+    error = IntegrityError('constraint')
+    error.__cause__ = _DatabaseError(**cause_attrs)
+    return error
+
+
+class OverlapViolationTests(SimpleTestCase):
+    def test_recognises_exclusion_violations_from_both_drivers(self):
+        self.assertTrue(booking.is_overlap_violation(_integrity_error(sqlstate='23P01')))
+        self.assertTrue(booking.is_overlap_violation(_integrity_error(pgcode='23P01')))
+        self.assertFalse(booking.is_overlap_violation(_integrity_error(sqlstate='23505')))
+        self.assertFalse(booking.is_overlap_violation(IntegrityError('UNIQUE constraint failed')))
+
+
+@override_settings(EMAIL_OUTBOX_BACKEND='')
+class OverlapEnforcementTests(TestCase):
+    def setUp(self):
+        self.day = date(2030, 5, 6)
+        self.student = User.objects.create_user(username='excl_student', role='student')
+        self.other_student = User.objects.create_user(username='excl_student2', role='student')
+        self.tutor = User.objects.create_user(username='excl_tutor', role='tutor')
+
+    def _lesson(self, student, start, end):
+        return Lesson.objects.create(student=student, tutor=self.tutor, date=self.day,
+                                     start_time=start, end_time=end, location='HQ')
+
+    def test_booking_conflict_is_reported_on_every_backend(self):
+        booking.book_lesson(self.student, self.tutor, self.day, time(9, 0), time(10, 0), 'HQ')
+        with self.assertRaisesMessage(booking.BookingConflict, booking.CONFLICT_MESSAGE):
+            booking.book_lesson(self.other_student, self.tutor, self.day, time(9, 30), time(10, 30), 'HQ')
+        booking.book_lesson(self.other_student, self.tutor, self.day, time(10, 0), time(11, 0), 'HQ')
+
+    @unittest.skipIf(connection.vendor == 'postgresql', 'PostgreSQL enforces overlaps itself')
+    def test_other_backends_check_in_the_application(self):
+        self.assertFalse(booking.database_enforces_overlaps())
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Exclusion constraints are PostgreSQL only')
+    def test_database_rejects_overlapping_lessons(self):
+        self.assertTrue(booking.database_enforces_overlaps())
+        self._lesson(self.student, time(9, 0), time(10, 0))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self._lesson(self.other_student, time(9, 59), time(11, 0))  # same tutor
+        self._lesson(self.other_student, time(10, 0), time(11, 0))  # back-to-back is fine
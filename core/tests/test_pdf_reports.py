@@ -0,0 +1,84 @@
+"""
+Tests for the cached PDF progress report artifacts.
+"""
+import shutil
+import tempfile
+from datetime import date, time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.models import User, Lesson, StudentProgress
+from core.services.reports import (PDF_FAILED, PDF_PENDING, ProgressReportArtifact, build_progress_report_pdf,
+                                   request_progress_report_pdf)
+
+
+class PdfReportArtifactTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, PDF_REPORT_BACKEND='inline')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.tutor = User.objects.create_user(username='pdf_tutor', role='tutor')
+        self.student = User.objects.create_user(username='pdf_student', role='student')
+        self.lesson = Lesson.objects.create(student=self.student, tutor=self.tutor, date=date(2024, 1, 1),
+                                            start_time=time(10, 0), end_time=time(11, 0), location='HQ')
+        self.client.force_login(self.tutor)
+        self.url = reverse('export_progress_report', args=[self.student.id]) + '?format=pdf'
+
+    def test_pdf_is_cached_and_served_with_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        etag = response['ETag']
+
+        artifact = ProgressReportArtifact(self.student)
+        self.assertEqual(artifact.etag, etag)
+        self.assertTrue(artifact.exists())
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_progress_produces_a_new_artifact(self):
+        first = ProgressReportArtifact(self.student)
+        self.client.get(self.url)
+
+        StudentProgress.objects.create(student=self.student, lesson=self.lesson, progress_notes='n',
+                                       skills_covered='s', next_lesson_focus='f', instructor_feedback='i')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first.etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first.etag)
+        response.close()
+        self.assertFalse(first.path.exists())
+
+    def test_pending_report_returns_poll_url(self):
+        artifact = ProgressReportArtifact(self.student)
+        cache.set(artifact.state_key, PDF_PENDING)
+
+        response = self.client.get(self.url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json(), {'status': 'pending', 'poll_url': self.url})
+        self.assertEqual(response['Location'], self.url)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 202)
+        self.assertContains(response, 'being prepared', status_code=202)
+
+    def test_failed_build_is_reported_instead_of_pending(self):
+        artifact = ProgressReportArtifact(self.student)
+        cache.set(artifact.state_key, PDF_PENDING)
+
+        with mock.patch('core.services.reports.render_progress_report_pdf', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                build_progress_report_pdf(self.student.id)
+
+        self.assertEqual(request_progress_report_pdf(ProgressReportArtifact(self.student)), PDF_FAILED)
+        response = self.client.get(self.url)
+        self.assertRedirects(response, reverse('student_progress_detail', args=[self.student.id]),
+                             fetch_redirect_response=False)
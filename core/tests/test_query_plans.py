@@ -0,0 +1,88 @@
+"""
+Query-plan regression tests for the scheduling tables.
+
+Each test runs a hot code path, then asks SQLite for the plan of every SELECT it
+issued and fails if one of them reads a growing table without an index.
+"""
+import re
+import unittest
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.ai_helper import ai_helper
+from core.models import User, Lesson, StudentProgress, Vehicle, Notification
+from core.services import booking
+from core.services.dashboard import build_student_dashboard, build_tutor_dashboard, get_unread_notifications
+from core.services.reminders import send_due_reminders
+
+# Tables that grow with the school's history; a full scan of one is a regression
+WATCHED_TABLES = ('core_lesson', 'core_studentprogress', 'core_notification', 'core_vehicleallocation',
+                  'core_lessonreminder')
+FULL_SCAN = re.compile(r'^SCAN (\w+)(?!\w| USING)')
+
+
+def query_plan(sql: str, params=()):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+@override_settings(EMAIL_OUTBOX_BACKEND='')
+class QueryPlanTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.day = datetime(2030, 5, 6).date()
+        self.student = User.objects.create_user(username='plan_student', role='student')
+        self.tutor = User.objects.create_user(username='plan_tutor', role='tutor')
+        Vehicle.objects.create(registration_number='PLAN1', make='Toyota', model='Corolla', year=2020,
+                               vehicle_class='class1', vehicle_type='sedan')
+        self.lesson = Lesson.objects.create(student=self.student, tutor=self.tutor, date=self.day,
+                                            start_time=time(9, 0), end_time=time(10, 0), location='HQ')
+        StudentProgress.objects.create(student=self.student, lesson=self.lesson, progress_notes='n',
+                                       skills_covered='s', next_lesson_focus='f', instructor_feedback='good')
+        Notification.objects.create(user=self.student, message='Hello')
+
+    def assertUsesIndexes(self, func, *args, **kwargs):
+        """Run func and fail if any SELECT it issued scans a watched table without an index."""
+        with CaptureQueriesContext(connection) as captured:
+            func(*args, **kwargs)
+        selects = [query['sql'] for query in captured.captured_queries if query['sql'].startswith('SELECT')]
+        self.assertTrue(selects, 'no SELECT queries were captured')
+        for sql in selects:
+            for detail in query_plan(sql):
+                match = FULL_SCAN.match(detail)
+                if match and match.group(1) in WATCHED_TABLES:
+                    self.fail(f'{detail} in plan of:\n{sql}')
+
+    def test_unindexed_filter_is_reported(self):
+        with self.assertRaises(AssertionError):
+            self.assertUsesIndexes(lambda: list(Lesson.objects.filter(location='HQ')))
+
+    def test_booking_conflict_and_vehicle_check(self):
+        self.assertUsesIndexes(booking.book_lesson, self.student, self.tutor, self.day,
+                               time(11, 0), time(12, 0), 'HQ')
+
+    def test_conflict_query_searches_both_participant_indexes(self):
+        clashes = booking.conflicting_lessons(self.tutor.id, self.student.id, self.day, time(9, 30), time(10, 30))
+        plan = ' '.join(query_plan(*clashes.query.sql_with_params()))
+        self.assertIn('lesson_tutor_starts_idx', plan)
+        self.assertIn('lesson_student_starts_idx', plan)
+
+    def test_reminder_scan(self):
+        start = datetime(2030, 5, 6, 8, 0, tzinfo=dt_timezone.utc)
+        send_due_reminders(now=start)
+        self.assertUsesIndexes(send_due_reminders, now=start + timedelta(minutes=5))
+
+    def test_dashboards(self):
+        self.assertUsesIndexes(build_student_dashboard, self.student)
+        self.assertUsesIndexes(build_tutor_dashboard, self.tutor)
+        self.student.refresh_from_db()
+        self.assertUsesIndexes(get_unread_notifications, self.student)
+
+    def test_progress_report(self):
+        self.assertUsesIndexes(ai_helper.generate_comprehensive_report_data, self.student.id)
@@ -0,0 +1,100 @@
+"""
+Tests for the windowed upcoming-lesson reminder scanner.
+"""
+from datetime import datetime, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import User, Lesson, LessonReminder, Notification, OutboxEmail, SchedulerCheckpoint
+from core.services.reminders import CHECKPOINT_NAME, send_due_reminders
+
+
+@override_settings(EMAIL_OUTBOX_BACKEND='', LESSON_REMINDER_LEAD_MINUTES=[24 * 60, 60, 10],
+                   LESSON_REMINDER_MAX_CATCHUP_MINUTES=60)
+class LessonReminderTests(TestCase):
+    def setUp(self):
+        self.now = timezone.make_aware(datetime(2026, 3, 2, 9, 0))
+        self.tutor = User.objects.create_user(username='rem_tutor', role='tutor', first_name='Tina', last_name='Tutor')
+        self.student = User.objects.create_user(username='rem_student', role='student', email='student@example.com')
+        SchedulerCheckpoint.objects.create(name=CHECKPOINT_NAME, last_run_at=self.now - timedelta(minutes=1))
+
+    def _lesson_at(self, start):
+        start = timezone.localtime(start)
+        return Lesson.objects.create(student=self.student, tutor=self.tutor, date=start.date(),
+                                     start_time=start.time(), end_time=(start + timedelta(hours=1)).time(),
+                                     location='HQ')
+
+    def test_reminds_lessons_entering_each_lead_window(self):
+        self._lesson_at(self.now + timedelta(minutes=10))
+        self._lesson_at(self.now + timedelta(hours=1))
+        self._lesson_at(self.now + timedelta(hours=24))
+        self._lesson_at(self.now + timedelta(hours=3))  # not due at any lead time
+
+        with self.assertNumQueries(13):
+            stats = send_due_reminders(now=self.now)
+
+        self.assertEqual(stats['sent'], 3)
+        self.assertEqual(stats['by_lead'], {10: 1, 60: 1, 1440: 1})
+        self.assertEqual(Notification.objects.filter(user=self.student).count(), 3)
+        emails = list(OutboxEmail.objects.all())
+        self.assertEqual(len(emails), 3)
+        self.assertIn('Tina Tutor', emails[0].body)
+        self.assertEqual(SchedulerCheckpoint.objects.get(name=CHECKPOINT_NAME).last_run_at, self.now)
+
+    def test_late_run_catches_up_missed_window(self):
+        # The 09:00 and 09:01 ticks were missed; the 09:11 lesson's reminder fell due at 09:01
+        SchedulerCheckpoint.objects.filter(name=CHECKPOINT_NAME).update(last_run_at=self.now - timedelta(minutes=1))
+        self._lesson_at(self.now + timedelta(minutes=11))
+
+        stats = send_due_reminders(now=self.now + timedelta(minutes=2))
+
+        self.assertEqual(stats['by_lead'][10], 1)
+
+    def test_repeated_runs_do_not_duplicate(self):
+        lesson = self._lesson_at(self.now + timedelta(minutes=10))
+        send_due_reminders(now=self.now)
+
+        # Rewind the checkpoint, as a concurrent or retried run would see it
+        SchedulerCheckpoint.objects.filter(name=CHECKPOINT_NAME).update(last_run_at=self.now - timedelta(minutes=5))
+        stats = send_due_reminders(now=self.now)
+
+        self.assertEqual(stats['sent'], 0)
+        self.assertEqual(LessonReminder.objects.filter(lesson=lesson).count(), 1)
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+
+    def test_lesson_due_at_several_leads_gets_one_reminder(self):
+        SchedulerCheckpoint.objects.filter(name=CHECKPOINT_NAME).update(last_run_at=self.now - timedelta(hours=2))
+        lesson = self._lesson_at(self.now + timedelta(minutes=5))
+
+        stats = send_due_reminders(now=self.now)
+
+        self.assertEqual(stats['sent'], 1)
+        self.assertEqual(stats['by_lead'][10], 1)
+        self.assertEqual(set(lesson.reminders.values_list('lead_minutes', flat=True)), {10, 60})
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_started_lessons_are_skipped(self):
+        SchedulerCheckpoint.objects.filter(name=CHECKPOINT_NAME).update(last_run_at=self.now - timedelta(minutes=30))
+        self._lesson_at(self.now - timedelta(minutes=5))
+
+        self.assertEqual(send_due_reminders(now=self.now)['sent'], 0)
+
+    def test_window_spans_midnight(self):
+        SchedulerCheckpoint.objects.filter(name=CHECKPOINT_NAME).delete()
+        late = timezone.make_aware(datetime(2026, 3, 2, 23, 55))
+        self._lesson_at(late + timedelta(minutes=10))  # 00:05 the next day
+
+        stats = send_due_reminders(now=late, lead_minutes=[10])
+
+        self.assertEqual(stats['by_lead'], {10: 1})
+
+    def test_command_reports_counts(self):
+        SchedulerCheckpoint.objects.filter(name=CHECKPOINT_NAME).delete()
+        self._lesson_at(timezone.now() + timedelta(minutes=5))
+
+        call_command('send_lesson_notifications', '--lead', '10', stdout=StringIO())
+
+        self.assertEqual(LessonReminder.objects.filter(lead_minutes=10).count(), 1)
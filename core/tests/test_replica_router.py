@@ -0,0 +1,126 @@
+"""
+Tests for read-replica routing (core.routers).
+
+Two SQLite files stand in for the primary and its replica. Nothing replicates
+between them, so each test puts different data in each and checks which one a
+path read from.
+"""
+from datetime import date, time
+
+from django.core.cache import cache
+from django.db import router
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.ai_helper import ai_helper
+from core.middleware import REPLICA_PIN_COOKIE
+from core.models import User, Lesson, StudentProgress, Vehicle
+from core.routers import routing_scope, use_replica
+from core.services.reports import ProgressReportArtifact
+from core.services.student_status import get_student_status_summary
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], EMAIL_OUTBOX_BACKEND='')
+class ReplicaRouterTests(TestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.student = self._user('replica_student', 'student')
+        self.tutor = self._user('replica_tutor', 'tutor')
+        self.client.force_login(self.student)
+
+    def _user(self, username, role):
+        """Create the user on the primary and, with the same id, on the replica."""
+        user = User.objects.create_user(username=username, role=role)
+        User.objects.db_manager('replica').create_user(username=username, role=role, id=user.id)
+        return user
+
+    def _lesson(self, using, location='HQ'):
+        lesson = Lesson.objects.using(using).create(student_id=self.student.id, tutor_id=self.tutor.id,
+                                                    date=date(2030, 5, 6), start_time=time(9, 0),
+                                                    end_time=time(10, 0), location=location)
+        StudentProgress.objects.using(using).create(student_id=self.student.id, lesson=lesson,
+                                                    progress_notes='n', skills_covered='s',
+                                                    next_lesson_focus='f', instructor_feedback='i')
+        return lesson
+
+    def test_only_use_replica_reads_go_to_the_replica(self):
+        with routing_scope():
+            self.assertEqual(router.db_for_read(Lesson), 'default')
+            with use_replica():
+                self.assertEqual(router.db_for_read(Lesson), 'replica')
+                self.assertEqual(router.db_for_write(Lesson), 'default')
+                # Once this context has written, it reads its own write from the primary
+                self.assertEqual(router.db_for_read(Lesson), 'default')
+
+        with routing_scope(pinned=True), use_replica():
+            self.assertEqual(router.db_for_read(Lesson), 'default')
+
+        with override_settings(DATABASE_REPLICAS=[]), routing_scope(), use_replica():
+            self.assertEqual(router.db_for_read(Lesson), 'default')
+
+    def test_writes_inside_use_replica_stay_on_primary(self):
+        with routing_scope(), use_replica():
+            student = User.objects.get(pk=self.student.pk)
+            self.assertEqual(student._state.db, 'replica')
+            student.first_name = 'Changed'
+            student.save()
+
+        self.assertEqual(User.objects.get(pk=self.student.pk).first_name, 'Changed')
+        self.assertEqual(User.objects.using('replica').get(pk=self.student.pk).first_name, '')
+
+    def test_generate_report_reads_the_replica(self):
+        self._lesson('replica')
+
+        response = self.client.get(reverse('generate_report'))
+
+        self.assertEqual(response.json()['total_lessons'], 1)
+        self.assertNotIn(REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_streamed_csv_export_reads_the_replica(self):
+        self._lesson('replica', location='Replica yard')
+
+        response = self.client.get(reverse('export_progress_report', args=[self.student.id]), {'format': 'csv'})
+        body = b''.join(response.streaming_content).decode('utf-8')
+
+        self.assertIn('Replica yard', body)
+
+    def test_shared_cache_entries_are_built_from_the_primary(self):
+        Vehicle.objects.using('replica').create(registration_number='REP1', make='Toyota', model='Corolla',
+                                                year=2020, vehicle_class='class1', vehicle_type='sedan')
+        User.objects.db_manager('replica').create_user(username='replica_only', role='student')
+        admin = self._user('replica_admin', 'admin')
+        self.client.force_login(admin)
+
+        # The replica has a student and a vehicle the primary does not
+        response = self.client.get(reverse('student_status_dashboard'))
+        self.assertEqual(response.context['student_count'], 1)
+
+        with routing_scope(), use_replica():
+            self.assertEqual(ai_helper.get_vehicle_utilization_report()['total_vehicles'], 0)
+            self.assertEqual(get_student_status_summary()['student_count'], 1)
+
+    def test_pdf_report_fingerprint_is_taken_on_the_primary(self):
+        expected = ProgressReportArtifact(self.student).fingerprint
+        self._lesson('replica')
+
+        with routing_scope(), use_replica():
+            student = User.objects.get(pk=self.student.pk)
+            self.assertEqual(student._state.db, 'replica')
+            self.assertEqual(ProgressReportArtifact(student).fingerprint, expected)
+
+    def test_user_who_wrote_reads_from_primary(self):
+        self._lesson('replica')
+        lesson = self._lesson('default')
+
+        response = self.client.post(reverse('cancel_lesson', args=[lesson.id]))
+        self.assertIn(REPLICA_PIN_COOKIE, response.cookies)
+        self.assertFalse(Lesson.objects.filter(pk=lesson.pk).exists())
+
+        # The cancelled lesson is gone on the primary, while the lagging replica still has one
+        self.assertEqual(self.client.get(reverse('generate_report')).json()['total_lessons'], 0)
+
+        # Once the pin expires, reads go back to the replica
+        del self.client.cookies[REPLICA_PIN_COOKIE]
+        self.assertEqual(self.client.get(reverse('generate_report')).json()['total_lessons'], 1)
@@ -0,0 +1,88 @@
+"""
+Tests for per-request profiling (core.profiling and RequestProfilingMiddleware).
+"""
+from datetime import date, time
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.models import User, Lesson, StudentProgress
+from core.profiling import RequestProfile
+
+
+@override_settings(EMAIL_OUTBOX_BACKEND='', REQUEST_BUDGET={'queries': 50, 'latency_ms': 60000},
+                   REQUEST_BUDGET_OVERRIDES={})
+class RequestProfilingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create_user(username='profiled_student', role='student')
+        tutor = User.objects.create_user(username='profiled_tutor', role='tutor')
+        for day in (1, 2, 3):
+            lesson = Lesson.objects.create(student=self.student, tutor=tutor, date=date(2030, 5, day),
+                                           start_time=time(9, 0), end_time=time(10, 0), location='HQ')
+            StudentProgress.objects.create(student=self.student, lesson=lesson, progress_notes='n',
+                                           skills_covered='s', next_lesson_focus='f', instructor_feedback='i')
+        self.client.force_login(self.student)
+
+    def _profiled(self, url, level='INFO', **params):
+        """GET url, consume the response and return it with the profile fields that were logged."""
+        with self.assertLogs('core.middleware', level) as logs:
+            response = self.client.get(url, params)
+            if response.streaming:
+                response.body = b''.join(response.streaming_content)
+        records = [record for record in logs.records if hasattr(record, 'request_profile')]
+        self.assertEqual(len(records), 1)
+        return response, records[0]
+
+    def test_profile_counts_duplicate_and_similar_queries(self):
+        profile = RequestProfile()
+        with profile.recording():
+            for student_id in (self.student.id, self.student.id, 0):
+                list(User.objects.filter(id=student_id))
+
+        self.assertEqual(profile.queries, 3)
+        self.assertEqual(profile.duplicate_queries, 1)
+        self.assertEqual(profile.similar_queries, 2)
+        self.assertEqual(profile.most_repeated()[1], 3)
+        self.assertGreater(profile.sql_seconds, 0)
+
+    def test_one_line_per_request(self):
+        response, record = self._profiled(reverse('generate_report'))
+        fields = record.request_profile
+
+        self.assertEqual(record.levelname, 'INFO')
+        self.assertEqual(fields['view'], 'generate_report')
+        self.assertEqual(fields['status'], 200)
+        self.assertGreater(fields['queries'], 0)
+        self.assertEqual(fields['response_bytes'], len(response.content))
+        self.assertIn('view=generate_report', record.getMessage())
+
+    def test_render_time_is_recorded(self):
+        _, record = self._profiled(reverse('dashboard'))
+        self.assertGreater(record.request_profile['render_ms'], 0)
+
+    def test_streamed_response_is_logged_after_the_last_chunk(self):
+        admin = User.objects.create_user(username='profiled_admin', role='admin')
+        self.client.force_login(admin)
+
+        response, record = self._profiled(reverse('export_student_status'))
+
+        self.assertEqual(record.request_profile['response_bytes'], len(response.body))
+        self.assertGreater(record.request_profile['queries'], 0)
+
+    def test_over_budget_is_a_warning(self):
+        with override_settings(REQUEST_BUDGET={'queries': 1}):
+            _, record = self._profiled(reverse('generate_report'), level='WARNING')
+        self.assertEqual(record.request_profile['over_budget'], ['queries'])
+        self.assertIn('over_budget=queries', record.getMessage())
+
+        with override_settings(REQUEST_BUDGET={'queries': 1},
+                               REQUEST_BUDGET_OVERRIDES={'generate_report': {'queries': None}}):
+            _, record = self._profiled(reverse('generate_report'))
+        self.assertEqual(record.levelname, 'INFO')
+
+    @override_settings(REQUEST_PROFILING=False)
+    def test_can_be_disabled(self):
+        with self.assertNoLogs('core.middleware', 'INFO'):
+            self.client.get(reverse('generate_report'))
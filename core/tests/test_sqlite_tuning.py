@@ -0,0 +1,63 @@
+"""
+Tests for the SQLite connection PRAGMAs and the throughput benchmark.
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+from io import StringIO
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.services.sqlite_tuning import apply_pragmas, pragma_statements
+
+
+class PragmaStatementTests(SimpleTestCase):
+    def test_busy_timeout_comes_first(self):
+        self.assertEqual(pragma_statements({'journal_mode': 'WAL', 'busy_timeout': 100, 'cache_size': -2000}), [
+            'PRAGMA busy_timeout = 100', 'PRAGMA journal_mode = WAL', 'PRAGMA cache_size = -2000',
+        ])
+
+    def test_rejects_anything_but_plain_values(self):
+        with self.assertRaises(ImproperlyConfigured):
+            pragma_statements({'journal_mode': 'WAL; DROP TABLE core_user'})
+        with self.assertRaises(ImproperlyConfigured):
+            pragma_statements({'Journal Mode': 'WAL'})
+
+    def test_file_database_switches_to_wal(self):
+        with tempfile.TemporaryDirectory() as directory:
+            conn = sqlite3.connect(os.path.join(directory, 'tuned.sqlite3'))
+            apply_pragmas(conn, {'journal_mode': 'WAL', 'synchronous': 'NORMAL'})
+            self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+            self.assertEqual(conn.execute('PRAGMA synchronous').fetchone()[0], 1)
+            conn.close()
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'SQLite connection tuning')
+class TestSettingsTests(SimpleTestCase):
+    def test_suite_leaves_the_project_database_alone(self):
+        self.assertNotIn('journal_mode', settings.SQLITE_PRAGMAS)
+        for alias, database in settings.DATABASES.items():
+            self.assertFalse(str(database['NAME']).startswith(str(settings.BASE_DIR)), alias)
+
+
+class ConnectionTuningTests(TestCase):
+    def test_new_connections_get_the_configured_pragmas(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -20000)
+
+    @override_settings(SQLITE_PRAGMAS={'journal_mode': 'WAL', 'busy_timeout': 1000})
+    def test_benchmark_reports_both_modes(self):
+        out = StringIO()
+        call_command('benchmark_sqlite', writers=2, readers=1, bookings=20, stdout=out)
+        output = out.getvalue()
+        self.assertIn('default:', output)
+        self.assertIn('tuned:', output)
+        self.assertIn('Booking throughput', output)
@@ -0,0 +1,68 @@
+"""
+Tests for the streamed CSV exports.
+"""
+import csv
+import io
+from datetime import date, time
+
+from django.http import StreamingHttpResponse
+from django.test import TestCase
+from django.urls import reverse
+
+from core.models import User, Lesson, StudentProgress
+
+
+class StreamingExportTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='export_admin', role='admin')
+        self.tutor = User.objects.create_user(username='export_tutor', role='tutor')
+        self.client.force_login(self.admin)
+
+    def _student(self, username, progress_records):
+        student = User.objects.create_user(username=username, role='student')
+        for i in range(progress_records):
+            lesson = Lesson.objects.create(student=student, tutor=self.tutor, date=date(2024, 1, 1 + i),
+                                           start_time=time(10, 0), end_time=time(11, 0), location='HQ')
+            StudentProgress.objects.create(student=student, lesson=lesson, progress_notes=f'note {i}',
+                                           skills_covered='parking', next_lesson_focus='f', instructor_feedback='i')
+        return student
+
+    def test_student_status_export_streams_with_bom(self):
+        self._student('alpha', 1)
+        self._student('bravo', 4)
+        self._student('charlie', 6)
+
+        response = self.client.get(reverse('export_student_status'))
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertIn('attachment; filename="student_status_export_', response['Content-Disposition'])
+
+        body = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(body.startswith('\ufeff'))
+        rows = list(csv.reader(io.StringIO(body[1:])))
+        self.assertEqual(rows[0], ['Student Username', 'Progress Records Count', 'Status', 'Export Date'])
+        self.assertEqual([row[:3] for row in rows[1:]], [
+            ['alpha', '1', 'Beginner'],
+            ['bravo', '4', 'Intermediate'],
+            ['charlie', '6', 'Advanced'],
+        ])
+
+    def test_student_status_export_query_count_is_constant(self):
+        for i in range(30):
+            self._student(f'student{i:02d}', i % 3)
+
+        response = self.client.get(reverse('export_student_status'))
+        with self.assertNumQueries(1):
+            rows = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(len(rows), 31)
+
+    def test_progress_report_csv_streams_lesson_history(self):
+        student = self._student('delta', 3)
+
+        response = self.client.get(reverse('export_progress_report', args=[student.id]) + '?format=csv')
+        self.assertIsInstance(response, StreamingHttpResponse)
+
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+        self.assertEqual(rows[0], ['STUDENT PROGRESS REPORT'])
+        history = rows[rows.index(['LESSON HISTORY']) + 2:]
+        self.assertEqual([row[0] for row in history], ['2024-01-01', '2024-01-02', '2024-01-03'])
+        self.assertEqual(history[2][6], 'note 2')
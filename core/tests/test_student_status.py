@@ -0,0 +1,70 @@
+"""
+Tests for the admin student status dashboard aggregates.
+"""
+from datetime import date, time
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.models import User, Lesson, StudentProgress
+from core.services.student_status import build_student_status_summary, get_student_status_summary
+
+
+class StudentStatusSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tutor = User.objects.create_user(username='status_tutor', role='tutor')
+        # 2024-01-01 is a Monday
+        self.monday = date(2024, 1, 1)
+
+    def _student(self, username, progress_records, day=None):
+        student = User.objects.create_user(username=username, role='student')
+        for i in range(progress_records):
+            lesson = Lesson.objects.create(student=student, tutor=self.tutor, date=day or self.monday,
+                                           start_time=time(8 + i, 0), end_time=time(9 + i, 0), location='HQ')
+            StudentProgress.objects.create(student=student, lesson=lesson, progress_notes='n',
+                                           skills_covered='s', next_lesson_focus='f', instructor_feedback='i')
+        return student
+
+    def test_summary_uses_fixed_queries(self):
+        self._student('beginner', 1)
+        self._student('intermediate', 4, day=date(2024, 1, 6))
+        self._student('advanced', 6)
+
+        with self.assertNumQueries(3):
+            summary = build_student_status_summary(list_limit=2)
+
+        self.assertEqual(summary['student_count'], 3)
+        self.assertEqual(summary['lesson_count'], 11)
+        self.assertEqual(summary['progress_distribution'], {'Beginner': 1, 'Intermediate': 1, 'Advanced': 1})
+        self.assertEqual(summary['lesson_frequency']['Monday'], 7)
+        self.assertEqual(summary['lesson_frequency']['Saturday'], 4)
+        self.assertEqual(summary['student_progress'], {'advanced': 6, 'beginner': 1})
+
+    def test_cache_is_invalidated_by_lesson_changes(self):
+        student = self._student('cached', 1)
+        self.assertEqual(get_student_status_summary()['lesson_count'], 1)
+
+        with self.assertNumQueries(0):
+            get_student_status_summary()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Lesson.objects.create(student=student, tutor=self.tutor, date=self.monday,
+                                  start_time=time(15, 0), end_time=time(16, 0), location='HQ')
+        self.assertEqual(get_student_status_summary()['lesson_count'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._student('newcomer', 0)
+        self.assertEqual(get_student_status_summary()['student_count'], 2)
+
+    @override_settings(STUDENT_STATUS_LIST_LIMIT=1)
+    def test_dashboard_view(self):
+        self._student('one', 1)
+        self._student('two', 3)
+        self.client.force_login(self.tutor)
+
+        response = self.client.get(reverse('student_status_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['student_list_truncated'])
+        self.assertContains(response, 'Showing the first 1 of 2 students.')
@@ -0,0 +1,65 @@
+"""
+Tests for the bulk timetable engine.
+"""
+from datetime import time, timedelta
+
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import User, Lesson, Notification, OutboxEmail
+from core.services.email_outbox import drain_outbox
+from core.services.timetable import TimetableEngine
+
+
+class TimetableEngineTests(TestCase):
+    def setUp(self):
+        self.day = timezone.now().date() + timedelta(days=1)
+        self.students = [
+            User.objects.create_user(username=f'tt_student{i}', email=f's{i}@example.com',
+                                     password='pass', role='student')
+            for i in range(5)
+        ]
+        self.tutors = [
+            User.objects.create_user(username=f'tt_tutor{i}', email=f't{i}@example.com',
+                                     password='pass', role='tutor')
+            for i in range(2)
+        ]
+
+    def test_places_students_across_slots_and_reports_unplaced(self):
+        slots = [(time(10, 0), time(11, 0)), (time(11, 0), time(12, 0))]
+        summary = TimetableEngine([self.day], slots=slots).run()
+
+        # 2 tutors x 2 slots = 4 lessons; the fifth student cannot be placed
+        self.assertEqual(summary['created'], 4)
+        self.assertEqual(len(summary['unplaced']), 1)
+        self.assertEqual(Lesson.objects.filter(date=self.day).count(), 4)
+        for tutor in self.tutors:
+            self.assertEqual(Lesson.objects.filter(tutor=tutor).count(), 2)
+
+        placed = User.objects.filter(username__in=[p['student'] for p in summary['placed']])
+        self.assertTrue(all(student.lessons_taken == 1 for student in placed))
+
+    def test_respects_existing_commitments(self):
+        Lesson.objects.create(student=self.students[0], tutor=self.tutors[0], date=self.day,
+                              start_time=time(10, 0), end_time=time(11, 0), location='HQ')
+        engine = TimetableEngine([self.day])
+        planned = engine.plan(students=self.students[1:], tutors=self.tutors)
+
+        self.assertEqual(len(planned), 1)
+        self.assertEqual(planned[0]['tutor'], self.tutors[1])
+
+    @override_settings(EMAIL_OUTBOX_BACKEND='')
+    def test_bulk_write_and_single_notification_batch(self):
+        engine = TimetableEngine([self.day, self.day + timedelta(days=1)])
+        with self.captureOnCommitCallbacks(execute=True):
+            # students, tutors, existing lessons, one INSERT, one counter UPDATE + savepoint pair
+            with self.assertNumQueries(7):
+                engine.run()
+
+        self.assertEqual(Notification.objects.count(), 8)
+        # Emails are queued in one INSERT and sent by the outbox worker
+        self.assertEqual(OutboxEmail.objects.count(), 8)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(drain_outbox()['sent'], 8)
+        self.assertEqual(len(mail.outbox), 8)
@@ -0,0 +1,60 @@
+"""
+Tests for the annotated User lesson statistics.
+"""
+from datetime import time, timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import User, Lesson
+
+
+class UserLessonStatsTests(TestCase):
+    def setUp(self):
+        self.tutor = User.objects.create_user(username='stats_tutor', role='tutor')
+        self.day = timezone.now().date()
+
+    def _student_with_lessons(self, username, count, approved=False):
+        student = User.objects.create_user(username=username, role='student', instructor_approved=approved)
+        Lesson.objects.bulk_create([
+            Lesson(student=student, tutor=self.tutor, date=self.day - timedelta(days=i),
+                   start_time=time(10, 0), end_time=time(11, 0), location='HQ')
+            for i in range(count)
+        ])
+        return student
+
+    def test_annotation_matches_model_helpers(self):
+        for username, count, approved in [('s0', 0, False), ('s10', 10, True), ('s12', 12, False),
+                                          ('s17', 17, True), ('s25', 25, True), ('s31', 31, False)]:
+            self._student_with_lessons(username, count, approved)
+
+        for annotated in User.objects.with_lesson_stats():
+            plain = User.objects.get(pk=annotated.pk)
+            self.assertEqual(annotated.total_lessons, plain.total_lessons)
+            self.assertEqual(annotated.get_level(), plain.get_level())
+            self.assertEqual(annotated.eligible_for_vid, plain.eligible_for_vid)
+
+        stats = User.objects.with_lesson_stats().get(username='s10')
+        with self.assertNumQueries(0):
+            self.assertEqual((stats.total_lessons, stats.get_level(), stats.eligible_for_vid),
+                             (10, 'Advanced', True))
+
+    def test_admin_changelist_runs_constant_queries(self):
+        admin = User.objects.create_superuser(username='stats_admin', email='a@example.com', password='pw')
+        self.client.force_login(admin)
+        url = reverse('admin:core_user_changelist')
+
+        self._student_with_lessons('first', 3)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+
+        for i in range(20):
+            self._student_with_lessons(f'student{i}', i % 12, approved=bool(i % 2))
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(many), len(few))
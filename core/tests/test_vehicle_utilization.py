@@ -0,0 +1,80 @@
+"""
+Tests for the grouped vehicle utilisation report.
+"""
+from datetime import date, time, timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import User, Lesson, Vehicle, VehicleAllocation
+from core.services.vehicle_utilization import build_vehicle_utilization, get_vehicle_utilization
+
+
+@override_settings(EMAIL_OUTBOX_BACKEND='')
+class VehicleUtilizationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = date(2026, 3, 8)  # a Sunday, so the 7-day window starts on Monday 2 March
+        self.student = User.objects.create_user(username='util_student', role='student')
+        self.tutor = User.objects.create_user(username='util_tutor', role='tutor')
+        self.car1, self.car2, self.truck = Vehicle.objects.bulk_create([
+            Vehicle(registration_number=reg, make='Toyota', model='Corolla', year=2020,
+                    vehicle_class=vehicle_class, vehicle_type='sedan')
+            for reg, vehicle_class in [('UT1', 'class1'), ('UT2', 'class1'), ('UT3', 'class2')]
+        ])
+
+    def _allocate(self, vehicle, day, start, end):
+        lesson = Lesson.objects.create(student=self.student, tutor=self.tutor, date=day,
+                                       start_time=start, end_time=end, location='HQ')
+        VehicleAllocation.objects.create(lesson=lesson, vehicle=vehicle)
+
+    def test_booked_minutes_classes_and_heatmap(self):
+        monday = date(2026, 3, 2)
+        self._allocate(self.car1, monday, time(9, 0), time(10, 30))
+        self._allocate(self.car1, monday + timedelta(days=2), time(14, 0), time(15, 0))
+        self._allocate(self.truck, monday, time(9, 0), time(10, 0))
+        self._allocate(self.car2, monday - timedelta(days=1), time(9, 0), time(10, 0))  # before the window
+
+        with self.assertNumQueries(2):
+            report = build_vehicle_utilization(7, 8, 18, today=self.today)
+
+        by_vehicle = {row['vehicle'].id: row for row in report['vehicles']}
+        self.assertEqual(by_vehicle[self.car1.id]['booked_minutes'], 150)
+        self.assertEqual(by_vehicle[self.car1.id]['recent_lessons'], 2)
+        self.assertEqual(by_vehicle[self.car1.id]['utilization_percentage'], 3.6)  # 150 of 7 * 600 minutes
+        self.assertEqual(by_vehicle[self.car2.id]['booked_minutes'], 0)
+        self.assertEqual(report['vehicles'][0]['vehicle'], self.car1)
+        self.assertEqual(report['average_utilization'], 1.7)  # 210 of 3 * 4200 minutes
+
+        classes = {row['vehicle_class']: row for row in report['classes']}
+        self.assertEqual(classes['class1']['vehicle_count'], 2)
+        self.assertEqual(classes['class1']['booked_minutes'], 150)
+        self.assertEqual(classes['class2']['utilization_percentage'], 1.4)
+
+        self.assertEqual(report['heatmap_hours'], list(range(8, 18)))
+        monday_cells = {cell['hour']: cell['percentage'] for cell in report['heatmap'][0]['cells']}
+        # Two vehicles busy 9-10 and one 10-10:30, out of three
+        self.assertEqual(monday_cells[9], 66.7)
+        self.assertEqual(monday_cells[10], 16.7)
+        self.assertEqual(monday_cells[11], 0)
+        class2_monday = {cell['hour']: cell['percentage'] for cell in report['class_heatmaps']['class2'][0]['cells']}
+        self.assertEqual(class2_monday[9], 100)
+
+    def test_report_is_cached(self):
+        self._allocate(self.car1, timezone.localdate(), time(9, 0), time(10, 0))
+        first = get_vehicle_utilization()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_vehicle_utilization()['vehicles'][0]['booked_minutes'],
+                             first['vehicles'][0]['booked_minutes'])
+
+    def test_admin_dashboard_shows_heatmap(self):
+        User.objects.create_user(username='util_admin', role='admin', password='pass')
+        self._allocate(self.car1, timezone.localdate(), time(9, 0), time(10, 0))
+        self.client.login(username='util_admin', password='pass')
+
+        response = self.client.get(reverse('dashboard'))
+
+        self.assertContains(response, 'id="vehicle-heatmap"')
+        self.assertContains(response, '60 min booked')
@@ -7,10 +7,13 @@ from .lesson_views import (
     book_lesson, lesson_detail, cancel_lesson, reschedule_lesson,
     generate_timetable, api_book_lesson
 )
-from .notification_views import mark_notification_read
+from .notification_views import (
+    mark_notification_read, notification_inbox, mark_notifications_read, notification_stream
+)
 
 __all__ = [
     'register', 'dashboard', 'edit_profile', 'mark_instructor_approved',
     'book_lesson', 'lesson_detail', 'cancel_lesson', 'reschedule_lesson',
-    'generate_timetable', 'api_book_lesson', 'mark_notification_read'
+    'generate_timetable', 'api_book_lesson', 'mark_notification_read',
+    'notification_inbox', 'mark_notifications_read', 'notification_stream'
 ]
@@ -1,9 +1,14 @@
-from django.contrib.auth.decorators import login_required
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required, user_passes_test
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpResponse, JsonResponse
-from core.models import User, Lesson
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from core.models import User
 from core.forms import UserProfileEditForm
-import csv
+from core.services.cohort_reports import REPORT_FORMATS, CohortReportExport, cohort_students
+from core.services.reports import stream_csv, student_status_rows
+from core.services.student_status import get_student_status_summary
 from django.utils import timezone
 
 @login_required
@@ -11,59 +16,8 @@ def student_status_dashboard(request):
     """
     Display the aggregated status of all students.
     """
-    students = User.objects.filter(role='student')
-    student_count = students.count()
-    lesson_count = Lesson.objects.count()
-
-    # Fetch additional data as needed for the dashboard
-    student_progress = {
-        student.username: student.progress_records.count() for student in students
-    }
-
-    # Prepare data for Progress Distribution chart
-    progress_distribution = {
-        'Beginner': 0,
-        'Intermediate': 0,
-        'Advanced': 0
-    }
-
-    for student in students:
-        progress_count = student.progress_records.count()
-        if progress_count <= 2:
-            progress_distribution['Beginner'] += 1
-        elif progress_count <= 5:
-            progress_distribution['Intermediate'] += 1
-        else:
-            progress_distribution['Advanced'] += 1
-
-    # Prepare data for Lesson Frequency chart (lessons per day of week)
-    lesson_frequency = {
-        'Monday': 0,
-        'Tuesday': 0,
-        'Wednesday': 0,
-        'Thursday': 0,
-        'Friday': 0,
-        'Saturday': 0,
-        'Sunday': 0
-    }
-
-    lessons = Lesson.objects.all()
-    for lesson in lessons:
-        day_name = lesson.date.strftime('%A')
-        lesson_frequency[day_name] += 1
-
-    context = {
-        'student_count': student_count,
-        'lesson_count': lesson_count,
-        'student_progress': student_progress,
-        'progress_distribution': progress_distribution,
-        'lesson_frequency': lesson_frequency,
-    }
-
-    # Debug logging
-    print("Progress distribution:", progress_distribution)
-    print("Lesson frequency:", lesson_frequency)
-
+    context = get_student_status_summary()
+    context['student_list_truncated'] = len(context['student_progress']) < context['student_count']
     return render(request, 'admin/student_status_dashboard.html', context)
 
 @login_required
@@ -71,45 +25,54 @@ def export_student_status(request):
     """
     Export student status data to CSV format.
     """
-    students = User.objects.filter(role='student')
-
     # Get export timestamp once for consistency
     export_timestamp = timezone.now()
     export_date_str = export_timestamp.strftime('%Y-%m-%d %H:%M:%S')
 
-    # Create the HttpResponse object with the appropriate CSV header for Excel compatibility
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = f'attachment; filename="student_status_export_{export_timestamp.strftime("%Y%m%d_%H%M%S")}.csv"'
-
-    # Add UTF-8 BOM for Excel compatibility
-    response.write('\ufeff')
-
-    writer = csv.writer(response)
-    writer.writerow(['Student Username', 'Progress Records Count', 'Status', 'Export Date'])
+    # Streamed with a UTF-8 BOM for Excel compatibility
+    return stream_csv(
+        student_status_rows(export_date_str),
+        f'student_status_export_{export_timestamp.strftime("%Y%m%d_%H%M%S")}.csv',
+        bom=True,
+    )
 
-    for student in students:
-        progress_count = student.progress_records.count()
+def is_admin(user):
+    """Check if user is an admin."""
+    return user.is_authenticated and user.role == 'admin'
 
-        # Determine status based on progress count
-        if progress_count > 5:
-            status = 'Advanced'
-        elif progress_count > 2:
-            status = 'Intermediate'
-        else:
-            status = 'Beginner'
-
-        writer.writerow([
-            student.username,
-            progress_count,
-            status,
-            f'"{export_date_str}"'  # Wrap in quotes to force Excel to treat as text
-        ])
+@login_required
+@user_passes_test(is_admin)
+def export_cohort_reports(request):
+    """
+    Stream a ZIP of progress reports for a cohort of students.
 
+    Query parameters: tutor (id), date_from and date_to (YYYY-MM-DD), level,
+    and formats (comma-separated, pdf and/or csv).
+    """
+    try:
+        tutor_id = int(request.GET['tutor']) if request.GET.get('tutor') else None
+        date_from, date_to = (
+            datetime.strptime(request.GET[key], '%Y-%m-%d').date() if request.GET.get(key) else None
+            for key in ('date_from', 'date_to')
+        )
+        formats = [fmt for fmt in request.GET.get('formats', ','.join(REPORT_FORMATS)).lower().split(',') if fmt]
+        export = CohortReportExport(
+            cohort_students(tutor_id=tutor_id, date_from=date_from, date_to=date_to,
+                            level=request.GET.get('level') or None),
+            formats=formats,
+            workers=getattr(settings, 'COHORT_EXPORT_WORKERS', None),
+        )
+    except ValueError as e:
+        return HttpResponseBadRequest(f'Invalid cohort filter: {e}')
+
+    response = StreamingHttpResponse(export.iter_zip(), content_type='application/zip')
+    filename = f'cohort_reports_{timezone.now().strftime("%Y%m%d_%H%M%S")}.zip'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
     return response
 
 @login_required
 def student_detail(request, username):
-    student = get_object_or_404(User, username=username, role='student')
+    student = get_object_or_404(User.objects.with_lesson_stats(), username=username, role='student')
     progress_records = student.progress_records.all()
     context = {
         'student': student,
@@ -8,10 +8,11 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User as DjangoUser  # Alias Django's User to avoid conflict
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import render, redirect
-from django.utils import timezone
 
 from core.forms import UserRegistrationForm, UserProfileEditForm
-from core.models import User, Notification, Lesson # Import your custom User model
+from core.models import User, Notification # Import your custom User model
+from core.services.dashboard import get_role_dashboard, get_unread_notifications, invalidate_dashboards
+
 
 def get_user_profile(user: User) -> Optional[User]:
     """
@@ -61,7 +62,8 @@ def register(request: HttpRequest) -> HttpResponse:
             # For now, just create a notification record
             Notification.objects.create(
                 user=user,
-                message='New user registration completed.'
+                message='New user registration completed.',
+                kind='registration'
             )
             messages.success(request, 'Registration successful. You can now login.')
             return redirect('login')
@@ -83,12 +85,9 @@ def dashboard(request: HttpRequest) -> HttpResponse:
     user_profile = get_user_profile(request.user) # This will now return the User object
     context: Dict[str, Any] = {'user_profile': user_profile}
 
-    # Get unread notifications
-    notifications = Notification.objects.filter(
-        user=request.user,
-        is_read=False
-    ).order_by('-created_at')
-    context['notifications'] = notifications
+    # The badge uses the denormalised counter; the unread list is cached until it changes
+    context['unread_notification_count'] = request.user.unread_notifications
+    context['notifications'] = get_unread_notifications(request.user)
 
     from core.forms import PaymentProofUploadForm
 
@@ -108,73 +107,11 @@ def dashboard(request: HttpRequest) -> HttpResponse:
     context['payment_form'] = form
 
     if user_profile: # user_profile is now the User object
-        current_date = timezone.now().date()
-        if user_profile.role == 'student':
-            lessons = user_profile.student_lessons.filter(
-                date__gte=current_date
-            ).select_related('tutor').order_by('date', 'start_time') # tutor__user is not needed if tutor is a User object
-            
-            # Add progress tracking
-            from core.models import StudentProgress
-            progress = StudentProgress.objects.filter(
-                student=user_profile
-            ).select_related('lesson').order_by('-created_at')
-            
-            # Add AI analysis for student progress
-            from core.ai_helper import ai_helper
-            ai_analysis = ai_helper.analyze_student_progress(user_profile.id)
-            
-            context.update({
-                'lessons': lessons,
-                'progress': progress,
-                'ai_analysis': ai_analysis,
-            })
-        elif user_profile.role == 'tutor':
-            lessons = user_profile.tutor_lessons.filter(
-                date__gte=current_date
-            ).select_related('student').order_by('date', 'start_time') # student__user is not needed if student is a User object
-            students = User.objects.filter( # Changed from UserProfile.objects.filter
-                role='student',
-                student_lessons__tutor=user_profile
-            ).distinct()
-
-            # Get lessons without progress comments for this tutor
-            from core.models import StudentProgress
-            lessons_without_progress = user_profile.tutor_lessons.filter(
-                date__lte=current_date
-            ).exclude(
-                id__in=StudentProgress.objects.values_list('lesson_id', flat=True)
-            ).select_related('student').order_by('-date')[:10]
-
-            # Add AI insights for tutor dashboard
-            from core.ai_helper import ai_helper
-            context.update({
-                'lessons': lessons,
-                'students': students,
-                'lessons_without_progress': lessons_without_progress,
-                'ai_helper': ai_helper
-            })
-        elif user_profile.role == 'admin':
-            user_count = User.objects.count()
-            student_count = User.objects.filter(role='student').count() # Changed from UserProfile.objects.filter
-            tutor_count = User.objects.filter(role='tutor').count() # Changed from UserProfile.objects.filter
-            all_lessons = Lesson.objects.select_related(
-                'student', # Changed from student__user
-                'tutor' # Changed from tutor__user
-            ).order_by('-date', '-start_time')[:10]
-            
-            # Add AI vehicle utilization report for admin
+        # Role data is cached per user (per school for admins) and invalidated by core.signals
+        context.update(get_role_dashboard(user_profile))
+        if user_profile.role == 'tutor':
             from core.ai_helper import ai_helper
-            vehicle_report = ai_helper.get_vehicle_utilization_report()
-            
-            context.update({
-                'user_count': user_count,
-                'student_count': student_count,
-                'tutor_count': tutor_count,
-                'lesson_count': Lesson.objects.count(),
-                'recent_lessons': all_lessons,
-                'vehicle_report': vehicle_report,
-            })
+            context['ai_helper'] = ai_helper
 
     return render(request, 'dashboard.html', context)
 
@@ -208,6 +145,8 @@ def mark_instructor_approved(request: HttpRequest, student_id: int) -> HttpRespo
     # Toggle the approval status
     student.instructor_approved = not student.instructor_approved
     student.save()
+    # Every tutor who taught the student shows the approval switch
+    invalidate_dashboards(tutor_ids=student.student_lessons.values_list('tutor_id', flat=True).distinct())
 
     if student.instructor_approved:
         messages.success(request, f'{student.get_full_name() or student.username} has been marked as instructor-approved for VID eligibility.')
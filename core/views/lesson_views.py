@@ -2,14 +2,14 @@
 Lesson related views for the core app.
 """
 import logging
-import random
 from datetime import timedelta, date, time, datetime
 from typing import Dict, Any, Tuple
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.mail import send_mail
-from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.db import transaction
+from django.http import HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
 from django.utils import timezone
@@ -18,32 +18,29 @@ from django.views.decorators.http import require_http_methods
 import json
 
 from ..forms import LessonBookingForm, ProgressCommentForm, QuickProgressForm
-from ..models import User, Lesson, Notification, Vehicle, VehicleAllocation, StudentProgress
+from ..models import User, Lesson, VehicleAllocation, StudentProgress
+from ..routers import iterate_in_context, use_replica
+from ..services import booking
+from ..services.email_outbox import enqueue_email
+from ..services.notification_service import NotificationService
+from ..services.timetable import TimetableEngine
 from .auth_views import get_user_profile
 
 logger = logging.getLogger(__name__)
 
-def send_notification(user, message: str) -> None:
+def send_notification(user, message: str, kind: str = 'general') -> None:
     """
     Send a notification to a user via database and email.
     
+    The email goes through the outbox; call this inside the transaction of the
+    change being notified about so both commit or roll back together.
+    
     Args:
         user: The user to send the notification to.
         message (str): The notification message.
+        kind (str): The notification kind (see Notification.KIND_CHOICES).
     """
-    Notification.objects.create(user=user, message=message)
-    if user.email:
-        try:
-            send_mail(
-                subject='Driving School Notification',
-                message=message,
-                from_email=None,
-                recipient_list=[user.email],
-                fail_silently=True,
-            )
-            logger.info(f"Email notification sent to {user.email}")
-        except Exception as e:
-            logger.error(f"Failed to send email to {user.email}: {e}")
+    NotificationService.send_notification(user, message, kind)
 
 def allocate_vehicle_to_lesson(lesson: Lesson, student_class: str = 'class1') -> Tuple[VehicleAllocation, Dict[str, Any]]:
     """
@@ -56,74 +53,8 @@ def allocate_vehicle_to_lesson(lesson: Lesson, student_class: str = 'class1') ->
     Returns:
         Tuple[VehicleAllocation, Dict]: The created vehicle allocation and allocation info.
     """
-    from ..ai_helper import ai_helper
-    
-    # Get AI suggestions for vehicle allocation
-    suggestions = ai_helper.suggest_available_vehicles(
-        lesson.date, lesson.start_time, lesson.end_time, student_class
-    )
-    
-    allocation_info = {
-        'success': False,
-        'message': 'No vehicle available for this time slot.',
-        'vehicle_info': None,
-        'suggestions_count': len(suggestions),
-        'recommendation': None
-    }
-    
-    if suggestions:
-        # Use the best suggestion (first in the sorted list)
-        best_suggestion = suggestions[0]
-        vehicle = best_suggestion['vehicle']
-        
-        try:
-            allocation = VehicleAllocation.objects.create(
-                lesson=lesson,
-                vehicle=vehicle
-            )
-            
-            allocation_info.update({
-                'success': True,
-                'message': f"Vehicle {vehicle.registration_number} allocated successfully!",
-                'vehicle_info': {
-                    'registration_number': vehicle.registration_number,
-                    'make': vehicle.make,
-                    'model': vehicle.model,
-                    'vehicle_class': vehicle.get_vehicle_class_display(),
-                    'vehicle_type': vehicle.get_vehicle_type_display()
-                },
-                'recommendation': best_suggestion['recommendation'],
-                'confidence': best_suggestion['confidence']
-            })
-            
-            logger.info(f"AI-suggested vehicle {vehicle.registration_number} allocated to lesson {lesson.id} "
-                       f"(confidence: {best_suggestion['confidence']}%)")
-            return allocation, allocation_info
-            
-        except Exception as e:
-            logger.error(f"Error creating vehicle allocation: {str(e)}")
-            allocation_info['message'] = f"Error allocating vehicle: {str(e)}"
-    
-    # If no suggestions or allocation failed
-    logger.warning(f"No suitable vehicle available for lesson {lesson.id} on {lesson.date} "
-                  f"{lesson.start_time}-{lesson.end_time} (class: {student_class})")
-    
-    # Provide helpful suggestions for alternative times
-    if not suggestions:
-        # Check if there are vehicles available at different times
-        all_vehicles = Vehicle.objects.filter(vehicle_class=student_class, is_available=True)
-        if all_vehicles.exists():
-            allocation_info['message'] = (
-                f"No {Vehicle.objects.filter(vehicle_class=student_class).first().get_vehicle_class_display()} "
-                f"vehicles available at this time. Try a different time slot or contact admin."
-            )
-        else:
-            allocation_info['message'] = (
-                f"No {student_class} vehicles are currently available. "
-                f"Please contact admin or try a different vehicle class."
-            )
-    
-    return None, allocation_info
+    with transaction.atomic():
+        return booking.allocate_vehicle(lesson, student_class)
 
 def send_progress_email(student: User, lesson: Lesson, progress_data: dict) -> None:
     """
@@ -171,17 +102,8 @@ def send_progress_email(student: User, lesson: Lesson, progress_data: dict) -> N
     Smart Driving School Team
     """
     
-    try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=None,
-            recipient_list=[student.email],
-            fail_silently=False,
-        )
-        logger.info(f"Progress email sent to {student.email}")
-    except Exception as e:
-        logger.error(f"Failed to send progress email to {student.email}: {e}")
+    enqueue_email(student.email, subject, message)
+    logger.info(f"Progress email queued for {student.email}")
 
 @login_required
 def book_lesson(request: HttpRequest) -> HttpResponse:
@@ -207,52 +129,34 @@ def book_lesson(request: HttpRequest) -> HttpResponse:
             print(f"DEBUG: Form errors: {form.errors}")
         
         if form.is_valid():
-            lesson = form.save(commit=False)
-            
-            # Check for scheduling conflicts
-            tutor_conflict = Lesson.objects.filter(
-                tutor=lesson.tutor,
-                date=lesson.date,
-                start_time__lt=lesson.end_time,
-                end_time__gt=lesson.start_time
-            ).exists()
-            
-            student_conflict = Lesson.objects.filter(
-                student=user_profile,
-                date=lesson.date,
-                start_time__lt=lesson.end_time,
-                end_time__gt=lesson.start_time
-            ).exists()
+            data = form.cleaned_data
             
-            if tutor_conflict or student_conflict:
-                messages.error(
-                    request,
-                    'This time slot is already booked for you or the tutor.'
-                )
+            try:
+                # Conflict check, lesson insert, vehicle allocation and notifications in one transaction
+                with transaction.atomic():
+                    lesson, allocation_info = booking.book_lesson(
+                        user_profile, data['tutor'], data['date'], data['start_time'],
+                        data['end_time'], data['location'],
+                        student_class=request.POST.get('student_class', 'class1')
+                    )
+                    vehicle_message = allocation_info['message']
+                    if allocation_info['recommendation']:
+                        vehicle_message += f" ({allocation_info['recommendation']})"
+                    
+                    # Send notifications
+                    NotificationService.send_many([
+                        (lesson.tutor,
+                         f'New lesson booked by {request.user.username} '
+                         f'on {lesson.date} at {lesson.start_time}. {vehicle_message}',
+                         'lesson_booked'),
+                        (request.user,
+                         f'Lesson booked with {lesson.tutor.username} '
+                         f'on {lesson.date} at {lesson.start_time}. {vehicle_message}',
+                         'lesson_booked'),
+                    ])
+            except booking.BookingConflict as e:
+                messages.error(request, str(e))
             else:
-                lesson.student = user_profile
-                lesson.save()
-                
-                # Allocate vehicle based on student class
-                student_class = request.POST.get('student_class', 'class1')
-                vehicle_allocation, allocation_info = allocate_vehicle_to_lesson(lesson, student_class)
-                
-                vehicle_message = allocation_info['message']
-                if allocation_info['recommendation']:
-                    vehicle_message += f" ({allocation_info['recommendation']})"
-                
-                # Send notifications
-                send_notification(
-                    lesson.tutor,
-                    f'New lesson booked by {request.user.username} '
-                    f'on {lesson.date} at {lesson.start_time}. {vehicle_message}'
-                )
-                send_notification(
-                    request.user,
-                    f'Lesson booked with {lesson.tutor.username} '
-                    f'on {lesson.date} at {lesson.start_time}. {vehicle_message}'
-                )
-                
                 messages.success(request, f'Lesson booked successfully! {vehicle_message}')
                 logger.info(
                     f"Lesson booked: {lesson.student.username} "
@@ -359,58 +263,37 @@ def api_book_lesson(request: HttpRequest) -> JsonResponse:
                 'error': 'Invalid tutor ID or tutor not found.'
             }, status=400)
 
-        # Check for scheduling conflicts
-        tutor_conflict = Lesson.objects.filter(
-            tutor=tutor,
-            date=lesson_date,
-            start_time__lt=end_time,
-            end_time__gt=start_time
-        ).exists()
-
-        student_conflict = Lesson.objects.filter(
-            student=user_profile,
-            date=lesson_date,
-            start_time__lt=end_time,
-            end_time__gt=start_time
-        ).exists()
+        # Check conflicts, create lesson, allocate vehicle and queue notifications atomically
+        try:
+            with transaction.atomic():
+                lesson, allocation_info = booking.book_lesson(
+                    user_profile, tutor, lesson_date, start_time, end_time, location,
+                    student_class=student_class
+                )
+                
+                vehicle_message = allocation_info['message']
+                vehicle_info = allocation_info['vehicle_info']
+                
+                if allocation_info['recommendation']:
+                    vehicle_message += f" ({allocation_info['recommendation']})"
 
-        if tutor_conflict or student_conflict:
+                # Send notifications
+                NotificationService.send_many([
+                    (tutor,
+                     f'New lesson booked by {request.user.username} '
+                     f'on {lesson.date} at {lesson.start_time}. {vehicle_message}',
+                     'lesson_booked'),
+                    (request.user,
+                     f'Lesson booked with {tutor.username} '
+                     f'on {lesson.date} at {lesson.start_time}. {vehicle_message}',
+                     'lesson_booked'),
+                ])
+        except booking.BookingConflict as e:
             return JsonResponse({
                 'success': False,
-                'error': 'This time slot is already booked for you or the tutor.'
+                'error': str(e)
             }, status=409)
 
-        # Create lesson
-        lesson = Lesson.objects.create(
-            student=user_profile,
-            tutor=tutor,
-            date=lesson_date,
-            start_time=start_time,
-            end_time=end_time,
-            location=location
-        )
-
-        # Allocate vehicle
-        vehicle_allocation, allocation_info = allocate_vehicle_to_lesson(lesson, student_class)
-        
-        vehicle_message = allocation_info['message']
-        vehicle_info = allocation_info['vehicle_info']
-        
-        if allocation_info['recommendation']:
-            vehicle_message += f" ({allocation_info['recommendation']})"
-
-        # Send notifications
-        send_notification(
-            tutor,
-            f'New lesson booked by {request.user.username} '
-            f'on {lesson.date} at {lesson.start_time}. {vehicle_message}'
-        )
-        send_notification(
-            request.user,
-            f'Lesson booked with {tutor.username} '
-            f'on {lesson.date} at {lesson.start_time}. {vehicle_message}'
-        )
-
         logger.info(
             f"API lesson booked: {lesson.student.username} "
             f"with {lesson.tutor.username} on {lesson.date}"
@@ -492,20 +375,18 @@ def cancel_lesson(request: HttpRequest, lesson_id: int) -> HttpResponse:
         return redirect('dashboard')
     
     if request.method == 'POST':
-        send_notification(
-            lesson.student,
-            f'Lesson on {lesson.date} at {lesson.start_time} has been cancelled.'
-        )
-        send_notification(
-            lesson.tutor,
-            f'Lesson on {lesson.date} at {lesson.start_time} has been cancelled.'
-        )
-        
-        logger.info(
-            f"Lesson cancelled: {lesson.student.username} "
-            f"with {lesson.tutor.username} on {lesson.date}"
-        )
-        lesson.delete()
+        with transaction.atomic():
+            message = f'Lesson on {lesson.date} at {lesson.start_time} has been cancelled.'
+            NotificationService.send_many([
+                (lesson.student, message, 'lesson_cancelled'),
+                (lesson.tutor, message, 'lesson_cancelled'),
+            ])
+            
+            logger.info(
+                f"Lesson cancelled: {lesson.student.username} "
+                f"with {lesson.tutor.username} on {lesson.date}"
+            )
+            lesson.delete()
         messages.success(request, 'Lesson cancelled.')
         return redirect('dashboard')
     
@@ -545,37 +426,18 @@ def reschedule_lesson(request: HttpRequest, lesson_id: int) -> HttpResponse:
         if form.is_valid():
             new_lesson = form.save(commit=False)
             
-            # Check for conflicts (excluding current lesson)
-            tutor_conflict = Lesson.objects.filter(
-                tutor=new_lesson.tutor,
-                date=new_lesson.date,
-                start_time__lt=new_lesson.end_time,
-                end_time__gt=new_lesson.start_time
-            ).exclude(id=lesson.id).exists()
-            
-            student_conflict = Lesson.objects.filter(
-                student=new_lesson.student,
-                date=new_lesson.date,
-                start_time__lt=new_lesson.end_time,
-                end_time__gt=new_lesson.start_time
-            ).exclude(id=lesson.id).exists()
-            
-            if tutor_conflict or student_conflict:
-                messages.error(
-                    request,
-                    'This time slot is already booked for you or the tutor.'
-                )
+            try:
+                # Check for conflicts (excluding current lesson), save under lock and queue notifications
+                with transaction.atomic():
+                    booking.reschedule_lesson(new_lesson)
+                    message = f'Lesson has been rescheduled to {lesson.date} at {lesson.start_time}.'
+                    NotificationService.send_many([
+                        (lesson.student, message, 'lesson_rescheduled'),
+                        (lesson.tutor, message, 'lesson_rescheduled'),
+                    ])
+            except booking.BookingConflict as e:
+                messages.error(request, str(e))
             else:
-                form.save()
-                send_notification(
-                    lesson.student,
-                    f'Lesson has been rescheduled to {lesson.date} at {lesson.start_time}.'
-                )
-                send_notification(
-                    lesson.tutor,
-                    f'Lesson has been rescheduled to {lesson.date} at {lesson.start_time}.'
-                )
-                
                 logger.info(
                     f"Lesson rescheduled: {lesson.student.username} "
                     f"with {lesson.tutor.username} to {lesson.date}"
@@ -611,61 +473,24 @@ def generate_timetable(request: HttpRequest) -> HttpResponse:
         if (today + timedelta(days=i)).weekday() < 5
     ]
     
-    from ..models import User  # ensure User is imported for this scope if needed
-    students = list(User.objects.filter(role='student'))
-    tutors = list(User.objects.filter(role='tutor'))
-    slot_start = time(10, 0)
-    slot_end = time(11, 0)
-    created_count = 0
-    
-    for lesson_date in weekdays:
-        for student in students:
-            # Skip if student already has a lesson at this time
-            if Lesson.objects.filter(
-                student=student,
-                date=lesson_date,
-                start_time=slot_start
-            ).exists():
-                continue
-            
-            # Find available tutors
-            available_tutors = [
-                t for t in tutors
-                if not Lesson.objects.filter(
-                    tutor=t,
-                    date=lesson_date,
-                    start_time=slot_start
-                ).exists()
-            ]
-            
-            if available_tutors:
-                tutor = random.choice(available_tutors)
-                lesson = Lesson.objects.create(
-                    student=student,
-                    tutor=tutor,
-                    date=lesson_date,
-                    start_time=slot_start,
-                    end_time=slot_end,
-                    location='Driving School HQ'
-                )
-                
-                send_notification(
-                    student,
-                    f'Lesson scheduled with {tutor.username} '
-                    f'on {lesson_date} at {slot_start}.'
-                )
-                send_notification(
-                    tutor,
-                    f'Lesson scheduled with {student.username} '
-                    f'on {lesson_date} at {slot_start}.'
-                )
-                created_count += 1
+    slots = [
+        (datetime.strptime(start, '%H:%M').time(), datetime.strptime(end, '%H:%M').time())
+        for start, end in getattr(settings, 'TIMETABLE_SLOTS', [('10:00', '11:00')])
+    ]
+    summary = TimetableEngine(weekdays, slots=slots).run()
+    created_count = summary['created']
     
     logger.info(f"Generated {created_count} lessons for the week")
     messages.success(request, f'Generated {created_count} lessons for the week.')
+    if summary['unplaced']:
+        messages.warning(
+            request,
+            f"{len(summary['unplaced'])} student-day(s) could not be placed because no instructor was free."
+        )
     return redirect('dashboard')
 
 @login_required
+@use_replica()
 def generate_report(request: HttpRequest) -> HttpResponse:
     """
     Generate progress report for a student.
@@ -735,34 +560,37 @@ def add_progress_comment(request: HttpRequest, lesson_id: int) -> HttpResponse:
     if request.method == 'POST':
         form = ProgressCommentForm(request.POST, instance=existing_progress)
         if form.is_valid():
-            progress = form.save(commit=False)
-            progress.lesson = lesson
-            progress.student = lesson.student
-            progress.save()
+            # Save the progress record and queue its emails together
+            with transaction.atomic():
+                progress = form.save(commit=False)
+                progress.lesson = lesson
+                progress.student = lesson.student
+                progress.save()
 
-            # Handle instructor approval
-            if form.cleaned_data.get('instructor_approval'):
-                lesson.student.instructor_approved = True
-                lesson.student.save()
-                approval_message = " Student marked as instructor-approved for VID eligibility."
-                logger.info(f"Student {lesson.student.username} marked as instructor-approved by {user_profile.username}")
-            else:
-                approval_message = ""
+                # Handle instructor approval
+                if form.cleaned_data.get('instructor_approval'):
+                    lesson.student.instructor_approved = True
+                    lesson.student.save()
+                    approval_message = " Student marked as instructor-approved for VID eligibility."
+                    logger.info(f"Student {lesson.student.username} marked as instructor-approved by {user_profile.username}")
+                else:
+                    approval_message = ""
 
-            # Send progress email to student
-            progress_data = {
-                'skills_covered': progress.skills_covered,
-                'progress_notes': progress.progress_notes,
-                'instructor_feedback': progress.instructor_feedback,
-                'next_lesson_focus': progress.next_lesson_focus
-            }
-            send_progress_email(lesson.student, lesson, progress_data)
+                # Send progress email to student
+                progress_data = {
+                    'skills_covered': progress.skills_covered,
+                    'progress_notes': progress.progress_notes,
+                    'instructor_feedback': progress.instructor_feedback,
+                    'next_lesson_focus': progress.next_lesson_focus
+                }
+                send_progress_email(lesson.student, lesson, progress_data)
 
-            # Send notification to student
-            send_notification(
-                lesson.student,
-                f'Progress report added for your lesson on {lesson.date}. Check your email for details!'
-            )
+                # Send notification to student
+                send_notification(
+                    lesson.student,
+                    f'Progress report added for your lesson on {lesson.date}. Check your email for details!',
+                    'progress'
+                )
 
             messages.success(request, f'Progress comment added successfully and email sent to student!{approval_message}')
             logger.info(f"Progress comment added for lesson {lesson.id} by {user_profile.username}")
@@ -801,51 +629,54 @@ def quick_progress_comment(request: HttpRequest, lesson_id: int) -> HttpResponse
     if request.method == 'POST':
         form = QuickProgressForm(request.POST)
         if form.is_valid():
-            # Create or update progress record
-            progress, created = StudentProgress.objects.get_or_create(
-                lesson=lesson,
-                student=lesson.student,
-                defaults={
-                    'progress_notes': form.cleaned_data['quick_notes'],
-                    'skills_covered': 'General driving skills practice',
-                    'instructor_feedback': f"Overall performance: {form.cleaned_data['overall_rating']}",
-                    'next_lesson_focus': 'Continue practicing and improving'
-                }
-            )
-
-            if not created:
-                # Update existing record
-                progress.progress_notes = form.cleaned_data['quick_notes']
-                progress.instructor_feedback = f"Overall performance: {form.cleaned_data['overall_rating']}"
-                progress.save()
-
-            # Handle instructor approval
-            if form.cleaned_data.get('instructor_approval'):
-                lesson.student.instructor_approved = True
-                lesson.student.save()
-                approval_message = " Student marked as instructor-approved for VID eligibility."
-                logger.info(f"Student {lesson.student.username} marked as instructor-approved by {user_profile.username}")
-            else:
-                approval_message = ""
+            # Save the progress record and queue its emails together
+            with transaction.atomic():
+                # Create or update progress record
+                progress, created = StudentProgress.objects.get_or_create(
+                    lesson=lesson,
+                    student=lesson.student,
+                    defaults={
+                        'progress_notes': form.cleaned_data['quick_notes'],
+                        'skills_covered': 'General driving skills practice',
+                        'instructor_feedback': f"Overall performance: {form.cleaned_data['overall_rating']}",
+                        'next_lesson_focus': 'Continue practicing and improving'
+                    }
+                )
 
-            # Send email if requested
-            if form.cleaned_data['send_email']:
-                progress_data = {
-                    'skills_covered': progress.skills_covered,
-                    'progress_notes': progress.progress_notes,
-                    'instructor_feedback': progress.instructor_feedback,
-                    'next_lesson_focus': progress.next_lesson_focus
-                }
-                send_progress_email(lesson.student, lesson, progress_data)
+                if not created:
+                    # Update existing record
+                    progress.progress_notes = form.cleaned_data['quick_notes']
+                    progress.instructor_feedback = f"Overall performance: {form.cleaned_data['overall_rating']}"
+                    progress.save()
 
-                # Send notification
-                send_notification(
-                    lesson.student,
-                    f'Quick progress update for your lesson on {lesson.date}. Check your email!'
-                )
-                email_message = " Email sent to student."
-            else:
-                email_message = ""
+                # Handle instructor approval
+                if form.cleaned_data.get('instructor_approval'):
+                    lesson.student.instructor_approved = True
+                    lesson.student.save()
+                    approval_message = " Student marked as instructor-approved for VID eligibility."
+                    logger.info(f"Student {lesson.student.username} marked as instructor-approved by {user_profile.username}")
+                else:
+                    approval_message = ""
+
+                # Send email if requested
+                if form.cleaned_data['send_email']:
+                    progress_data = {
+                        'skills_covered': progress.skills_covered,
+                        'progress_notes': progress.progress_notes,
+                        'instructor_feedback': progress.instructor_feedback,
+                        'next_lesson_focus': progress.next_lesson_focus
+                    }
+                    send_progress_email(lesson.student, lesson, progress_data)
+
+                    # Send notification
+                    send_notification(
+                        lesson.student,
+                        f'Quick progress update for your lesson on {lesson.date}. Check your email!',
+                        'progress'
+                    )
+                    email_message = " Email sent to student."
+                else:
+                    email_message = ""
 
             messages.success(request, f'Quick progress comment added successfully!{email_message}{approval_message}')
             logger.info(f"Quick progress comment added for lesson {lesson.id} by {user_profile.username}")
@@ -950,28 +781,31 @@ def student_progress_detail(request: HttpRequest, student_id: int) -> HttpRespon
             try:
                 lesson = get_object_or_404(Lesson, id=lesson_id, student=student)
                 
-                # Create or update progress record
-                progress, created = StudentProgress.objects.get_or_create(
-                    lesson=lesson,
-                    student=student,
-                    defaults={
-                        'progress_notes': comment,
-                        'skills_covered': 'General driving practice',
-                        'instructor_feedback': 'Progress comment added',
-                        'next_lesson_focus': 'Continue practicing'
-                    }
-                )
+                # Save the progress record and queue its notification together
+                with transaction.atomic():
+                    # Create or update progress record
+                    progress, created = StudentProgress.objects.get_or_create(
+                        lesson=lesson,
+                        student=student,
+                        defaults={
+                            'progress_notes': comment,
+                            'skills_covered': 'General driving practice',
+                            'instructor_feedback': 'Progress comment added',
+                            'next_lesson_focus': 'Continue practicing'
+                        }
+                    )
                 
-                if not created:
-                    # Update existing record
-                    progress.progress_notes = comment
-                    progress.save()
+                    if not created:
+                        # Update existing record
+                        progress.progress_notes = comment
+                        progress.save()
                 
-                # Send notification to student
-                send_notification(
-                    student,
-                    f'New progress comment added for your lesson on {lesson.date}'
-                )
+                    # Send notification to student
+                    send_notification(
+                        student,
+                        f'New progress comment added for your lesson on {lesson.date}',
+                        'progress'
+                    )
                 
                 messages.success(request, 'Progress comment added successfully!')
                 logger.info(f"Progress comment added by {user_profile.username} for student {student.username}")
@@ -994,6 +828,7 @@ def student_progress_detail(request: HttpRequest, student_id: int) -> HttpRespon
     return render(request, 'progress_detail.html', context)
 
 @login_required
+@use_replica()
 def export_progress_report(request: HttpRequest, student_id: int) -> HttpResponse:
     """
     Export comprehensive progress report as PDF or CSV.
@@ -1019,234 +854,89 @@ def export_progress_report(request: HttpRequest, student_id: int) -> HttpRespons
     # Get export format
     export_format = request.GET.get('format', 'pdf').lower()
     
+    if export_format != 'csv':
+        return _export_pdf_report(request, student)
+    
     try:
         # Generate comprehensive report data
         from ..ai_helper import ai_helper
-        report_data = ai_helper.generate_comprehensive_report_data(student_id)
+        report_data = ai_helper.generate_comprehensive_report_data(student_id, lazy_history=True)
         
         if 'error' in report_data:
             messages.error(request, report_data['error'])
             return redirect('student_progress_detail', student_id=student_id)
         
-        if export_format == 'csv':
-            return _export_csv_report(report_data)
-        else:
-            return _export_pdf_report(report_data)
+        return _export_csv_report(report_data)
             
     except Exception as e:
         logger.error(f"Error exporting progress report: {str(e)}")
         messages.error(request, 'Error generating report. Please try again.')
         return redirect('student_progress_detail', student_id=student_id)
 
-def _export_csv_report(report_data: Dict[str, Any]) -> HttpResponse:
+def _export_csv_report(report_data: Dict[str, Any]) -> StreamingHttpResponse:
     """
-    Export report data as CSV.
+    Export report data as a streamed CSV.
     
     Args:
         report_data: Dictionary containing report data.
     
     Returns:
-        HttpResponse: CSV file download.
+        StreamingHttpResponse: CSV file download.
     """
-    import csv
-    from django.http import HttpResponse
-    
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="progress_report_{report_data["student_info"]["name"].replace(" ", "_")}.csv"'
-    
-    writer = csv.writer(response)
-    
-    # Student Information
-    writer.writerow(['STUDENT PROGRESS REPORT'])
-    writer.writerow(['Generated:', report_data['generated_at']])
-    writer.writerow([])
-    
-    writer.writerow(['STUDENT INFORMATION'])
-    for key, value in report_data['student_info'].items():
-        writer.writerow([key.replace('_', ' ').title(), value])
-    writer.writerow([])
-    
-    # Statistics
-    writer.writerow(['STATISTICS'])
-    for key, value in report_data['statistics'].items():
-        writer.writerow([key.replace('_', ' ').title(), value])
-    writer.writerow([])
-    
-    # AI Insights
-    writer.writerow(['AI INSIGHTS'])
-    writer.writerow(['Analysis', report_data['ai_insights']['analysis']])
-    writer.writerow(['Feedback', report_data['ai_insights']['feedback']])
-    writer.writerow(['Progress Score', f"{report_data['ai_insights']['progress_score']}%"])
-    writer.writerow([])
-    
-    # Recommendations
-    writer.writerow(['RECOMMENDATIONS'])
-    for rec in report_data['ai_insights']['recommendations']:
-        writer.writerow(['', rec])
-    writer.writerow([])
-    
-    # Lesson History
-    writer.writerow(['LESSON HISTORY'])
-    writer.writerow(['Date', 'Time', 'Duration (min)', 'Tutor', 'Location', 'Skills Covered', 'Progress Notes', 'Instructor Feedback', 'Next Focus'])
-    
-    for lesson in report_data['lesson_history']:
-        writer.writerow([
-            lesson['date'],
-            lesson['time'],
-            lesson['duration'],
-            lesson['tutor'],
-            lesson['location'],
-            lesson['skills_covered'],
-            lesson['progress_notes'],
-            lesson['instructor_feedback'],
-            lesson['next_focus']
-        ])
+    from ..services.reports import progress_report_rows, stream_csv
     
-    return response
+    filename = f'progress_report_{report_data["student_info"]["name"].replace(" ", "_")}.csv'
+    # The rows are read while the response streams, after the view has left use_replica()
+    return stream_csv(iterate_in_context(progress_report_rows(report_data)), filename)
 
-def _export_pdf_report(report_data: Dict[str, Any]) -> HttpResponse:
+def _export_pdf_report(request: HttpRequest, student: User) -> HttpResponse:
     """
-    Export report data as PDF.
+    Serve the student's PDF report from the artifact cache.
+    
+    A stored, up-to-date PDF is sent straight from disk with an ETag, and a
+    matching If-None-Match gets 304. Otherwise generation is started in the
+    background and the client gets 202 with a URL to poll (this same URL).
     
     Args:
-        report_data: Dictionary containing report data.
+        request (HttpRequest): The HTTP request object.
+        student (User): The student whose report is requested.
     
     Returns:
-        HttpResponse: PDF file download.
+        HttpResponse: The PDF, 304, 202 while generating, or a redirect on failure.
     """
-    from reportlab.lib import colors
-    from reportlab.lib.pagesizes import letter, A4
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import inch
-    from django.http import HttpResponse
-    import io
-    
-    # Create PDF buffer
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-    
-    # Container for the 'Flowable' objects
-    elements = []
-    
-    # Get styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        spaceAfter=30,
-        textColor=colors.HexColor('#2c3e50')
-    )
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        spaceAfter=12,
-        textColor=colors.HexColor('#34495e')
-    )
-    
-    # Title
-    elements.append(Paragraph("Student Progress Report", title_style))
-    elements.append(Paragraph(f"Generated: {report_data['generated_at']}", styles['Normal']))
-    elements.append(Spacer(1, 20))
-    
-    # Student Information
-    elements.append(Paragraph("Student Information", heading_style))
-    student_data = [
-        ['Name', report_data['student_info']['name']],
-        ['Email', report_data['student_info']['email']],
-        ['Phone', report_data['student_info']['phone']],
-        ['Registration Date', report_data['student_info']['registration_date']]
-    ]
+    from django.http import FileResponse, HttpResponseNotModified
+    from django.utils.http import parse_etags
+    from ..services.reports import PDF_FAILED, ProgressReportArtifact, request_progress_report_pdf
     
-    student_table = Table(student_data, colWidths=[2*inch, 4*inch])
-    student_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#ecf0f1')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    elements.append(student_table)
-    elements.append(Spacer(1, 20))
-    
-    # Statistics
-    elements.append(Paragraph("Statistics", heading_style))
-    stats_data = [
-        ['Total Lessons', str(report_data['statistics']['total_lessons'])],
-        ['Total Hours', f"{report_data['statistics']['total_hours']} hours"],
-        ['Lessons with Progress', str(report_data['statistics']['lessons_with_progress'])],
-        ['Completion Rate', f"{report_data['statistics']['completion_rate']}%"],
-        ['Recent Lessons (30 days)', str(report_data['statistics']['recent_lessons_30_days'])],
-        ['Progress Score', f"{report_data['statistics']['progress_score']}%"]
-    ]
+    try:
+        artifact = ProgressReportArtifact(student)
+        state = request_progress_report_pdf(artifact)
+    except Exception as e:
+        logger.error(f"Error exporting progress report: {str(e)}")
+        state = PDF_FAILED
     
-    stats_table = Table(stats_data, colWidths=[2*inch, 4*inch])
-    stats_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#ecf0f1')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    elements.append(stats_table)
-    elements.append(Spacer(1, 20))
-    
-    # AI Insights
-    elements.append(Paragraph("AI Insights", heading_style))
-    elements.append(Paragraph(f"<b>Analysis:</b> {report_data['ai_insights']['analysis']}", styles['Normal']))
-    elements.append(Spacer(1, 10))
-    elements.append(Paragraph(f"<b>AI Feedback:</b> {report_data['ai_insights']['feedback']}", styles['Normal']))
-    elements.append(Spacer(1, 10))
-    
-    if report_data['ai_insights']['recommendations']:
-        elements.append(Paragraph("<b>Recommendations:</b>", styles['Normal']))
-        for rec in report_data['ai_insights']['recommendations']:
-            elements.append(Paragraph(f"• {rec}", styles['Normal']))
-    elements.append(Spacer(1, 20))
-    
-    # Lesson History
-    if report_data['lesson_history']:
-        elements.append(Paragraph("Lesson History", heading_style))
-        
-        # Create lesson history table
-        lesson_headers = ['Date', 'Time', 'Duration', 'Tutor', 'Skills Covered']
-        lesson_data = [lesson_headers]
-        
-        for lesson in report_data['lesson_history'][:10]:  # Limit to first 10 lessons for PDF
-            lesson_data.append([
-                str(lesson['date']),
-                lesson['time'],
-                f"{lesson['duration']}min",
-                lesson['tutor'],
-                lesson['skills_covered'][:50] + '...' if len(lesson['skills_covered']) > 50 else lesson['skills_covered']
-            ])
-        
-        lesson_table = Table(lesson_data, colWidths=[1*inch, 1*inch, 0.8*inch, 1.2*inch, 2*inch])
-        lesson_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498db')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP')
-        ]))
-        elements.append(lesson_table)
-    
-    # Build PDF
-    doc.build(elements)
-    
-    # Get PDF data
-    pdf_data = buffer.getvalue()
-    buffer.close()
-    
-    # Create response
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="progress_report_{report_data["student_info"]["name"].replace(" ", "_")}.pdf"'
-    response.write(pdf_data)
+    if state == PDF_FAILED:
+        messages.error(request, 'Error generating report. Please try again.')
+        return redirect('student_progress_detail', student_id=student.id)
     
+    if state is None:
+        if artifact.etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(open(artifact.path, 'rb'), as_attachment=True,
+                                    filename=artifact.filename, content_type='application/pdf')
+        response['ETag'] = artifact.etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+    
+    # Still generating: tell the client where to poll
+    poll_url = f"{request.path}?format=pdf"
+    retry_after = 2
+    if 'application/json' in request.headers.get('Accept', ''):
+        response = JsonResponse({'status': state, 'poll_url': poll_url}, status=202)
+    else:
+        response = render(request, 'report_generating.html',
+                          {'poll_url': poll_url, 'retry_after': retry_after}, status=202)
+    response['Location'] = poll_url
+    response['Retry-After'] = str(retry_after)
     return response
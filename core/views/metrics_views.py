@@ -0,0 +1,36 @@
+"""
+Prometheus metrics endpoint for the core app.
+"""
+import hmac
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from ..services.metrics import render
+
+def can_scrape(request: HttpRequest) -> bool:
+    """Admins, or a scraper sending METRICS_TOKEN as a bearer token, unless METRICS_PUBLIC is set."""
+    if getattr(settings, 'METRICS_PUBLIC', False):
+        return True
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    user = request.user
+    return user.is_authenticated and (user.is_staff or user.role == 'admin')
+
+@require_GET
+def metrics(request: HttpRequest) -> HttpResponse:
+    """
+    Serve all metrics in the Prometheus text format.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        HttpResponse: The metrics, or 403 for anyone but an admin or a scraper with the token.
+    """
+    if not can_scrape(request):
+        return HttpResponseForbidden('Metrics token required.')
+    return HttpResponse(render(), content_type=CONTENT_TYPE_LATEST)
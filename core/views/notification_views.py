@@ -1,13 +1,21 @@
 """
 Notification related views for the core app.
 """
+import json
 import logging
+import time as timer
+from typing import Any, AsyncIterator, Dict, Optional
 
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.http import HttpRequest, HttpResponse
-from django.shortcuts import redirect
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpRequest, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.shortcuts import redirect, render
+from django.views.decorators.http import require_POST
 
-from ..models import Notification
+from ..models import Notification, User
+from ..services.live_events import get_broker, notification_event
+from ..services.notification_service import INBOX_MAX_PAGE_SIZE, INBOX_PAGE_SIZE, NotificationService
 
 logger = logging.getLogger(__name__)
 
@@ -23,14 +31,182 @@ def mark_notification_read(request: HttpRequest, notification_id: int) -> HttpRe
     Returns:
         HttpResponse: Redirect to dashboard.
     """
-    notification = Notification.objects.filter(
-        id=notification_id,
-        user=request.user
-    ).first()
-    
-    if notification:
-        notification.is_read = True
-        notification.save()
+    if NotificationService.mark_read(request.user, [notification_id]):
         logger.info(f"Notification {notification_id} marked as read by {request.user.username}")
     
     return redirect('dashboard')
+
+def _wants_json(request: HttpRequest) -> bool:
+    return 'application/json' in request.headers.get('Accept', '')
+
+@login_required
+def notification_inbox(request: HttpRequest) -> HttpResponse:
+    """
+    List the user's notifications newest first, one keyset page at a time.
+    
+    Query parameters: `cursor` (from the previous page), `limit` and `unread=1`.
+    Responds with JSON when the client accepts application/json.
+    
+    Args:
+        request (HttpRequest): The HTTP request object.
+    
+    Returns:
+        HttpResponse: The inbox page, or 400 for a malformed cursor or limit.
+    """
+    unread_only = request.GET.get('unread') == '1'
+    try:
+        limit = int(request.GET.get('limit', INBOX_PAGE_SIZE))
+        notifications, next_cursor = NotificationService.inbox_page(
+            request.user, cursor=request.GET.get('cursor'), limit=limit, unread_only=unread_only
+        )
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    
+    if _wants_json(request):
+        return JsonResponse({
+            'notifications': [
+                {
+                    'id': n.id,
+                    'message': n.message,
+                    'kind': n.kind,
+                    'is_read': n.is_read,
+                    'created_at': n.created_at.isoformat(),
+                }
+                for n in notifications
+            ],
+            'next_cursor': next_cursor,
+            'unread_count': request.user.unread_notifications,
+        })
+    
+    return render(request, 'notification_inbox.html', {
+        'notifications': notifications,
+        'next_cursor': next_cursor,
+        'unread_only': unread_only,
+        'unread_count': request.user.unread_notifications,
+    })
+
+@login_required
+@require_POST
+def mark_notifications_read(request: HttpRequest) -> HttpResponse:
+    """
+    Mark the selected notifications (`ids`), or all of them (`all=1`), as read in one UPDATE.
+    
+    Args:
+        request (HttpRequest): The HTTP request object.
+    
+    Returns:
+        HttpResponse: JSON with the number marked and the remaining unread count,
+        or a redirect back to the inbox.
+    """
+    if request.POST.get('all') == '1':
+        ids = None
+    else:
+        try:
+            ids = [int(i) for i in request.POST.getlist('ids')]
+        except ValueError:
+            return HttpResponseBadRequest('ids must be integers')
+    
+    marked = NotificationService.mark_read(request.user, ids) if ids is None or ids else 0
+    logger.info(f"{marked} notifications marked as read by {request.user.username}")
+    
+    if _wants_json(request):
+        request.user.refresh_from_db(fields=['unread_notifications'])
+        return JsonResponse({'marked': marked, 'unread_count': request.user.unread_notifications})
+    return redirect('notification_inbox')
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Serialise an event dict (event, data and optionally id) as a server-sent event."""
+    lines = []
+    if event.get('id') is not None:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['event']}")
+    lines.append(f"data: {json.dumps(event['data'], separators=(',', ':'))}")
+    return '\n'.join(lines) + '\n\n'
+
+async def notification_events(user: User, last_event_id: Optional[int] = None,
+                              max_seconds: Optional[float] = None) -> AsyncIterator[str]:
+    """
+    Server-sent events for one user: missed notifications first, then live ones.
+    
+    Every stream sends an `unread` event carrying the id of the newest
+    notification the client now has, so EventSource reconnects with that
+    Last-Event-ID and is sent whatever arrived in between.
+    
+    Args:
+        user: The connected user; the unread count is read from its counter.
+        last_event_id: Last notification id the client saw; newer ones are
+            replayed. Without one, the stream starts after the newest notification.
+        max_seconds: Close the stream after this long so the client reconnects
+            (LIVE_EVENTS_MAX_STREAM_SECONDS by default; 0 replays and closes).
+    
+    Yields:
+        str: Encoded SSE frames, with a keep-alive comment when idle.
+    """
+    if max_seconds is None:
+        max_seconds = getattr(settings, 'LIVE_EVENTS_MAX_STREAM_SECONDS', 300)
+    heartbeat = getattr(settings, 'LIVE_EVENTS_HEARTBEAT_SECONDS', 15)
+    retry_ms = getattr(settings, 'LIVE_EVENTS_RETRY_MS', 3000)
+    
+    broker = get_broker()
+    # Subscribe before replaying so nothing committed in between is missed
+    subscription = broker.subscribe(user.id) if max_seconds else None
+    try:
+        yield f"retry: {retry_ms}\n\n"
+        
+        notifications = Notification.objects.filter(user_id=user.id)
+        if last_event_id is None:
+            replayed_up_to = await notifications.order_by('-id').values_list('id', flat=True).afirst() or 0
+        else:
+            replayed_up_to = last_event_id
+            missed = notifications.filter(id__gt=last_event_id).order_by('id')
+            async for notification in missed[:INBOX_MAX_PAGE_SIZE]:
+                replayed_up_to = notification.id
+                yield format_sse(notification_event(notification))
+        
+        yield format_sse({'id': replayed_up_to, 'event': 'unread', 'data': {'count': user.unread_notifications}})
+        
+        deadline = timer.monotonic() + max_seconds
+        while subscription is not None:
+            remaining = deadline - timer.monotonic()
+            if remaining <= 0:
+                break
+            event = await subscription.get(timeout=min(heartbeat, remaining))
+            if event is None:
+                yield ": keep-alive\n\n"
+            elif event.get('id') is None or event['id'] > replayed_up_to:
+                yield format_sse(event)
+    finally:
+        if subscription is not None:
+            broker.unsubscribe(subscription)
+
+@login_required
+async def notification_stream(request: HttpRequest) -> HttpResponse:
+    """
+    Stream the user's new notifications as server-sent events.
+    
+    Served over ASGI this is a long-lived stream. Under WSGI, where an open
+    stream would pin a worker, it replays missed notifications and closes, and
+    EventSource reconnects after the advertised retry delay.
+    
+    Args:
+        request (HttpRequest): The HTTP request object.
+    
+    Returns:
+        HttpResponse: A text/event-stream response, or 400 for a bad Last-Event-ID.
+    """
+    user = await request.auser()
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return HttpResponseBadRequest('Last-Event-ID must be a notification id')
+    
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(notification_events(user, last_event_id),
+                                         content_type='text/event-stream')
+    else:
+        frames = [frame async for frame in notification_events(user, last_event_id, max_seconds=0)]
+        response = HttpResponse(''.join(frames), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -46,11 +46,13 @@ if DEBUG:
     INSTALLED_APPS.append('debug_toolbar')
 
 MIDDLEWARE = [
+    'core.middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ReplicaStickinessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -59,11 +61,30 @@ MIDDLEWARE = [
 if DEBUG:
     MIDDLEWARE.insert(0, 'debug_toolbar.middleware.DebugToolbarMiddleware')
 
+# Per-request profiling (core.middleware.RequestProfilingMiddleware): one log
+# line per request with its query count, SQL time, duplicate queries, template
+# render time and response size. Requests over budget are logged as warnings
+# with their most repeated query. It only keeps counters, so it stays on in
+# production; DJANGO_REQUEST_PROFILING=False removes it.
+REQUEST_PROFILING = os.getenv('DJANGO_REQUEST_PROFILING', 'True').lower() == 'true'
+REQUEST_BUDGET = {
+    'queries': int(os.getenv('DJANGO_REQUEST_QUERY_BUDGET', '50')),
+    'latency_ms': int(os.getenv('DJANGO_REQUEST_LATENCY_BUDGET_MS', '500')),
+}
+# Larger budgets for views expected to do more, by URL name
+REQUEST_BUDGET_OVERRIDES = {
+    'export_progress_report': {'latency_ms': 3000},
+    'export_student_status': {'latency_ms': 3000},
+    'export_cohort_reports': {'latency_ms': 10000},
+    'generate_timetable': {'queries': 500, 'latency_ms': 5000},
+}
+
 ROOT_URLCONF = 'drivingschool.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Django's backend, timing renders for RequestProfilingMiddleware (core.profiling)
+        'BACKEND': 'core.profiling.DjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -77,18 +98,96 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'drivingschool.wsgi.application'
+# Serve with an ASGI server (e.g. `uvicorn drivingschool.asgi:application`) for live notification streams
+ASGI_APPLICATION = 'drivingschool.asgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DJANGO_DB_ENGINE selects 'sqlite' (default) or 'postgres'. Connections are kept
+# open for DJANGO_DB_CONN_MAX_AGE seconds and health-checked before reuse, so a
+# worker does not reconnect on every request nor use a connection the server
+# dropped. PostgreSQL needs the driver from requirements-postgres.txt; run the
+# tests against it with
+# `DJANGO_DB_ENGINE=postgres python manage.py test core.tests --settings=drivingschool.test_settings`.
+DB_ENGINE = os.getenv('DJANGO_DB_ENGINE', 'sqlite')
+DB_CONN_MAX_AGE = int(os.getenv('DJANGO_DB_CONN_MAX_AGE', '60'))
+
+if DB_ENGINE == 'postgres':
+    # Needs the psycopg driver (requirements-postgres.txt). Migrations add
+    # exclusion constraints that stop overlapping lessons for a tutor or
+    # student (core.services.booking)
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB', 'drivingschool'),
+            'USER': os.getenv('POSTGRES_USER', 'drivingschool'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
+            'PORT': os.getenv('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+        }
     }
+    INSTALLED_APPS.append('django.contrib.postgres')
+elif DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # Take the write lock when a transaction starts. A deferred transaction
+                # that reads and then writes cannot wait for the lock and fails at once
+                # with "database is locked" whenever another writer got there first.
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+else:
+    raise ValueError(f"DJANGO_DB_ENGINE must be 'sqlite' or 'postgres', not {DB_ENGINE!r}")
+
+# Read replicas for the heavy read-only paths: progress exports and reports
+# (core.routers); shared cache entries are always built from 'default'. Only reads
+# inside use_replica() go to an alias in DATABASE_REPLICAS; every write stays on
+# 'default', and a user who just wrote keeps reading from 'default' for
+# DJANGO_REPLICA_STICKY_SECONDS (core.middleware.ReplicaStickinessMiddleware).
+# Configure one with POSTGRES_REPLICA_HOST, or DJANGO_DB_REPLICA_NAME for a
+# SQLite copy of the primary.
+REPLICA_STICKY_SECONDS = int(os.getenv('DJANGO_REPLICA_STICKY_SECONDS', '15'))
+
+if DB_ENGINE == 'postgres' and os.getenv('POSTGRES_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.getenv('POSTGRES_REPLICA_HOST'),
+        'PORT': os.getenv('POSTGRES_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+elif DB_ENGINE == 'sqlite' and os.getenv('DJANGO_DB_REPLICA_NAME'):
+    DATABASES['replica'] = {**DATABASES['default'], 'NAME': os.getenv('DJANGO_DB_REPLICA_NAME')}
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# PRAGMAs run on every new SQLite connection (core.services.sqlite_tuning).
+# WAL lets readers and the writer work concurrently; busy_timeout (ms) makes a
+# writer wait for the lock instead of failing with "database is locked".
+# Compare settings with `manage.py benchmark_sqlite`.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # durable with WAL except for the last commits on power loss
+    'busy_timeout': 5000,
+    'cache_size': -20000,  # negative: KiB, so about 20 MB per connection
+    'mmap_size': 128 * 1024 * 1024,
+    'temp_store': 'MEMORY',
 }
 
+# Tests must run with drivingschool.test_settings (see pytest.ini); this runner
+# stops `manage.py test` from running them against these settings
+TEST_RUNNER = 'drivingschool.test_runner.TestRunner'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -220,20 +319,133 @@ LOGGING = {
     },
 }
 
-# Cache Configuration
+# Cache Configuration. The cache must be shared by all server processes, or an
+# invalidation in one worker never reaches the others:
+#   'file'   - a directory on this host (default)
+#   'db'     - a database table; run `manage.py createcachetable` first
+#   'redis'  - a Redis server (needs the redis package)
+#   'locmem' - per-process memory; only for a single process, always used by tests
+#              (drivingschool.test_settings)
+# Keys are namespaced and versioned by core.services.cache_keys; raising
+# DJANGO_CACHE_VERSION retires every cached entry at once, e.g. on deploy.
+CACHE_BACKEND = os.getenv('DJANGO_CACHE_BACKEND', 'file')
+CACHE_LOCATION = os.getenv('DJANGO_CACHE_LOCATION')
+CACHE_BACKENDS = {
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_LOCATION or str(BASE_DIR / 'cache'),
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': CACHE_LOCATION or 'django_cache',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_LOCATION or os.getenv('REDIS_URL', 'redis://localhost:6379/1'),
+    },
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': CACHE_LOCATION or 'drivingschool',
+    },
+}
+if CACHE_BACKEND not in CACHE_BACKENDS:
+    raise ValueError(f"DJANGO_CACHE_BACKEND must be one of {', '.join(CACHE_BACKENDS)}, not {CACHE_BACKEND!r}")
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        **CACHE_BACKENDS[CACHE_BACKEND],
+        'KEY_PREFIX': 'drivingschool',
+        'VERSION': int(os.getenv('DJANGO_CACHE_VERSION', '1')),
     }
 }
 
+# Admin student status dashboard: cache lifetime (seconds) and students listed individually
+STUDENT_STATUS_CACHE_TIMEOUT = 300
+STUDENT_STATUS_LIST_LIMIT = 100
+
+# Per-role dashboard data cache lifetime (seconds); changes invalidate it sooner through core.signals
+DASHBOARD_CACHE_TIMEOUT = 300
+
+# Vehicle utilisation report: window in days, the fleet's working hours used as
+# capacity, and how long (seconds) a computed report is reused
+VEHICLE_UTILIZATION_DAYS = 30
+FLEET_OPERATING_HOURS = (8, 18)
+VEHICLE_UTILIZATION_CACHE_TIMEOUT = 120
+
+# Automatic timetable generation: lesson slots tried in order for each student
+TIMETABLE_SLOTS = [
+    ('10:00', '11:00'),
+]
+
 # Celery Configuration Options
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
 
+# PDF progress reports are built by 'celery', a local 'thread' or 'inline' in the request.
+# Without a configured broker they are built in a local background thread.
+PDF_REPORT_BACKEND = os.getenv('PDF_REPORT_BACKEND', 'celery' if os.getenv('CELERY_BROKER_URL') else 'thread')
+
+# Rendering processes for the admin cohort report ZIP export (None = number of cores)
+COHORT_EXPORT_WORKERS = None
+
+# Email outbox: emails are queued in the database and sent by a worker.
+# Drains are kicked through 'celery' or a local 'thread' after each commit;
+# set it empty to rely only on beat or `manage.py drain_email_outbox --loop`.
+EMAIL_OUTBOX_BACKEND = os.getenv('EMAIL_OUTBOX_BACKEND', 'celery' if os.getenv('CELERY_BROKER_URL') else 'thread')
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_BACKOFF_SECONDS = 30  # doubled after every failed attempt
+EMAIL_OUTBOX_MAX_BACKOFF_SECONDS = 3600
+EMAIL_OUTBOX_LEASE_SECONDS = 300  # claimed emails return to the queue if a worker dies
+
+# Upcoming-lesson reminders: lead times in minutes, and how far back a late
+# scan may reach for reminders it missed
+LESSON_REMINDER_LEAD_MINUTES = [24 * 60, 60, 10]
+LESSON_REMINDER_MAX_CATCHUP_MINUTES = 60
+
+# Read notifications older than this are deleted by the prune_notifications job
+NOTIFICATION_RETENTION_DAYS = 90
+
+# Live notification stream (server-sent events). The in-process broker only
+# reaches clients connected to the same server process; point LIVE_EVENTS_BACKEND
+# at a shared EventBroker implementation when running several processes.
+LIVE_EVENTS_BACKEND = 'core.services.live_events.InProcessBroker'
+LIVE_EVENTS_QUEUE_SIZE = 100  # events buffered per connection before the oldest are dropped
+LIVE_EVENTS_HEARTBEAT_SECONDS = 15
+LIVE_EVENTS_MAX_STREAM_SECONDS = 300  # clients reconnect with Last-Event-ID after this
+LIVE_EVENTS_RETRY_MS = 3000
+
+CELERY_BEAT_SCHEDULE = {
+    'notify-upcoming-lessons': {
+        'task': 'core.tasks.notify_upcoming_lessons',
+        'schedule': 60.0,
+    },
+    'drain-email-outbox': {
+        'task': 'core.tasks.drain_email_outbox',
+        'schedule': 30.0,
+    },
+    'prune-notifications': {
+        'task': 'core.tasks.prune_notifications',
+        'schedule': 24 * 60 * 60.0,
+    },
+}
+
+# Metrics served at /metrics/ in the Prometheus text format (core.services.metrics),
+# with prometheus_client in multiprocess mode: each server process writes its
+# values to files in PROMETHEUS_MULTIPROC_DIR and a scrape sums them. All
+# processes must share the directory. gunicorn.conf.py empties it when the
+# server starts and drops a worker's live-event gauges when the worker exits;
+# another server must do the same (prometheus_client.multiprocess.mark_process_dead).
+# Request latencies come from RequestProfilingMiddleware. Only admins and a
+# scraper sending DJANGO_METRICS_TOKEN as a bearer token may read the metrics,
+# unless DJANGO_METRICS_PUBLIC is True.
+PROMETHEUS_MULTIPROC_DIR = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', str(BASE_DIR / 'metrics'))
+METRICS_TOKEN = os.getenv('DJANGO_METRICS_TOKEN', '')
+METRICS_PUBLIC = os.getenv('DJANGO_METRICS_PUBLIC', 'False').lower() == 'true'
+
 # Celery Beat Scheduler
 # INSTALLED_APPS.append('django_celery_beat')
 # CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
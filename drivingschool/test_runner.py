@@ -0,0 +1,20 @@
+"""
+Test runner that insists on drivingschool.test_settings.
+"""
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Refuse to run under the server settings, where tests would share the
+    on-disk cache, the database file and the metrics directory.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        if not getattr(settings, 'TEST_SETTINGS', False):
+            raise ImproperlyConfigured(
+                "Run the tests with --settings=drivingschool.test_settings (pytest reads it from pytest.ini)."
+            )
+        super().setup_test_environment(**kwargs)
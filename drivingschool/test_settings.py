@@ -0,0 +1,40 @@
+"""
+Django settings for the test suite.
+
+Run the tests with `manage.py test --settings=drivingschool.test_settings`,
+or with pytest, which reads it from pytest.ini; the test runner refuses any
+other settings. Tests get a per-process cache, a stand-in SQLite replica and
+their own metrics directory, so they share no state with a running server.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+from .settings import CACHE_BACKENDS, CACHES, DATABASES, DB_ENGINE, SQLITE_PRAGMAS
+
+TEST_SETTINGS = True
+
+CACHES['default'] = {**CACHES['default'], **CACHE_BACKENDS['locmem']}
+
+# Nothing in a test run may open the project's db.sqlite3: the default alias
+# points at a throwaway file (tests use an in-memory database), and a second
+# SQLite file stands in for a replica. Only the routing tests
+# (core/tests/test_replica_router.py) send reads to it, via DATABASE_REPLICAS
+if DB_ENGINE == 'sqlite':
+    DATABASES['default'] = {**DATABASES['default'],
+                            'NAME': os.path.join(tempfile.gettempdir(), 'drivingschool_test.sqlite3')}
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.path.join(tempfile.gettempdir(), 'drivingschool_replica.sqlite3'),
+        'TEST': {'NAME': os.path.join(tempfile.gettempdir(), 'drivingschool_test_replica.sqlite3')},
+    }
+DATABASE_REPLICAS = []
+
+# journal_mode is persistent: switching to WAL rewrites the database file's header
+SQLITE_PRAGMAS = {name: value for name, value in SQLITE_PRAGMAS.items() if name != 'journal_mode'}
+
+# A metrics directory for this run only, set before prometheus_client is imported
+PROMETHEUS_MULTIPROC_DIR = os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='drivingschool_metrics_')
+atexit.register(shutil.rmtree, PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
@@ -18,13 +18,14 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
-from core.views.admin_views import student_status_dashboard, export_student_status, student_detail, student_edit
+from core.views.admin_views import student_status_dashboard, export_student_status, export_cohort_reports, student_detail, student_edit
 from django.views.generic import TemplateView
 from django_ratelimit.decorators import ratelimit
 from django.contrib.auth import views as auth_views
 from django.shortcuts import redirect
 
 from core import views as core_views
+from core.views import metrics_views
 
 # Apply rate limiting to login view
 login_view = ratelimit(key='ip', rate='5/m', method='POST')(auth_views.LoginView.as_view())
@@ -40,6 +41,7 @@ urlpatterns = [
     # Custom admin URLs must come before the Django admin pattern
     path('admin/student-status/', student_status_dashboard, name='student_status_dashboard'),
     path('admin/student-status/export/', export_student_status, name='export_student_status'),
+    path('admin/cohort-reports/export/', export_cohort_reports, name='export_cohort_reports'),
     path('admin/student/<str:username>/', student_detail, name='student_detail'),
     path('admin/student/<str:username>/edit/', student_edit, name='student_edit'),
     
@@ -70,6 +72,10 @@ urlpatterns = [
 
     # Notifications
     path('notification/read/<int:notification_id>/', core_views.notification_views.mark_notification_read, name='mark_notification_read'),
+    path('notifications/', core_views.notification_views.notification_inbox, name='notification_inbox'),
+    path('notifications/mark-read/', core_views.notification_views.mark_notifications_read, name='mark_notifications_read'),
+    path('notifications/stream/', core_views.notification_views.notification_stream, name='notification_stream'),
+    path('metrics/', metrics_views.metrics, name='metrics'),
 ]
 
 # Add debug toolbar URLs in development
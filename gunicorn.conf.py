@@ -0,0 +1,35 @@
+"""
+Gunicorn configuration: `gunicorn drivingschool.wsgi` picks this file up from
+the project directory.
+
+The hooks keep the Prometheus metrics directory (PROMETHEUS_MULTIPROC_DIR,
+see settings) in step with the running workers: it is emptied when the
+master starts, so files of an earlier run are not summed into /metrics/, and
+a worker's live gauges are dropped when it exits.
+"""
+import os
+import shutil
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'drivingschool.settings')
+
+wsgi_app = 'drivingschool.wsgi'
+
+
+def _metrics_directory() -> str:
+    from django.conf import settings
+
+    # Loading the settings also exports PROMETHEUS_MULTIPROC_DIR to the workers
+    return settings.PROMETHEUS_MULTIPROC_DIR
+
+
+def on_starting(server):
+    directory = _metrics_directory()
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+    server.log.info(f"Emptied metrics directory {directory}")
+
+
+def child_exit(server, worker):
+    from prometheus_client.multiprocess import mark_process_dead
+
+    mark_process_dead(worker.pid, _metrics_directory())